@@ -0,0 +1,437 @@
+"""
+Нагрузочный замер рекомендательной системы на синтетических каталогах.
+
+Генерирует каталоги фильмов заданных размеров и оценки пользователей, после чего
+вызывает Recommendations.get_recommendations для набора пользователей и измеряет
+задержку (p50/p95), пиковое потребление памяти (tracemalloc) и количество строк,
+полученных из хранилища. Вместо базы данных используется хранилище в памяти:
+сессия обслуживает запросы каталога и оценок, а методы FilmDAO подменяются
+на время замера. Результат сохраняется в JSON, который удобно сравнивать
+между коммитами.
+
+Запуск (нужны переменные окружения приложения, например из .env):
+    python -m benchmarks.recommendations --sizes 1000 10000 --users 200 --output bench_recommendations.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import tracemalloc
+
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Iterator, NamedTuple
+
+import numpy as np
+
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+from loguru import logger
+
+from src.films.dao import FilmDAO
+from src.films.models import Film
+from src.recommendations import service
+from src.recommendations.cache import recommendation_cache
+from src.recommendations.catalog import film_catalog
+from src.recommendations.collaborative import build_item_similarity_model, item_engine
+from src.recommendations.service import Recommendations
+from src.user_actions.models import UserFilmRating
+
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+
+class SyntheticFilm(NamedTuple):
+    id: int
+    title: str
+    genres: list[str]
+    average_rating: float | None
+    local_rating: float | None
+    rating_count: int = 0
+
+
+class SyntheticDataset:
+    """
+    Синтетический каталог фильмов и оценки пользователей.
+
+    Args:
+        num_films (int): Количество фильмов.
+        num_users (int): Количество пользователей с оценками.
+        ratings_per_user (int): Количество оценок у каждого пользователя.
+        num_genres (int): Количество различных жанров.
+        genre_distribution (str): Распределение жанров: "uniform" или "zipf".
+        seed (int): Зерно генератора случайных чисел.
+    """
+
+    def __init__(self,
+                 num_films: int,
+                 num_users: int,
+                 ratings_per_user: int,
+                 num_genres: int,
+                 genre_distribution: str,
+                 seed: int) -> None:
+
+        rng = np.random.default_rng(seed)
+
+        genre_names = [f"genre_{number:02d}" for number in range(num_genres)]
+        genre_weights = self._get_genre_weights(num_genres, genre_distribution)
+
+        film_genres = self._sample_film_genres(rng, num_films, genre_weights)
+        average_ratings = np.clip(rng.normal(6.5, 1.2, size=num_films), 1, 10).round(1)
+        local_ratings = np.clip(rng.normal(6.5, 1.8, size=num_films), 1, 10).round(1)
+        has_local_rating = rng.random(num_films) < 0.3
+
+        self.films: dict[int, SyntheticFilm] = {}
+
+        for index in range(num_films):
+            film_id = index + 1
+
+            self.films[film_id] = SyntheticFilm(
+                film_id,
+                f"Film {film_id}",
+                [genre_names[genre] for genre in sorted(film_genres[index])],
+                float(average_ratings[index]),
+                float(local_ratings[index]) if has_local_rating[index] else None)
+
+        # Популярность фильмов убывает по закону Ципфа, порядок фильмов случаен
+        popularity = 1 / np.arange(1, num_films + 1)
+        popularity = popularity[rng.permutation(num_films)]
+        popularity /= popularity.sum()
+
+        ratings_per_user = min(ratings_per_user, num_films)
+
+        self.ratings: dict[str, list[tuple[int, float]]] = {}
+
+        for user_number in range(num_users):
+            film_ids = rng.choice(num_films, size=ratings_per_user, replace=False, p=popularity) + 1
+            ratings = rng.integers(1, 11, size=ratings_per_user).astype(float)
+
+            self.ratings[f"user-{user_number}"] = list(zip(film_ids.tolist(), ratings.tolist()))
+
+        rating_counts = Counter(film_id for ratings in self.ratings.values() for film_id, _ in ratings)
+
+        for film_id, rating_count in rating_counts.items():
+            self.films[film_id] = self.films[film_id]._replace(rating_count=rating_count)
+
+    @property
+    def num_ratings(self) -> int:
+        return sum(len(ratings) for ratings in self.ratings.values())
+
+    def get_rating_arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+
+        user_numbers = {user_id: number for number, user_id in enumerate(self.ratings)}
+
+        rows = [
+            (user_numbers[user_id], film_id, rating)
+            for user_id, ratings in self.ratings.items() for film_id, rating in ratings
+        ]
+        user_indices, film_ids, ratings = zip(*rows)
+
+        return (
+            np.asarray(user_indices, dtype=np.int64),
+            np.asarray(film_ids, dtype=np.int64),
+            np.asarray(ratings, dtype=np.float64),
+        )
+
+    @staticmethod
+    def _sample_film_genres(rng: np.random.Generator, num_films: int, genre_weights: np.ndarray) -> list[list[int]]:
+        """
+        Выбирает каждому фильму от одного до трех различных жанров с заданными весами.
+        Выборка без повторений делается сразу для всех фильмов (Gumbel top-k).
+        """
+
+        max_genres = min(3, len(genre_weights))
+        genres_per_film = rng.integers(1, max_genres + 1, size=num_films)
+
+        film_genres = []
+
+        for start in range(0, num_films, 100_000):
+            size = min(100_000, num_films - start)
+            keys = np.log(genre_weights) + rng.gumbel(size=(size, len(genre_weights)))
+            top = np.argsort(-keys, axis=1)[:, :max_genres]
+
+            film_genres.extend(
+                genres[:count] for genres, count in zip(top.tolist(), genres_per_film[start:start + size].tolist()))
+
+        return film_genres
+
+    @staticmethod
+    def _get_genre_weights(num_genres: int, genre_distribution: str) -> np.ndarray:
+
+        if genre_distribution == "uniform":
+            weights = np.ones(num_genres)
+        elif genre_distribution == "zipf":
+            weights = 1 / np.arange(1, num_genres + 1)
+        else:
+            raise ValueError(f"Unknown genre distribution: {genre_distribution}")
+
+        return weights / weights.sum()
+
+
+class InMemoryResult:
+
+    def __init__(self, rows: list) -> None:
+        self.rows = rows
+
+    def __iter__(self) -> Iterator:
+        return iter(self.rows)
+
+    def all(self) -> list:
+        return self.rows
+
+    def fetchall(self) -> list:
+        return self.rows
+
+    def scalars(self) -> "InMemoryResult":
+        return self
+
+
+class InMemorySession:
+    """
+    Заменяет AsyncSession для запросов, которые рекомендательная система
+    выполняет напрямую: загрузка каталога, последние оценки пользователя
+    и предрасчитанные рекомендации. Считает количество возвращенных строк.
+    """
+
+    def __init__(self, dataset: SyntheticDataset) -> None:
+        self.dataset = dataset
+        self.rows_fetched = 0
+
+    async def execute(self, stmt) -> InMemoryResult:
+
+        entity = stmt.column_descriptions[0]["entity"]
+        names = [column["name"] for column in stmt.column_descriptions]
+
+        if entity is Film and names == ["id", "genres", "average_rating", "local_rating", "rating_count"]:
+            return InMemoryResult(self._fetched(list(self.dataset.films.values())))
+
+        if entity is UserFilmRating and names == ["film_id", "rating"]:
+            params = stmt.compile().params
+            user_id = next(value for name, value in params.items() if name.startswith("user_id"))
+
+            ratings = self.dataset.ratings.get(user_id, [])[::-1]
+            return InMemoryResult(self._fetched(ratings[:stmt._limit]))
+
+        raise NotImplementedError(f"Unsupported statement: {stmt}")
+
+    async def get(self, entity, ident):
+        # Предрасчитанных рекомендаций в синтетических данных нет
+        return None
+
+    def _fetched(self, rows: list) -> list:
+        self.rows_fetched += len(rows)
+        return rows
+
+
+@contextmanager
+def in_memory_film_dao(dataset: SyntheticDataset, session: InMemorySession) -> Iterator[None]:
+    """ Подменяет методы FilmDAO, которыми пользуется рекомендательная система """
+
+    originals = {name: getattr(FilmDAO, name) for name in ("find_all", "find_genres", "find_unrated_candidates")}
+
+    async def find_all(db, *filter, **filter_by):
+        film_ids = filter[0].right.value
+        return session._fetched([dataset.films[film_id] for film_id in film_ids if film_id in dataset.films])
+
+    async def find_genres(db, film_ids):
+        return session._fetched([dataset.films[film_id] for film_id in film_ids if film_id in dataset.films])
+
+    async def find_unrated_candidates(db, excluded_ids, genres_coefficients=None, min_score=0.0, limit=None):
+        excluded = set(excluded_ids)
+        candidates = [film for film_id, film in dataset.films.items() if film_id not in excluded]
+
+        if genres_coefficients:
+            scores = {
+                film.id: sum(genres_coefficients.get(genre, 0) for genre in film.genres) for film in candidates}
+            candidates = sorted(
+                (film for film in candidates
+                 if genres_coefficients.keys() & set(film.genres) and scores[film.id] >= min_score),
+                key=lambda film: (-scores[film.id], film.id))
+        else:
+            candidates.sort(key=lambda film: (-film.rating_count, film.id))
+
+        return session._fetched(candidates[:limit])
+
+    FilmDAO.find_all = find_all
+    FilmDAO.find_genres = find_genres
+    FilmDAO.find_unrated_candidates = find_unrated_candidates
+
+    try:
+        yield
+    finally:
+        for name, method in originals.items():
+            setattr(FilmDAO, name, method)
+
+
+async def _run_requests(session: InMemorySession,
+                        user_ids: list[str],
+                        num_films: int,
+                        ranked: bool,
+                        engine: str) -> tuple[list[float], int]:
+
+    latencies = []
+    rows_fetched = session.rows_fetched
+
+    for user_id in user_ids:
+        started_at = perf_counter()
+        await Recommendations(session).get_recommendations(user_id, num_films, ranked=ranked, engine=engine)
+        latencies.append((perf_counter() - started_at) * 1000)
+
+    return latencies, session.rows_fetched - rows_fetched
+
+
+def _summarize(latencies: list[float]) -> dict:
+    return {
+        "p50": round(float(np.percentile(latencies, 50)), 3),
+        "p95": round(float(np.percentile(latencies, 95)), 3),
+        "max": round(max(latencies), 3),
+    }
+
+
+async def benchmark_size(num_films: int, args: argparse.Namespace) -> dict:
+    """
+    Замеряет рекомендации на каталоге заданного размера.
+
+    Args:
+        num_films (int): Количество фильмов в каталоге.
+        args (argparse.Namespace): Параметры замера.
+
+    Returns:
+        dict: Результаты замера.
+    """
+
+    started_at = perf_counter()
+    dataset = SyntheticDataset(
+        num_films, args.users, args.ratings_per_user, args.genres, args.genre_distribution, args.seed)
+    generated_in = perf_counter() - started_at
+
+    logger.info(f"Синтетический каталог: {num_films} фильмов, {dataset.num_ratings} оценок, {generated_in:.1f} с")
+
+    session = InMemorySession(dataset)
+    user_ids = list(dataset.ratings)
+
+    if args.engine == "item":
+        item_engine.model = build_item_similarity_model(*dataset.get_rating_arrays(), item_engine.top_k)
+
+    with in_memory_film_dao(dataset, session):
+
+        await recommendation_cache.invalidate_all()
+        film_catalog.invalidate()
+
+        tracemalloc.start()
+
+        started_at = perf_counter()
+        await film_catalog.get_genre_matrix(session)
+        catalog_load_ms = (perf_counter() - started_at) * 1000
+
+        _, catalog_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        catalog_rows = session.rows_fetched
+
+        # Задержка замеряется без tracemalloc, он заметно замедляет выполнение
+        latencies, rows_fetched = await _run_requests(session, user_ids, args.num_films, args.ranked, args.engine)
+        cached_latencies, cached_rows_fetched = await _run_requests(
+            session, user_ids, args.num_films, args.ranked, args.engine)
+
+        await recommendation_cache.invalidate_all()
+
+        tracemalloc.start()
+        await _run_requests(session, user_ids, args.num_films, args.ranked, args.engine)
+        _, requests_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "num_films": num_films,
+        "num_users": len(user_ids),
+        "num_ratings": dataset.num_ratings,
+        "catalog": {
+            "load_ms": round(catalog_load_ms, 3),
+            "peak_memory_bytes": catalog_peak,
+            "rows_fetched": catalog_rows,
+        },
+        "latency_ms": _summarize(latencies),
+        "cached_latency_ms": _summarize(cached_latencies),
+        "peak_memory_bytes": requests_peak,
+        "rows_fetched": {
+            "total": rows_fetched,
+            "per_request": round(rows_fetched / len(user_ids), 3),
+            "cached_total": cached_rows_fetched,
+        },
+    }
+
+
+def _get_git_commit() -> str | None:
+
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_benchmark(args: argparse.Namespace) -> dict:
+
+    FastAPICache.init(InMemoryBackend(), prefix="benchmark")
+    service.RECOMMENDATIONS_CANDIDATE_SOURCE = args.candidate_source
+
+    results = []
+
+    for num_films in args.sizes:
+        result = await benchmark_size(num_films, args)
+        results.append(result)
+
+        logger.info(
+            f"{num_films} фильмов: p50 {result['latency_ms']['p50']} мс, p95 {result['latency_ms']['p95']} мс, "
+            f"пик памяти {result['peak_memory_bytes'] / 2 ** 20:.1f} МБ, "
+            f"строк на запрос {result['rows_fetched']['per_request']}")
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": _get_git_commit(),
+        "python": platform.python_version(),
+        "params": {
+            "users": args.users,
+            "ratings_per_user": args.ratings_per_user,
+            "genres": args.genres,
+            "genre_distribution": args.genre_distribution,
+            "num_films": args.num_films,
+            "ranked": args.ranked,
+            "engine": args.engine,
+            "candidate_source": args.candidate_source,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description="Замер рекомендательной системы на синтетических каталогах")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--ratings-per-user", type=int, default=20)
+    parser.add_argument("--genres", type=int, default=20)
+    parser.add_argument("--genre-distribution", choices=("uniform", "zipf"), default="zipf")
+    parser.add_argument("--num-films", type=int, default=20)
+    parser.add_argument("--ranked", action="store_true")
+    parser.add_argument("--engine", choices=("genre", "item"), default="genre")
+    parser.add_argument("--candidate-source", choices=("catalog", "sql"), default="catalog")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_recommendations.json")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmark(args))
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+
+    logger.info(f"Результаты сохранены в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
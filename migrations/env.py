@@ -17,6 +17,7 @@ from src.comments.models import *
 from src.reviews.models import *
 from src.films.models import *
 from src.user_actions.models import *
+from src.recommendations.models import *
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,34 @@
+"""add user_recommendations
+
+Revision ID: 3f1b6c9d2a47
+Revises: 20c2a011f70d
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1b6c9d2a47'
+down_revision: Union[str, None] = '20c2a011f70d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('user_recommendations',
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('film_ids', ARRAY(sa.Integer()), nullable=False),
+        sa.Column('scores', ARRAY(sa.Float()), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_recommendations')
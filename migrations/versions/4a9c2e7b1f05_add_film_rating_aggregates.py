@@ -0,0 +1,55 @@
+"""add film rating aggregates
+
+Revision ID: 4a9c2e7b1f05
+Revises: b7e19c3a5d21
+Create Date: 2026-10-18 15:22:54.903126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a9c2e7b1f05'
+down_revision: Union[str, None] = 'b7e19c3a5d21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Из повторных оценок одного пользователя остается последняя
+    op.execute("""
+        DELETE FROM user_film_ratings
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (PARTITION BY user_id, film_id ORDER BY id DESC) AS position
+                FROM user_film_ratings
+            ) AS ratings
+            WHERE ratings.position > 1
+        )
+    """)
+    op.create_index('ix_user_film_ratings_user_id_film_id', 'user_film_ratings', ['user_id', 'film_id'], unique=True)
+
+    op.add_column('films', sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('films', sa.Column('rating_sum', sa.Float(), server_default='0', nullable=False))
+
+    op.execute("""
+        UPDATE films
+        SET rating_count = aggregates.rating_count,
+            rating_sum = aggregates.rating_sum,
+            local_rating = aggregates.rating_sum / aggregates.rating_count
+        FROM (
+            SELECT film_id, count(*) AS rating_count, sum(rating) AS rating_sum
+            FROM user_film_ratings
+            GROUP BY film_id
+        ) AS aggregates
+        WHERE films.id = aggregates.film_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('films', 'rating_sum')
+    op.drop_column('films', 'rating_count')
+    op.drop_index('ix_user_film_ratings_user_id_film_id', table_name='user_film_ratings')
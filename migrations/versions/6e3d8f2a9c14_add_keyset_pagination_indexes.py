@@ -0,0 +1,36 @@
+"""add keyset pagination indexes
+
+Revision ID: 6e3d8f2a9c14
+Revises: 4a9c2e7b1f05
+Create Date: 2026-10-18 16:41:08.217635
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e3d8f2a9c14'
+down_revision: Union[str, None] = '4a9c2e7b1f05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_reviews_film_id_review_rating_id', 'reviews',
+                    ['film_id', sa.text('review_rating DESC'), 'id'], unique=False)
+    op.create_index('ix_comments_film_id_created_at_id', 'comments',
+                    ['film_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_reply_comments_parent_comment_id_id', 'reply_comments',
+                    ['parent_comment_id', 'id'], unique=False)
+    op.create_index('ix_reply_comments_parent_review_id_id', 'reply_comments',
+                    ['parent_review_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_reply_comments_parent_review_id_id', table_name='reply_comments')
+    op.drop_index('ix_reply_comments_parent_comment_id_id', table_name='reply_comments')
+    op.drop_index('ix_comments_film_id_created_at_id', table_name='comments')
+    op.drop_index('ix_reviews_film_id_review_rating_id', table_name='reviews')
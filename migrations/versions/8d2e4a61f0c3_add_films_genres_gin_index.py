@@ -0,0 +1,25 @@
+"""add films genres gin index
+
+Revision ID: 8d2e4a61f0c3
+Revises: 3f1b6c9d2a47
+Create Date: 2026-10-18 12:03:17.540912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2e4a61f0c3'
+down_revision: Union[str, None] = '3f1b6c9d2a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_films_genres', 'films', ['genres'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_films_genres', table_name='films', postgresql_using='gin')
@@ -0,0 +1,27 @@
+"""add films rating_count index
+
+Revision ID: a4d92e6b7c18
+Revises: f3a8c1d5b702
+Create Date: 2026-10-18 21:14:37.502816
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d92e6b7c18'
+down_revision: Union[str, None] = 'f3a8c1d5b702'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_films_rating_count_id', 'films',
+                    [sa.text('rating_count DESC'), 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_films_rating_count_id', table_name='films')
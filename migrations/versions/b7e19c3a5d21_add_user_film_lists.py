@@ -0,0 +1,59 @@
+"""add user_film_lists
+
+Revision ID: b7e19c3a5d21
+Revises: 8d2e4a61f0c3
+Create Date: 2026-10-18 13:41:08.172655
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e19c3a5d21'
+down_revision: Union[str, None] = '8d2e4a61f0c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+LIST_COLUMNS = {
+    'favorite': 'favorite_films',
+    'postponed': 'postponed_films',
+    'abandoned': 'abandoned_films',
+    'planned': 'planned_films',
+    'finished': 'finished_films',
+}
+
+
+def upgrade() -> None:
+    op.create_table('user_film_lists',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('film_id', sa.Integer(), nullable=False),
+        sa.Column('list_type', sa.String(), nullable=False),
+        sa.Column('added_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['film_id'], ['films.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_user_film_lists_user_id_list_type_film_id', 'user_film_lists',
+                    ['user_id', 'list_type', 'film_id'], unique=True)
+
+    # Перенос списков из JSON массивов. Порядок элементов массива сохраняется в added_at,
+    # записи об удаленных фильмах пропускаются
+    for list_type, column in LIST_COLUMNS.items():
+        op.execute(f"""
+            INSERT INTO user_film_lists (user_id, film_id, list_type, added_at)
+            SELECT users.id, films.id, '{list_type}', now() + items.position * interval '1 microsecond'
+            FROM users
+            CROSS JOIN LATERAL unnest(users.{column}) WITH ORDINALITY AS items(film, position)
+            JOIN films ON films.id = (items.film ->> 'id')::integer
+            ON CONFLICT DO NOTHING
+        """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_film_lists_user_id_list_type_film_id', table_name='user_film_lists')
+    op.drop_table('user_film_lists')
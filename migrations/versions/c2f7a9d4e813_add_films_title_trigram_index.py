@@ -0,0 +1,28 @@
+"""add films title trigram index
+
+Revision ID: c2f7a9d4e813
+Revises: 6e3d8f2a9c14
+Create Date: 2026-10-18 17:26:45.381902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2f7a9d4e813'
+down_revision: Union[str, None] = '6e3d8f2a9c14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_films_title_trgm', 'films', [sa.text('lower(title) gin_trgm_ops')],
+                    unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_films_title_trgm', table_name='films', postgresql_using='gin')
@@ -0,0 +1,48 @@
+"""order reply comments by created_at
+
+Revision ID: d81f3b5c2e90
+Revises: a4d92e6b7c18
+Create Date: 2026-10-18 21:52:10.384119
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81f3b5c2e90'
+down_revision: Union[str, None] = 'a4d92e6b7c18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('reply_comments', sa.Column('created_at', sa.TIMESTAMP(timezone=True),
+                                              server_default=sa.text('now()'), nullable=False))
+
+    # Время существующих ответов - время создания их комментариев
+    op.execute("""
+        UPDATE reply_comments
+        SET created_at = comments.created_at
+        FROM comments
+        WHERE reply_comments.comment_id = comments.id AND comments.created_at IS NOT NULL
+    """)
+
+    op.drop_index('ix_reply_comments_parent_comment_id_id', table_name='reply_comments')
+    op.drop_index('ix_reply_comments_parent_review_id_id', table_name='reply_comments')
+    op.create_index('ix_reply_comments_parent_comment_id_created_at_id', 'reply_comments',
+                    ['parent_comment_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_reply_comments_parent_review_id_created_at_id', 'reply_comments',
+                    ['parent_review_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_reply_comments_parent_review_id_created_at_id', table_name='reply_comments')
+    op.drop_index('ix_reply_comments_parent_comment_id_created_at_id', table_name='reply_comments')
+    op.create_index('ix_reply_comments_parent_review_id_id', 'reply_comments',
+                    ['parent_review_id', 'id'], unique=False)
+    op.create_index('ix_reply_comments_parent_comment_id_id', 'reply_comments',
+                    ['parent_comment_id', 'id'], unique=False)
+    op.drop_column('reply_comments', 'created_at')
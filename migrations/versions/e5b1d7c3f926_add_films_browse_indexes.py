@@ -0,0 +1,31 @@
+"""add films browse indexes
+
+Revision ID: e5b1d7c3f926
+Revises: c2f7a9d4e813
+Create Date: 2026-10-18 18:52:13.604217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b1d7c3f926'
+down_revision: Union[str, None] = 'c2f7a9d4e813'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_films_country', 'films', ['country'], unique=False)
+    op.create_index('ix_films_year', 'films', ['year'], unique=False)
+    op.create_index('ix_films_age_rating', 'films', ['age_rating'], unique=False)
+    op.create_index('ix_films_director', 'films', ['director'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_films_director', table_name='films')
+    op.drop_index('ix_films_age_rating', table_name='films')
+    op.drop_index('ix_films_year', table_name='films')
+    op.drop_index('ix_films_country', table_name='films')
@@ -0,0 +1,40 @@
+"""refresh tokens absolute expiry
+
+Revision ID: f3a8c1d5b702
+Revises: e5b1d7c3f926
+Create Date: 2026-10-18 20:14:37.851093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a8c1d5b702'
+down_revision: Union[str, None] = 'e5b1d7c3f926'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # expires_at хранил срок жизни в секундах от created_at
+    op.alter_column('refresh_tokens', 'expires_at',
+                    existing_type=sa.Integer(),
+                    type_=sa.TIMESTAMP(timezone=True),
+                    existing_nullable=False,
+                    postgresql_using="created_at + expires_at * interval '1 second'")
+    op.create_index('ix_refresh_tokens_expires_at', 'refresh_tokens', ['expires_at'], unique=False)
+    op.create_index('ix_refresh_tokens_user_id_expires_at', 'refresh_tokens',
+                    ['user_id', 'expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_refresh_tokens_user_id_expires_at', table_name='refresh_tokens')
+    op.drop_index('ix_refresh_tokens_expires_at', table_name='refresh_tokens')
+    op.alter_column('refresh_tokens', 'expires_at',
+                    existing_type=sa.TIMESTAMP(timezone=True),
+                    type_=sa.Integer(),
+                    existing_nullable=False,
+                    postgresql_using="extract(epoch from expires_at - created_at)::integer")
@@ -0,0 +1,93 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Generic, Hashable, NamedTuple, TypeVar
+
+from .config import (
+    AUTH_TOKEN_CACHE_SIZE,
+    AUTH_TOKEN_CACHE_TTL,
+    AUTH_USER_CACHE_SIZE,
+    AUTH_USER_CACHE_TTL,
+)
+
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """
+    Кэш в памяти процесса с ограничением размера (вытесняются давно не
+    использованные записи) и сроком жизни записей.
+
+    Args:
+        maxsize (int): Максимальное количество записей.
+        ttl (float): Срок жизни записи по умолчанию в секундах.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        self._data: OrderedDict[Hashable, tuple[float, V]] = OrderedDict()
+
+    def get(self, key: Hashable) -> V | None:
+
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+
+        if expires_at <= monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: V, ttl: float | None = None) -> None:
+
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+
+        self._data[key] = (monotonic() + ttl, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class AuthUser(NamedTuple):
+    """
+    Поля пользователя, нужные для проверки личности и прав.
+    Хранятся в кэше вместо объекта User, который привязан к сессии.
+    """
+
+    id: str
+    email: str
+    username: str
+    is_superuser: bool
+
+
+# Идентификатор пользователя по access токену: подпись и срок действия
+# проверяются один раз, запись живет не дольше самого токена
+token_payload_cache: TTLCache[str] = TTLCache(AUTH_TOKEN_CACHE_SIZE, AUTH_TOKEN_CACHE_TTL)
+
+# Поля пользователя по идентификатору; сбрасываются при изменении или удалении
+# пользователя, а изменения из других процессов видны через AUTH_USER_CACHE_TTL секунд
+auth_user_cache: TTLCache[AuthUser] = TTLCache(AUTH_USER_CACHE_SIZE, AUTH_USER_CACHE_TTL)
+
+
+def invalidate_user(user_id: Any) -> None:
+    """ Сбрасывает закэшированные поля пользователя """
+
+    auth_user_cache.pop(user_id)
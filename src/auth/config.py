@@ -18,3 +18,27 @@ MAX_USERNAME_LENGTH = os.environ.get("MAX_USERNAME_LENGTH")
 
 MIN_PASSWORD_LENGTH = os.environ.get("MIN_PASSWORD_LENGTH")
 MAX_PASSWORD_LENGTH = os.environ.get("MAX_PASSWORD_LENGTH")
+
+
+# Алгоритм и параметры новых хешей паролей: pbkdf2_sha256 - число итераций, scrypt - "n,r,p".
+# Пароли со старыми параметрами перехешируются при следующем входе
+PASSWORD_HASH_ALGORITHM = os.environ.get("PASSWORD_HASH_ALGORITHM", "pbkdf2_sha256")
+PASSWORD_HASH_PARAMS = os.environ.get("PASSWORD_HASH_PARAMS", "100000")
+
+# Потоки для хеширования паролей и сколько запросов может ждать свободного потока
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+PASSWORD_HASH_MAX_QUEUE = int(os.environ.get("PASSWORD_HASH_MAX_QUEUE", 100))
+
+# Кэши проверенных access токенов и полей пользователей: размер и срок жизни записей в секундах
+AUTH_TOKEN_CACHE_SIZE = int(os.environ.get("AUTH_TOKEN_CACHE_SIZE", 10000))
+AUTH_TOKEN_CACHE_TTL = int(os.environ.get("AUTH_TOKEN_CACHE_TTL", 300))
+AUTH_USER_CACHE_SIZE = int(os.environ.get("AUTH_USER_CACHE_SIZE", 10000))
+AUTH_USER_CACHE_TTL = int(os.environ.get("AUTH_USER_CACHE_TTL", 60))
+
+# Хранилище сессий (refresh токенов): "database" - таблица refresh_tokens, "redis" - Redis
+SESSION_STORE = os.environ.get("SESSION_STORE", "database")
+# Максимальное количество активных сессий пользователя: при входе сверх него удаляются самые старые
+MAX_USER_SESSIONS = int(os.environ.get("MAX_USER_SESSIONS", 10))
+# Как часто удаляются истекшие сессии, в секундах, и сколько строк удаляется одним запросом
+SESSION_PURGE_INTERVAL = int(os.environ.get("SESSION_PURGE_INTERVAL", 60 * 60))
+SESSION_PURGE_BATCH_SIZE = int(os.environ.get("SESSION_PURGE_BATCH_SIZE", 1000))
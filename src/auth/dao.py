@@ -1,3 +1,8 @@
+from datetime import datetime
+
+from sqlalchemy import Row, delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from .models import User, Refresh_token
 from .schemas import RefreshTokenCreate, RefreshTokenUpdate, UserCreateDB, UserUpdate
 
@@ -7,6 +12,79 @@ from ..dao import BaseDAO
 class UserDAO(BaseDAO[User, UserCreateDB, UserUpdate]):
     model = User
 
+    @classmethod
+    async def find_auth_fields(cls, db: AsyncSession, user_id: str) -> Row | None:
+        """ Возвращает (id, email, username, is_superuser) пользователя по первичному ключу """
+
+        stmt = select(cls.model.id, cls.model.email, cls.model.username, cls.model.is_superuser).where(
+            cls.model.id == user_id)
+        result = await db.execute(stmt)
+
+        return result.one_or_none()
+
 
 class RefreshTokenDAO(BaseDAO[Refresh_token, RefreshTokenCreate, RefreshTokenUpdate]):
     model = Refresh_token
+
+    @classmethod
+    async def delete_expired(cls, db: AsyncSession, batch_size: int) -> int:
+        """
+        Удаляет не больше batch_size истекших сессий. Строки, заблокированные
+        другими транзакциями, пропускаются, поэтому удаление не ждет входов и обновлений токенов.
+
+        Returns:
+            int: Количество удаленных сессий.
+        """
+
+        expired_ids = (
+            select(cls.model.id)
+            .where(cls.model.expires_at <= func.now())
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = delete(cls.model).where(cls.model.id.in_(expired_ids.scalar_subquery()))
+        result = await db.execute(stmt)
+
+        return result.rowcount
+
+    @classmethod
+    async def delete_oldest(cls, db: AsyncSession, user_id: str, keep: int) -> int:
+        """
+        Оставляет пользователю keep сессий с самым поздним сроком действия, остальные удаляет.
+
+        Returns:
+            int: Количество удаленных сессий.
+        """
+
+        kept_ids = (
+            select(cls.model.id)
+            .where(cls.model.user_id == user_id)
+            .order_by(cls.model.expires_at.desc(), cls.model.id.desc())
+            .limit(keep)
+        )
+        stmt = delete(cls.model).where(
+            cls.model.user_id == user_id,
+            cls.model.id.not_in(kept_ids.scalar_subquery()),
+        )
+        result = await db.execute(stmt)
+
+        return result.rowcount
+
+    @classmethod
+    async def replace_token(cls, db: AsyncSession, refresh_token: str, new_refresh_token: str, expires_at: datetime) -> int:
+        """
+        Заменяет refresh токен сессии. При одновременной замене одного токена вторая
+        транзакция после блокировки строки не находит старый токен и ничего не обновляет.
+
+        Returns:
+            int: Количество обновленных сессий, 0 - токен уже использован или удален.
+        """
+
+        stmt = (
+            update(cls.model)
+            .where(cls.model.refresh_token == refresh_token)
+            .values(refresh_token=new_refresh_token, expires_at=expires_at)
+        )
+        result = await db.execute(stmt)
+
+        return result.rowcount
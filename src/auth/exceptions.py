@@ -59,3 +59,8 @@ class UserAlreadyExists(HTTPException):
 class UserAlreadyActive(HTTPException):
     def __init__(self):
         super().__init__(status_code=409, detail="User is already active")
+
+
+class PasswordHashingOverloaded(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=503, detail="Too many authentication requests, try again later")
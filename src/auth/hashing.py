@@ -0,0 +1,207 @@
+import asyncio
+import hashlib
+import hmac
+import secrets
+
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Callable
+
+from loguru import logger
+
+from . import exceptions
+from .config import (
+    PASSWORD_HASH_ALGORITHM,
+    PASSWORD_HASH_PARAMS,
+    PASSWORD_HASH_WORKERS,
+    PASSWORD_HASH_MAX_QUEUE,
+)
+
+
+# Параметры хешей старого формата "соль$хеш", записанных до появления версий
+LEGACY_ALGORITHM = "pbkdf2_sha256"
+LEGACY_PARAMS = "100000"
+
+
+def _pbkdf2_sha256(password: str, salt: str, params: str) -> str:
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), int(params)).hex()
+
+
+def _scrypt(password: str, salt: str, params: str) -> str:
+    n, r, p = (int(param) for param in params.split(","))
+    return hashlib.scrypt(password.encode(), salt=salt.encode(), n=n, r=r, p=p, maxmem=256 * n * r, dklen=32).hex()
+
+
+# Алгоритм и формат его параметров: pbkdf2_sha256 - число итераций, scrypt - "n,r,p"
+HASHERS: dict[str, Callable[[str, str, str], str]] = {
+    "pbkdf2_sha256": _pbkdf2_sha256,
+    "scrypt": _scrypt,
+}
+
+
+class PasswordHasher:
+    """
+    Хеширование и проверка паролей в отдельном пуле потоков.
+
+    PBKDF2 и scrypt из hashlib отпускают GIL, поэтому в потоках они не блокируют
+    цикл событий и выполняются параллельно. Одновременно выполняется не больше
+    workers хешей, еще не больше max_queue запросов ждут очереди; остальным
+    сразу отвечается PasswordHashingOverloaded, чтобы всплеск входов не копил
+    бесконечную очередь.
+
+    Хеш хранится в формате "алгоритм$параметры$соль$хеш", поэтому алгоритм и его
+    стоимость можно менять в конфигурации: старые хеши проверяются со своими
+    параметрами, а needs_rehash подсказывает перехешировать пароль при входе.
+    Хеши старого формата "соль$хеш" считаются pbkdf2_sha256 со 100000 итераций.
+
+    Args:
+        algorithm (str): Алгоритм новых хешей из HASHERS.
+        params (str): Параметры алгоритма новых хешей.
+        workers (int): Количество потоков пула.
+        max_queue (int): Сколько запросов может ждать свободного потока.
+    """
+
+    def __init__(
+        self,
+        algorithm: str = PASSWORD_HASH_ALGORITHM,
+        params: str = PASSWORD_HASH_PARAMS,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_queue: int = PASSWORD_HASH_MAX_QUEUE,
+    ) -> None:
+
+        if algorithm not in HASHERS:
+            raise ValueError(f"Unknown password hash algorithm: {algorithm}")
+
+        self.algorithm = algorithm
+        self.params = params
+        self.workers = workers
+        self.max_queue = max_queue
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hasher")
+        self._semaphore = asyncio.Semaphore(workers)
+
+        self._running = 0
+        self._waiting = 0
+        self._max_waiting = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_time = 0.0
+        self._hash_time = 0.0
+
+    async def hash(self, password: str) -> str:
+        """
+        Хеширует пароль текущим алгоритмом с новой солью.
+
+        Args:
+            password (str): Пароль.
+
+        Returns:
+            str: Хеш в формате "алгоритм$параметры$соль$хеш".
+        """
+
+        salt = secrets.token_hex(16)
+        hashed = await self._run(HASHERS[self.algorithm], password, salt, self.params)
+
+        return f"{self.algorithm}${self.params}${salt}${hashed}"
+
+    async def verify(self, password: str, encoded: str) -> bool:
+        """
+        Проверяет пароль по хешу любого поддерживаемого формата.
+
+        Args:
+            password (str): Пароль.
+            encoded (str): Хеш из базы данных.
+
+        Returns:
+            bool: Совпадает ли пароль.
+        """
+
+        try:
+            algorithm, params, salt, expected = self._parse(encoded)
+            hasher = HASHERS[algorithm]
+        except (KeyError, ValueError):
+            logger.error("Пароль пользователя хранится в неизвестном формате")
+            return False
+
+        hashed = await self._run(hasher, password, salt, params)
+
+        return hmac.compare_digest(hashed, expected)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        """ Проверяет, записан ли хеш не текущим алгоритмом или с другими параметрами """
+
+        try:
+            algorithm, params, _, _ = self._parse(encoded)
+        except ValueError:
+            return True
+
+        return (algorithm, params) != (self.algorithm, self.params)
+
+    def get_stats(self) -> dict:
+        """
+        Возвращает состояние пула: сколько хешей выполняется и ждет очереди,
+        сколько выполнено и отклонено, среднее ожидание и время хеширования.
+        """
+
+        return {
+            "algorithm": self.algorithm,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "running": self._running,
+            "waiting": self._waiting,
+            "max_waiting": self._max_waiting,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "avg_wait_ms": round(self._wait_time / self._completed * 1000, 2) if self._completed else 0.0,
+            "avg_hash_ms": round(self._hash_time / self._completed * 1000, 2) if self._completed else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, hasher: Callable[[str, str, str], str], password: str, salt: str, params: str) -> str:
+
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            self._rejected += 1
+            logger.warning(f"Очередь хеширования паролей переполнена: {self._waiting} запросов ждут")
+            raise exceptions.PasswordHashingOverloaded
+
+        queued_at = perf_counter()
+        self._waiting += 1
+        self._max_waiting = max(self._max_waiting, self._waiting)
+
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+
+        started_at = perf_counter()
+        self._running += 1
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, hasher, password, salt, params)
+
+        finally:
+            self._running -= 1
+            self._semaphore.release()
+
+            self._completed += 1
+            self._wait_time += started_at - queued_at
+            self._hash_time += perf_counter() - started_at
+
+    @staticmethod
+    def _parse(encoded: str) -> tuple[str, str, str, str]:
+
+        parts = encoded.split("$")
+
+        if len(parts) == 2:
+            return (LEGACY_ALGORITHM, LEGACY_PARAMS, *parts)
+
+        if len(parts) == 4:
+            return tuple(parts)
+
+        raise ValueError("Invalid password hash format")
+
+
+password_hasher = PasswordHasher()
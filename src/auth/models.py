@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Annotated
 
-from sqlalchemy import TIMESTAMP, Boolean, ForeignKey, JSON, String
+from sqlalchemy import TIMESTAMP, Boolean, ForeignKey, Index, JSON, String
 from sqlalchemy.orm import  Mapped, mapped_column
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import ARRAY
@@ -28,9 +28,12 @@ class User(Base):
 
 class Refresh_token(Base):
     __tablename__ = 'refresh_tokens'
+    __table_args__ = (
+        Index("ix_refresh_tokens_user_id_expires_at", "user_id", "expires_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     refresh_token: Mapped[str] = mapped_column(index=True)
-    expires_at: Mapped[int]
+    expires_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), index=True)
     created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now())
     user_id: Mapped[str] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
@@ -4,9 +4,11 @@ from fastapi import APIRouter, Depends, Request, Response
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from . import schemas
+from . import exceptions, schemas
 
+from .cache import AuthUser
 from .dependencies import get_current_user
+from .hashing import password_hasher
 from .models import User
 from .service import DatabaseManager
 from ..database import get_async_session
@@ -62,13 +64,14 @@ async def logout(
 @router.get("/me", response_model=schemas.User)
 async def get_me(
     db: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthUser = Depends(get_current_user)
 ) -> User | None:
 
     db_manager = DatabaseManager(db)
     user_crud = db_manager.user_crud
 
-    user = await user_crud.get_existing_user(username=current_user.username)
+    user = await user_crud.get_existing_user(user_id=current_user.id)
+    await user_crud.load_film_lists([user])
 
     return user
 
@@ -86,6 +89,7 @@ async def get_user(
     user_crud = db_manager.user_crud
 
     user = await user_crud.get_existing_user(token=token, username=username, email=email, user_id=user_id)
+    await user_crud.load_film_lists([user])
 
     return user
 
@@ -99,7 +103,18 @@ async def get_all_users(
     db_manager = DatabaseManager(db)
     user_crud = db_manager.user_crud
 
-    return await user_crud.get_all_users(offset=offset, limit=limit)
+    users = await user_crud.get_all_users(offset=offset, limit=limit)
+
+    return await user_crud.load_film_lists(users)
+
+
+@router.get("/password_hashing_stats")
+async def password_hashing_stats(current_user: AuthUser = Depends(get_current_user)):
+
+    if not current_user.is_superuser:
+        raise exceptions.NotEnoughPermissions
+
+    return password_hasher.get_stats()
 
 
 @router.patch("/refresh_tokens")
@@ -1,4 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field, validator
+from datetime import datetime
 from typing import List
 
 from .config import (
@@ -59,7 +60,7 @@ class UserCreateDB(UserBase):
 
 class RefreshTokenCreate(BaseModel):
     refresh_token: str
-    expires_at: int
+    expires_at: datetime
     user_id: str
 
 
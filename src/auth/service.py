@@ -8,9 +8,11 @@ from fastapi.responses import JSONResponse
 
 from sqlalchemy import or_
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 from loguru import logger
 
 from . import models, exceptions, schemas, utils
+from .cache import AuthUser, auth_user_cache, invalidate_user, token_payload_cache
 from .config import (
     TOKEN_SECRET_KEY,
     ALGORITHM,
@@ -19,7 +21,9 @@ from .config import (
 )
 from .dao import RefreshTokenDAO, UserDAO
 from .models import Refresh_token, User
+from .sessions import RefreshSession, get_session_store
 
+from ..user_actions.dao import UserFilmListDAO
 from ..utils import get_unique_id
 
 
@@ -58,22 +62,32 @@ class UserCRUD:
         try:
 
             user = await self.get_existing_user(username=username)
-            await utils.validate_password(password=password, hashed_password=user.hashed_password)
+            needs_rehash = await utils.validate_password(password=password, hashed_password=user.hashed_password)
+
+            if needs_rehash:
+                await self._rehash_password(user, password)
 
             return user
 
         except AttributeError:
             raise exceptions.InvalidAuthenthicationCredential
 
+    async def _rehash_password(self, user: User, password: str) -> None:
+
+        # Пароль известен только при входе, поэтому хеш обновляется здесь
+        hashed_password = await utils.get_hashed_password(password)
+
+        await UserDAO.update(self.db, User.id == user.id, obj_in={"hashed_password": hashed_password})
+        await self.db.commit()
+
+        logger.info(f"Пароль пользователя {user.id} перехеширован текущими параметрами")
+
     async def logout(self, refresh_token: str = None) -> JSONResponse:
 
         if not refresh_token:
             return exceptions.InactiveUser
 
-        refresh_session = await RefreshTokenDAO.find_one_or_none(self.db, Refresh_token.refresh_token == refresh_token)
-
-        if refresh_session:
-            await RefreshTokenDAO.delete(self.db, id=refresh_session.id)
+        await get_session_store(self.db).delete(refresh_token)
 
         response = JSONResponse(content={
             "message": "logout successful",
@@ -94,12 +108,39 @@ class UserCRUD:
         if token:
             user_id = await TokenCrud.get_access_token_payload(db=self.db, access_token=token)
 
-        user = await UserDAO.find_one_or_none(self.db, or_(
-            User.email == email,
-            User.username == username,
-            User.id == user_id))
+        # Отдельный запрос по каждому полю использует его уникальный индекс, в отличие от OR
+        for column, value in ((User.id, user_id), (User.username, username), (User.email, email)):
+            if value:
+                user = await UserDAO.find_one_or_none(self.db, column == value)
+
+                if user is not None:
+                    return user
+
+        return None
+
+    async def get_auth_user(self, user_id: str) -> AuthUser | None:
+        """
+        Возвращает поля пользователя, нужные для проверки личности и прав,
+        из кэша или одним запросом по первичному ключу.
+
+        Args:
+            user_id (str): Идентификатор пользователя.
 
-        return user
+        Returns:
+            AuthUser | None: Поля пользователя или None, если пользователь не найден.
+        """
+
+        auth_user = auth_user_cache.get(user_id)
+
+        if auth_user is None:
+            row = await UserDAO.find_auth_fields(self.db, user_id)
+            if row is None:
+                return None
+
+            auth_user = AuthUser(*row)
+            auth_user_cache.set(user_id, auth_user)
+
+        return auth_user
 
     # Получение списка всех пользователей с поддержкой пагинации
 
@@ -109,17 +150,39 @@ class UserCRUD:
 
         return users
 
+    async def load_film_lists(self, users: list[User]) -> list[User]:
+        """
+        Заполняет списки фильмов пользователей из таблицы user_film_lists одним запросом.
+        Значения устанавливаются без пометки об изменении, поэтому столбцы-массивы
+        в таблице users не перезаписываются.
+
+        Args:
+            users (list[User]): Пользователи.
+
+        Returns:
+            list[User]: Те же пользователи с заполненными списками фильмов.
+        """
+
+        users = [user for user in users if user is not None]
+        film_lists = await UserFilmListDAO.find_film_lists(self.db, [user.id for user in users])
+
+        for user in users:
+            for attribute, films in film_lists[user.id].items():
+                set_committed_value(user, attribute, films)
+
+        return users
+
     async def _get_refresh_token_by_user_id(self, user: models.User) -> models.Refresh_token:
 
         refresh_token = await RefreshTokenDAO.find_one_or_none(self.db, Refresh_token.user_id == user.id)
 
         return refresh_token
 
-    async def get_user_by_access_token(self, access_token: str) -> User | None:
+    async def get_user_by_access_token(self, access_token: str) -> AuthUser | None:
 
         user_id = await TokenCrud.get_access_token_payload(self.db, access_token=access_token)
 
-        return await self.get_existing_user(user_id=user_id)
+        return await self.get_auth_user(user_id)
 
     async def abort_user_sessions(self, email: str = None, username: str = None, user_id: str = None) -> None:
 
@@ -131,10 +194,7 @@ class UserCRUD:
         if not user:
             raise exceptions.UserDoesNotExist
 
-        refresh_token = await RefreshTokenDAO.find_one_or_none(self.db, Refresh_token.user_id == user.id)
-
-        if refresh_token:
-            await RefreshTokenDAO.delete(self.db, user_id=refresh_token.user_id)
+        await get_session_store(self.db).delete_user_sessions(user.id)
 
         await UserDAO.update(
             self.db,
@@ -144,6 +204,8 @@ class UserCRUD:
 
         await self.db.commit()
 
+        invalidate_user(user.id)
+
         return {"message": "Delete successful"}
 
     async def delete_user(self, email: str = None, username: str = None, user_id: str = None) -> None:
@@ -156,18 +218,18 @@ class UserCRUD:
         if not user:
             raise exceptions.UserDoesNotExist
 
-        refresh_token = await RefreshTokenDAO.find_one_or_none(self.db, Refresh_token.user_id == user.id)
-
-        if refresh_token:
-            await RefreshTokenDAO.delete(self.db, user_id=refresh_token.user_id)
+        await get_session_store(self.db).delete_user_sessions(user.id)
 
-        await UserDAO.delete(self.db, or_(
+        deleted_ids = await UserDAO.delete(self.db, or_(
             user_id == User.id,
             username == User.username,
             email == User.email))
 
         await self.db.commit()
 
+        for deleted_id in deleted_ids:
+            invalidate_user(deleted_id)
+
         return {"Message": "Delete was successful"}
 
 
@@ -211,25 +273,19 @@ class TokenCrud:
         access_token = await self._create_access_token(user_id)
         refresh_token = await self._create_refresh_token()
 
-        refresh_token_expires = timedelta(
-            days=int(REFRESH_TOKEN_EXPIRE_DAYS))
-
-        db_token = await RefreshTokenDAO.add(
-            self.db,
-            schemas.RefreshTokenCreate(
-                user_id=user_id,
-                refresh_token=refresh_token,
-                expires_at=refresh_token_expires.total_seconds()
-            )
-        )
+        # При превышении лимита сессий пользователя удаляются самые старые
+        await get_session_store(self.db).add(RefreshSession(refresh_token, user_id, self._get_refresh_token_expiration()))
         await self.db.commit()
-        await self.db.refresh(db_token)
 
         if isDev:
             await self._set_cookies(response=response, access_token=access_token, refresh_token=refresh_token)
 
         return schemas.Token(access_token=access_token, refresh_token=refresh_token)
 
+    @staticmethod
+    def _get_refresh_token_expiration() -> datetime:
+        return datetime.now(timezone.utc) + timedelta(days=int(REFRESH_TOKEN_EXPIRE_DAYS))
+
     async def _set_cookies(self, response: Response, access_token: str, refresh_token: str):
         response.set_cookie(
             'access_token',
@@ -245,23 +301,33 @@ class TokenCrud:
         )
 
     async def get_access_token_payload(db: AsyncSession, access_token: str):
+
+        # Токен уже проверялся: запись в кэше живет не дольше срока действия токена
+        user_id = token_payload_cache.get(access_token)
+        if user_id is not None:
+            return user_id
+
         try:
             payload = jwt.decode(access_token,
                                  TOKEN_SECRET_KEY,
                                  algorithms=[ALGORITHM])
             user_id = payload.get("sub")
-            return user_id
 
         except jwt.ExpiredSignatureError as e:
-            logger.opt(exceptions=e).critical(
+            logger.opt(exception=e).critical(
                 "Error in get_access_token_payload")
             raise exceptions.TokenExpired
 
-        except jwt.DecodeError:
-            logger.opt(exceptions=e).critical(
+        except jwt.DecodeError as e:
+            logger.opt(exception=e).critical(
                 "Error in get_access_token_payload")
             raise exceptions.InvalidToken
 
+        if user_id is not None and "exp" in payload:
+            token_payload_cache.set(access_token, user_id, ttl=payload["exp"] - datetime.now(timezone.utc).timestamp())
+
+        return user_id
+
     async def refresh_token(self, token: str, response: Response) -> schemas.Token:
 
         refresh_token_session, user = await self._check_refresh_token_session(token)
@@ -269,17 +335,8 @@ class TokenCrud:
         access_token = await self._create_access_token(data=user.id)
         refresh_token = await self._create_refresh_token()
 
-        refresh_token_expires = timedelta(days=int(REFRESH_TOKEN_EXPIRE_DAYS))
-
-        await RefreshTokenDAO.update(
-            self.db,
-            Refresh_token.id == refresh_token_session.id,
-            obj_in=schemas.RefreshTokenUpdate(
-                refresh_token=refresh_token,
-                expires_at=refresh_token_expires.total_seconds(),
-                user_id=user.id,
-            )
-        )
+        await get_session_store(self.db).replace(
+            token, RefreshSession(refresh_token, user.id, self._get_refresh_token_expiration()))
         await self.db.commit()
 
         await self._set_cookies(response=response, access_token=access_token, refresh_token=refresh_token)
@@ -288,14 +345,16 @@ class TokenCrud:
 
     async def _check_refresh_token_session(self, token: str):
 
-        refresh_token_session = await RefreshTokenDAO.find_one_or_none(self.db, Refresh_token.refresh_token == token)
+        session_store = get_session_store(self.db)
+        refresh_token_session = await session_store.get(token)
 
         if refresh_token_session is None:
             raise exceptions.InvalidToken
 
-        if datetime.now(timezone.utc) >= refresh_token_session.created_at + timedelta(seconds=refresh_token_session.expires_at):
+        if datetime.now(timezone.utc) >= refresh_token_session.expires_at:
 
-            await RefreshTokenDAO.delete(id=refresh_token_session.id)
+            await session_store.delete(token)
+            await self.db.commit()
             raise exceptions.TokenExpired
 
         user = await UserDAO.find_one_or_none(self.db, id=refresh_token_session.user_id)
@@ -0,0 +1,245 @@
+import asyncio
+import json
+
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+from loguru import logger
+from redis import asyncio as aioredis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import exceptions
+from .config import (
+    SESSION_STORE,
+    MAX_USER_SESSIONS,
+    SESSION_PURGE_INTERVAL,
+    SESSION_PURGE_BATCH_SIZE,
+)
+from .dao import RefreshTokenDAO
+from .models import Refresh_token
+from .schemas import RefreshTokenCreate
+
+from ..config import REDIS_URL
+from ..database import async_session_maker
+
+
+class RefreshSession(NamedTuple):
+    refresh_token: str
+    user_id: str
+    expires_at: datetime
+
+
+class DatabaseSessionStore:
+    """
+    Сессии в таблице refresh_tokens. Изменения не фиксируются: транзакцией
+    управляет вызывающий код, как и для остальных DAO.
+
+    Args:
+        db (AsyncSession): Сессия для работы с базой данных.
+        max_sessions (int): Максимальное количество активных сессий пользователя.
+    """
+
+    def __init__(self, db: AsyncSession, max_sessions: int = MAX_USER_SESSIONS) -> None:
+        self.db = db
+        self.max_sessions = max_sessions
+
+    async def add(self, session: RefreshSession) -> None:
+
+        await RefreshTokenDAO.add(self.db, RefreshTokenCreate(**session._asdict()))
+        await RefreshTokenDAO.delete_oldest(self.db, session.user_id, keep=self.max_sessions)
+
+    async def get(self, refresh_token: str) -> RefreshSession | None:
+
+        db_token = await RefreshTokenDAO.find_one_or_none(self.db, Refresh_token.refresh_token == refresh_token)
+
+        if db_token is None:
+            return None
+
+        return RefreshSession(db_token.refresh_token, db_token.user_id, db_token.expires_at)
+
+    async def replace(self, refresh_token: str, session: RefreshSession) -> None:
+
+        updated = await RefreshTokenDAO.replace_token(
+            self.db, refresh_token, session.refresh_token, session.expires_at)
+
+        # Токен уже заменил другой запрос
+        if not updated:
+            raise exceptions.InvalidToken
+
+    async def delete(self, refresh_token: str) -> None:
+        await RefreshTokenDAO.delete(self.db, Refresh_token.refresh_token == refresh_token)
+
+    async def delete_user_sessions(self, user_id: str) -> None:
+        await RefreshTokenDAO.delete(self.db, Refresh_token.user_id == user_id)
+
+    @staticmethod
+    async def purge_expired(batch_size: int = SESSION_PURGE_BATCH_SIZE) -> int:
+        """
+        Удаляет истекшие сессии пакетами по batch_size строк, каждый пакет в своей транзакции,
+        чтобы не держать блокировки на всей таблице.
+
+        Returns:
+            int: Количество удаленных сессий.
+        """
+
+        purged = 0
+
+        while True:
+            async with async_session_maker() as db:
+                deleted = await RefreshTokenDAO.delete_expired(db, batch_size)
+                await db.commit()
+
+            purged += deleted
+
+            if deleted < batch_size:
+                return purged
+
+
+class RedisSessionStore:
+    """
+    Сессии в Redis: ключ refresh_session:{токен} с данными сессии и сроком жизни до ее
+    истечения и сортированное множество refresh_sessions:{пользователь} токенов по сроку
+    действия для ограничения количества сессий и выхода со всех устройств.
+    Истекшие сессии удаляет сам Redis, истекшие токены в множествах пользователей
+    удаляются при следующем входе пользователя.
+
+    Args:
+        redis (aioredis.Redis): Клиент Redis.
+        max_sessions (int): Максимальное количество активных сессий пользователя.
+    """
+
+    def __init__(self, redis: aioredis.Redis, max_sessions: int = MAX_USER_SESSIONS) -> None:
+        self.redis = redis
+        self.max_sessions = max_sessions
+
+    async def add(self, session: RefreshSession) -> None:
+
+        user_key = self._get_user_key(session.user_id)
+        expires_at = int(session.expires_at.timestamp())
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(self._get_session_key(session.refresh_token), self._dump(session), exat=expires_at)
+            pipe.zadd(user_key, {session.refresh_token: expires_at})
+            pipe.zremrangebyscore(user_key, "-inf", datetime.now(timezone.utc).timestamp())
+            pipe.expireat(user_key, expires_at)
+            await pipe.execute()
+
+        # Самые старые сессии сверх лимита
+        excess_tokens = await self.redis.zrange(user_key, 0, -self.max_sessions - 1)
+
+        if excess_tokens:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.delete(*(self._get_session_key(token) for token in excess_tokens))
+                pipe.zrem(user_key, *excess_tokens)
+                await pipe.execute()
+
+    async def get(self, refresh_token: str) -> RefreshSession | None:
+
+        value = await self.redis.get(self._get_session_key(refresh_token))
+
+        return None if value is None else self._load(refresh_token, value)
+
+    async def replace(self, refresh_token: str, session: RefreshSession) -> None:
+
+        # GETDEL забирает сессию атомарно: из одновременных запросов с одним токеном
+        # новую сессию получает только первый
+        value = await self.redis.getdel(self._get_session_key(refresh_token))
+
+        if value is None:
+            raise exceptions.InvalidToken
+
+        old_session = self._load(refresh_token, value)
+        await self.redis.zrem(self._get_user_key(old_session.user_id), refresh_token)
+
+        await self.add(session)
+
+    async def delete(self, refresh_token: str) -> None:
+
+        session = await self.get(refresh_token)
+
+        if session is None:
+            return
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self._get_session_key(refresh_token))
+            pipe.zrem(self._get_user_key(session.user_id), refresh_token)
+            await pipe.execute()
+
+    async def delete_user_sessions(self, user_id: str) -> None:
+
+        user_key = self._get_user_key(user_id)
+        tokens = await self.redis.zrange(user_key, 0, -1)
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if tokens:
+                pipe.delete(*(self._get_session_key(token) for token in tokens))
+            pipe.delete(user_key)
+            await pipe.execute()
+
+    @staticmethod
+    async def purge_expired(batch_size: int = SESSION_PURGE_BATCH_SIZE) -> int:
+        # Ключи сессий истекают в Redis сами
+        return 0
+
+    @staticmethod
+    def _get_session_key(refresh_token: str) -> str:
+        return f"refresh_session:{refresh_token}"
+
+    @staticmethod
+    def _get_user_key(user_id: str) -> str:
+        return f"refresh_sessions:{user_id}"
+
+    @staticmethod
+    def _dump(session: RefreshSession) -> str:
+        return json.dumps({"user_id": session.user_id, "expires_at": session.expires_at.isoformat()})
+
+    @staticmethod
+    def _load(refresh_token: str, value: str) -> RefreshSession:
+        data = json.loads(value)
+        return RefreshSession(refresh_token, data["user_id"], datetime.fromisoformat(data["expires_at"]))
+
+
+_redis: aioredis.Redis | None = None
+
+
+def get_session_store(db: AsyncSession) -> DatabaseSessionStore | RedisSessionStore:
+    """
+    Возвращает хранилище сессий, выбранное в SESSION_STORE.
+
+    Args:
+        db (AsyncSession): Сессия для работы с базой данных.
+
+    Returns:
+        DatabaseSessionStore | RedisSessionStore: Хранилище сессий.
+    """
+
+    global _redis
+
+    if SESSION_STORE == "redis":
+        if _redis is None:
+            _redis = aioredis.from_url(REDIS_URL, encoding="utf8", decode_responses=True)
+
+        return RedisSessionStore(_redis)
+
+    if SESSION_STORE != "database":
+        raise ValueError(f"Unknown session store: {SESSION_STORE}")
+
+    return DatabaseSessionStore(db)
+
+
+async def run_session_purge_loop(interval: float = SESSION_PURGE_INTERVAL) -> None:
+    """ Периодически удаляет истекшие сессии """
+
+    store = RedisSessionStore if SESSION_STORE == "redis" else DatabaseSessionStore
+
+    while True:
+        try:
+            purged = await store.purge_expired()
+
+            if purged:
+                logger.info(f"Удалено истекших сессий: {purged}")
+
+        except Exception as e:
+            logger.opt(exception=e).critical("Error in run_session_purge_loop")
+
+        await asyncio.sleep(interval)
@@ -1,10 +1,10 @@
-import hashlib
 import random
 import string
 
 from typing import Dict, Optional
 
 from . import exceptions
+from .hashing import password_hasher
 from fastapi import HTTPException, Request, status
 from fastapi.security import OAuth2
 from fastapi.security.utils import get_authorization_scheme_param
@@ -49,39 +49,21 @@ async def get_random_string(length=16):
 
 
 # Проверка пароля на соответствие хешированному паролю
-async def validate_password(password: str, hashed_password: str):
+async def validate_password(password: str, hashed_password: str) -> bool:
 
-    """ Проверяет, что хеш пароля совпадает c хешем из БД """
+    """
+    Проверяет, что хеш пароля совпадает c хешем из БД.
+    Возвращает True, если хеш записан устаревшими параметрами и пароль нужно перехешировать.
+    """
 
-    # Разделение хеша пароля на соль и хешированную часть
-    salt, hashed = hashed_password.split("$")
-
-    # Сравнение хешированного пароля
-    if not await hash_password(password, salt) == hashed:
+    if not await password_hasher.verify(password, hashed_password):
         raise exceptions.InvalidAuthenthicationCredential
 
-
-# Метод для хеширования пароля с учетом соли
-async def hash_password(password: str, salt: str = None):
-
-    """ Хеширует пароль c солью """
-
-    # Если соль не указана, генерируем случайную соль
-    if salt is None:
-        salt = await get_random_string()
-
-    # Применение хэш-функции PBKDF2 к паролю и соли
-    enc = hashlib.pbkdf2_hmac(
-        "sha256", password.encode(), salt.encode(), 100_000)
-
-    return enc.hex()
+    return password_hasher.needs_rehash(hashed_password)
 
 
 async def get_hashed_password(password: str):
 
-    salt = await get_random_string()
-    hash = await hash_password(password, salt)
-
-    hashed_password = f"{salt}${hash}"
+    """ Хеширует пароль c новой солью текущим алгоритмом (см. hashing.PasswordHasher) """
 
-    return hashed_password
+    return await password_hasher.hash(password)
@@ -0,0 +1,155 @@
+import asyncio
+
+from typing import Awaitable, Callable
+
+from loguru import logger
+from redis import asyncio as aioredis
+
+from .config import COMMENTS_BROADCAST_BACKEND
+
+from ..config import REDIS_URL
+
+
+# Пауза перед повторным чтением из Redis после первой ошибки и максимальная пауза, в секундах
+LISTEN_RETRY_DELAY = 0.5
+LISTEN_MAX_RETRY_DELAY = 30.0
+
+# Доставка сообщения о комментарии подключенным к этому процессу клиентам фильма
+DeliverCallback = Callable[[int, str], Awaitable[None]]
+
+
+class MemoryBroadcastBackend:
+    """
+    Рассылка внутри процесса: сообщение сразу доставляется клиентам этого процесса.
+    Подходит, только если приложение запущено одним воркером.
+    """
+
+    def __init__(self) -> None:
+        self._deliver: DeliverCallback | None = None
+
+    def set_deliver(self, deliver: DeliverCallback) -> None:
+        self._deliver = deliver
+
+    async def subscribe(self, film_id: int) -> None:
+        pass
+
+    async def unsubscribe(self, film_id: int) -> None:
+        pass
+
+    async def publish(self, film_id: int, message: str) -> None:
+        await self._deliver(film_id, message)
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisBroadcastBackend:
+    """
+    Рассылка через Redis pub/sub с каналом comments:{film_id} на каждый фильм.
+
+    Сообщение публикуется один раз, каждый воркер подписан на каналы фильмов,
+    к которым подключены его клиенты, и доставляет полученные сообщения им.
+    Подписка оформляется при первом подключении к фильму и снимается после
+    последнего отключения. При разрыве соединения клиент Redis переподключается
+    и восстанавливает подписки сам; сообщения, опубликованные во время разрыва, теряются.
+
+    Args:
+        redis_url (str): Адрес Redis.
+    """
+
+    channel_prefix = "comments:"
+
+    def __init__(self, redis_url: str = REDIS_URL) -> None:
+        self._redis = aioredis.from_url(redis_url, encoding="utf8", decode_responses=True)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._deliver: DeliverCallback | None = None
+        self._listener: asyncio.Task | None = None
+
+    def set_deliver(self, deliver: DeliverCallback) -> None:
+        self._deliver = deliver
+
+    async def subscribe(self, film_id: int) -> None:
+
+        await self._pubsub.subscribe(self._get_channel(film_id))
+
+        # Соединение pub/sub создается при первой подписке, после этого можно слушать
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def unsubscribe(self, film_id: int) -> None:
+        await self._pubsub.unsubscribe(self._get_channel(film_id))
+
+    async def publish(self, film_id: int, message: str) -> None:
+        await self._redis.publish(self._get_channel(film_id), message)
+
+    async def close(self) -> None:
+
+        if self._listener is not None:
+            self._listener.cancel()
+
+        await self._pubsub.close()
+        await self._redis.close()
+
+    async def _listen(self) -> None:
+
+        # Количество ошибок подряд: ошибка логируется один раз за серию, паузы растут экспоненциально
+        failures = 0
+
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+
+            except asyncio.CancelledError:
+                raise
+
+            except Exception as e:
+                if not failures:
+                    logger.opt(exception=e).error("Error in RedisBroadcastBackend._listen")
+
+                failures += 1
+                await asyncio.sleep(min(LISTEN_RETRY_DELAY * 2 ** (failures - 1), LISTEN_MAX_RETRY_DELAY))
+                continue
+
+            if failures:
+                logger.info(f"Получение комментариев из Redis восстановлено после {failures} ошибок")
+                failures = 0
+
+            if message is None or message["type"] != "message":
+                continue
+
+            try:
+                film_id = int(message["channel"].removeprefix(self.channel_prefix))
+                await self._deliver(film_id, message["data"])
+
+            except asyncio.CancelledError:
+                raise
+
+            except Exception as e:
+                # Ошибка доставки одного сообщения не связана с соединением с Redis
+                logger.opt(exception=e).error("Error in RedisBroadcastBackend._listen deliver")
+
+    def _get_channel(self, film_id: int) -> str:
+        return f"{self.channel_prefix}{film_id}"
+
+
+BROADCAST_BACKENDS = {
+    "memory": MemoryBroadcastBackend,
+    "redis": RedisBroadcastBackend,
+}
+
+
+def get_broadcast_backend(name: str = COMMENTS_BROADCAST_BACKEND) -> MemoryBroadcastBackend | RedisBroadcastBackend:
+    """
+    Создает бэкенд рассылки комментариев по имени из BROADCAST_BACKENDS.
+
+    Args:
+        name (str): Имя бэкенда: "memory" или "redis".
+
+    Returns:
+        MemoryBroadcastBackend | RedisBroadcastBackend: Бэкенд рассылки.
+    """
+
+    if name not in BROADCAST_BACKENDS:
+        raise ValueError(f"Unknown comments broadcast backend: {name}")
+
+    return BROADCAST_BACKENDS[name]()
@@ -7,3 +7,14 @@ load_dotenv()
 
 GUEST_NAME = os.environ.get('GUEST_NAME')
 GUEST_ID = os.environ.get('GUEST_ID')
+
+# Рассылка новых комментариев по websocket: "memory" - внутри процесса (один воркер),
+# "redis" - через Redis pub/sub между всеми воркерами
+COMMENTS_BROADCAST_BACKEND = os.environ.get("COMMENTS_BROADCAST_BACKEND", "memory")
+
+# Сколько сообщений может ждать отправки одному websocket клиенту и сколько секунд ждать отправки одного сообщения
+COMMENTS_WS_QUEUE_SIZE = int(os.environ.get("COMMENTS_WS_QUEUE_SIZE", 100))
+COMMENTS_WS_SEND_TIMEOUT = float(os.environ.get("COMMENTS_WS_SEND_TIMEOUT", 5))
+# Что делать с клиентом, очередь которого заполнена: "disconnect" - отключить,
+# "drop_oldest" - выбросить самое старое сообщение из очереди
+COMMENTS_WS_SLOW_CONSUMER_POLICY = os.environ.get("COMMENTS_WS_SLOW_CONSUMER_POLICY", "disconnect")
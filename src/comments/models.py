@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import TIMESTAMP, ForeignKey
+from sqlalchemy import TIMESTAMP, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 
@@ -9,6 +9,9 @@ from ..database import Base
     
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        Index("ix_comments_film_id_created_at_id", "film_id", "created_at", "id"),
+    )
 
     id: Mapped[str] = mapped_column(primary_key=True, nullable=False, index=True)
     film_id: Mapped[int] = mapped_column(ForeignKey("films.id", ondelete="CASCADE"), nullable=True)
@@ -20,8 +23,14 @@ class Comment(Base):
     
 class ReplyComment(Base):
     __tablename__ = "reply_comments"
+    __table_args__ = (
+        Index("ix_reply_comments_parent_comment_id_created_at_id", "parent_comment_id", "created_at", "id"),
+        Index("ix_reply_comments_parent_review_id_created_at_id", "parent_review_id", "created_at", "id"),
+    )
     
     id: Mapped[str] = mapped_column(primary_key=True)
     comment_id: Mapped[str] = mapped_column(ForeignKey('comments.id', ondelete="CASCADE"))
     parent_comment_id: Mapped[str] = mapped_column(nullable=True)
-    parent_review_id: Mapped[int] = mapped_column(nullable=True)
\ No newline at end of file
+    parent_review_id: Mapped[int] = mapped_column(nullable=True)
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True),
+                                                 server_default=func.now())
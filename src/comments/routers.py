@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect
 from fastapi.responses import JSONResponse
 
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -8,6 +8,7 @@ from . import schemas
 from .models import Comment
 from .service import DatabaseManager, ConnectionManager
 
+from ..config import PAGE_MAX_LIMIT
 from ..database import get_async_session
 
 
@@ -24,9 +25,9 @@ async def create_comment_ws(
     db_manager = DatabaseManager(db)
     comment_crud = db_manager.comment_crud
 
-    await connection_manager.connect(film_id, websocket)
-
     try:
+        await connection_manager.connect(film_id, websocket)
+
         while True:
             comment_data = await websocket.receive_json()
             comment = schemas.CommentCreate(**comment_data)
@@ -37,6 +38,9 @@ async def create_comment_ws(
             await connection_manager.broadcast(film_id, comment_obj)
 
     except WebSocketDisconnect:
+        pass
+
+    finally:
         await connection_manager.disconnect(film_id, websocket)
 
 
@@ -57,14 +61,15 @@ async def create_comment(
 @router.get("/get_all_comments")
 async def get_all_comments(
     film_id: int = None,
-    offset: int = 0,
-    limit: int = 10,
+    cursor: str = None,
+    offset: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(10, ge=1, le=PAGE_MAX_LIMIT),
     db: AsyncSession = Depends(get_async_session),
 ):
     db_manager = DatabaseManager(db)
     comment_crud = db_manager.comment_crud
 
-    return await comment_crud.get_all_comments(film_id=film_id, offset=offset, limit=limit)
+    return await comment_crud.get_all_comments(film_id=film_id, cursor=cursor, offset=offset, limit=limit)
 
 
 @router.patch("/update_comment", response_model=schemas.CommentUpdate)
@@ -102,8 +107,9 @@ async def delete_comment(
 async def get_all_replies(
     parent_review_id: int = None,
     parent_comment_id: str = None,
-    offset: int = 0,
-    limit: int = 10,
+    cursor: str = None,
+    offset: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(10, ge=1, le=PAGE_MAX_LIMIT),
     db: AsyncSession = Depends(get_async_session)
 ):
 
@@ -113,6 +119,6 @@ async def get_all_replies(
     replies = await comment_crud.get_all_replies(
         parent_review_id=parent_review_id,
         parent_comment_id=parent_comment_id,
-        offset=offset, limit=limit)
+        cursor=cursor, offset=offset, limit=limit)
 
     return replies
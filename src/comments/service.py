@@ -1,8 +1,10 @@
+import asyncio
+from collections import Counter
 from datetime import datetime
 from json import JSONEncoder
 import json
 from uuid import uuid4
-from fastapi import WebSocket
+from fastapi import WebSocket, status
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -11,7 +13,14 @@ from loguru import logger
 from . import schemas
 from .dao import CommentDAO, ReplyCommentDAO
 from .models import Comment, ReplyComment
-from .config import GUEST_NAME, GUEST_ID
+from .broadcast import MemoryBroadcastBackend, RedisBroadcastBackend, get_broadcast_backend
+from .config import (
+    GUEST_NAME,
+    GUEST_ID,
+    COMMENTS_WS_QUEUE_SIZE,
+    COMMENTS_WS_SEND_TIMEOUT,
+    COMMENTS_WS_SLOW_CONSUMER_POLICY,
+)
 
 from ..utils import check_record_existence, get_unique_id
 from ..auth.service import DatabaseManager as AuthManager
@@ -118,19 +127,36 @@ class CommentCRUD:
             )
             return await self._create_reply_comment(reply_data)
 
-    async def get_all_replies(self, *filter, offset: int = 0, limit: int = 100, **filter_by):
+    async def get_all_replies(self, *filter, cursor: str = None, offset: int = 0, limit: int = 100, **filter_by) -> dict:
 
-        replies = await ReplyCommentDAO.find_all(self.db, *filter, offset=offset, limit=limit, **filter_by)
+        # id ответа случайный, поэтому ответы упорядочены по времени создания
+        replies, next_cursor = await ReplyCommentDAO.find_page(
+            self.db,
+            *filter,
+            order_by=[(ReplyComment.created_at, False), (ReplyComment.id, False)],
+            cursor=cursor,
+            offset=offset,
+            limit=limit,
+            **filter_by,
+        )
 
-        return replies
+        return {"items": replies, "next_cursor": next_cursor}
 
-    async def get_all_comments(self, *filter, offset: int = 0, limit: int = 100, **filter_by) -> list[Comment]:
+    async def get_all_comments(self, *filter, cursor: str = None, offset: int = 0, limit: int = 100, **filter_by) -> dict:
 
         logger.info("Получаю список все коментарии фильма")
-        comments = await CommentDAO.find_all(self.db, *filter, offset=offset, limit=limit, **filter_by)
+        comments, next_cursor = await CommentDAO.find_page(
+            self.db,
+            *filter,
+            order_by=[(Comment.created_at, False), (Comment.id, False)],
+            cursor=cursor,
+            offset=offset,
+            limit=limit,
+            **filter_by,
+        )
         logger.debug(f"Все комменты фильма: {comments}")
 
-        return comments
+        return {"items": comments, "next_cursor": next_cursor}
 
     async def update_comment(self, comment_id: str, comment_in: schemas.CommentUpdate):
 
@@ -158,26 +184,186 @@ class CustomEncoder(JSONEncoder):
         return super().default(o)
 
 
+class ClientConnection:
+    """
+    Websocket клиента с очередью исходящих сообщений, которую разбирает отдельная задача.
+    """
+
+    def __init__(self, websocket: WebSocket, queue_size: int) -> None:
+        self.websocket = websocket
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.writer: asyncio.Task | None = None
+
+
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: dict[int, list[WebSocket]] = {}
+    """
+    Websocket подключения к комментариям фильмов в этом процессе.
+
+    Сообщение публикуется через бэкенд рассылки, а бэкенд доставляет его
+    в deliver каждого процесса, у которого есть клиенты этого фильма.
+
+    deliver только кладет уже сериализованное сообщение в очередь каждого клиента,
+    а отправляют их задачи клиентов параллельно, поэтому медленный или зависший клиент
+    не задерживает остальных. Клиент, очередь которого заполнена, отключается или
+    теряет самые старые сообщения (slow_consumer_policy), клиент, не принявший сообщение
+    за send_timeout секунд или с ошибкой отправки, отключается.
+
+    Args:
+        backend (MemoryBroadcastBackend | RedisBroadcastBackend): Бэкенд рассылки,
+            по умолчанию выбранный в COMMENTS_BROADCAST_BACKEND.
+        queue_size (int): Размер очереди сообщений клиента.
+        send_timeout (float): Сколько секунд ждать отправки одного сообщения.
+        slow_consumer_policy (str): "disconnect" или "drop_oldest".
+    """
+
+    def __init__(
+        self,
+        backend: MemoryBroadcastBackend | RedisBroadcastBackend = None,
+        queue_size: int = COMMENTS_WS_QUEUE_SIZE,
+        send_timeout: float = COMMENTS_WS_SEND_TIMEOUT,
+        slow_consumer_policy: str = COMMENTS_WS_SLOW_CONSUMER_POLICY,
+    ):
+        if slow_consumer_policy not in ("disconnect", "drop_oldest"):
+            raise ValueError(f"Unknown slow consumer policy: {slow_consumer_policy}")
+
+        self.active_connections: dict[int, dict[WebSocket, ClientConnection]] = {}
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.slow_consumer_policy = slow_consumer_policy
+        # Задачи закрытия отключенных клиентов
+        self._closing: set[asyncio.Task] = set()
+        # Фильмы, подписка на которые выполняется прямо сейчас
+        self._subscribing: Counter[int] = Counter()
+
+        self.backend = backend or get_broadcast_backend()
+        self.backend.set_deliver(self.deliver)
 
     async def connect(self, film_id: int, websocket: WebSocket):
         await websocket.accept()
+
+        # Фильм регистрируется только после успешной подписки: если подписаться не удалось,
+        # следующее подключение к фильму попробует снова
         if film_id not in self.active_connections:
-            self.active_connections[film_id] = []
-        self.active_connections[film_id].append(websocket)
+            self._subscribing[film_id] += 1
+            try:
+                await self.backend.subscribe(film_id)
+            finally:
+                self._subscribing[film_id] -= 1
+                if not self._subscribing[film_id]:
+                    del self._subscribing[film_id]
+
+        client = ClientConnection(websocket, self.queue_size)
+        client.writer = asyncio.create_task(self._write(film_id, client))
 
-    def disconnect(self, film_id: int, websocket: WebSocket):
-        if film_id in self.active_connections:
-            self.active_connections[film_id].remove(websocket)
-            if not self.active_connections[film_id]:
-                del self.active_connections[film_id]
+        self.active_connections.setdefault(film_id, {})[websocket] = client
+
+    async def disconnect(self, film_id: int, websocket: WebSocket):
+        client = self._remove(film_id, websocket)
+
+        if client is not None:
+            await self._unsubscribe_if_unused(film_id)
 
     async def broadcast(self, film_id: int, message: str):
-        if film_id in self.active_connections:
-            for connection in self.active_connections[film_id]:
-                await connection.send_json(message)
+        await self.backend.publish(film_id, message)
+
+    async def deliver(self, film_id: int, message: str):
+        slow_clients = []
+
+        for client in self.active_connections.get(film_id, {}).values():
+            if client.queue.full():
+                if self.slow_consumer_policy == "disconnect":
+                    slow_clients.append(client)
+                    continue
+
+                client.queue.get_nowait()
+                client.dropped += 1
+
+            client.queue.put_nowait(message)
+
+        for client in slow_clients:
+            logger.warning(f"Клиент комментариев фильма {film_id} не успевает принимать сообщения, отключаю")
+            self._close_in_background(film_id, client, status.WS_1013_TRY_AGAIN_LATER)
+
+    async def close(self):
+        clients = [
+            client
+            for film_id, websockets in list(self.active_connections.items())
+            for client in [self._remove(film_id, websocket) for websocket in list(websockets)]
+        ]
+
+        await asyncio.gather(*(self._close_websocket(client, status.WS_1001_GOING_AWAY) for client in clients))
+
+        # Бэкенд закрывается, отписываться от каналов уже не нужно
+        for task in list(self._closing):
+            task.cancel()
+        await asyncio.gather(*self._closing, return_exceptions=True)
+
+        await self.backend.close()
+
+    async def _write(self, film_id: int, client: ClientConnection):
+        try:
+            while True:
+                message = await client.queue.get()
+                await asyncio.wait_for(client.websocket.send_text(message), self.send_timeout)
+
+        except asyncio.CancelledError:
+            raise
+
+        except asyncio.TimeoutError:
+            logger.warning(f"Клиент комментариев фильма {film_id} не принял сообщение за {self.send_timeout} с, отключаю")
+            self._close_in_background(film_id, client, status.WS_1013_TRY_AGAIN_LATER)
+
+        except Exception as e:
+            logger.opt(exception=e).debug(f"Не удалось отправить комментарий фильма {film_id}, отключаю клиента")
+            self._close_in_background(film_id, client, status.WS_1011_INTERNAL_ERROR)
+
+    def _remove(self, film_id: int, websocket: WebSocket) -> ClientConnection | None:
+        client = self.active_connections.get(film_id, {}).pop(websocket, None)
+
+        if client is None:
+            return None
+
+        if client.writer is not asyncio.current_task():
+            client.writer.cancel()
+
+        if not self.active_connections[film_id]:
+            del self.active_connections[film_id]
+
+        return client
+
+    def _close_in_background(self, film_id: int, client: ClientConnection, code: int):
+        # Клиент сразу убирается из рассылки, а закрытие соединения и отписка от канала
+        # выполняются отдельной задачей, чтобы не задерживать доставку остальным
+        if self._remove(film_id, client.websocket) is None:
+            return
+
+        task = asyncio.create_task(self._close_client(film_id, client, code))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close_client(self, film_id: int, client: ClientConnection, code: int):
+        if client.dropped:
+            logger.info(f"Клиенту комментариев фильма {film_id} не доставлено сообщений: {client.dropped}")
+
+        try:
+            await self._unsubscribe_if_unused(film_id)
+        except Exception as e:
+            logger.opt(exception=e).error("Error in ConnectionManager._close_client")
+
+        await self._close_websocket(client, code)
+
+    async def _close_websocket(self, client: ClientConnection, code: int):
+        try:
+            await asyncio.wait_for(client.websocket.close(code), self.send_timeout)
+        except Exception:
+            # Соединение уже закрыто или клиент не ответил
+            pass
+
+    async def _unsubscribe_if_unused(self, film_id: int):
+        # За время закрытия к фильму мог подключиться новый клиент
+        if film_id not in self.active_connections and film_id not in self._subscribing:
+            await self.backend.unsubscribe(film_id)
 
 
 class DatabaseManager:
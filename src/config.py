@@ -12,3 +12,8 @@ DB_PASS = os.environ.get("DB_PASS")
 
 BASE_URL = "https://api.kinoafisha.info/export/"
 API_KEY = os.environ.get("API_KEY")
+
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost")
+
+# Максимальное количество записей на странице списков с курсорной пагинацией
+PAGE_MAX_LIMIT = int(os.environ.get("PAGE_MAX_LIMIT", 500))
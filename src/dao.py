@@ -1,11 +1,12 @@
-from typing import Any, Dict, Generic, List, Optional, TypeVar, Union
+from typing import Any, Dict, Generic, Iterable, List, Optional, Sequence, Set, Tuple, TypeVar, Union
 
-from sqlalchemy import delete, insert, select, update, func
+from sqlalchemy import and_, delete, insert, inspect, or_, select, tuple_, update, func
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
 from .database import Base
+from .pagination import decode_cursor, encode_cursor
 
 
 ModelType = TypeVar("ModelType", bound=Base)
@@ -52,16 +53,47 @@ class BaseDAO(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         return result.scalars().one_or_none()
 
     @classmethod
-    async def find_three_or_none(cls, db: AsyncSession, *filter, limit: int = 3) -> Optional[ModelType]:
+    async def find_existing_ids(cls, db: AsyncSession, ids: Iterable[Any]) -> Set[Any]:
 
+        ids = list(ids)
+        if not ids:
+            return set()
+
+        stmt = select(cls.model.id).where(cls.model.id.in_(ids))
+        result = await db.execute(stmt)
+
+        return set(result.scalars().all())
+
+    @classmethod
+    async def find_three_or_none(
+        cls,
+        db: AsyncSession,
+        *filter,
+        limit: int = 3,
+        columns: Optional[Sequence[Any]] = None,
+    ) -> List[Union[ModelType, Dict[str, Any]]]:
+
+        stmt = select(*columns) if columns is not None else select(cls.model)
         stmt = (
-            select(cls.model)
+            stmt
             .filter(func.lower((cls.model.title)).contains(*filter))
             .limit(limit)
         )
         result = await db.execute(stmt)
+
+        if columns is not None:
+            return [dict(row) for row in result.mappings()]
         return result.scalars().all()
 
+    @classmethod
+    async def find_rows(cls, db: AsyncSession, columns: Sequence[Any], *filter, **filter_by) -> List[Dict[str, Any]]:
+        """ Выбирает только указанные столбцы и возвращает строки словарями, без создания объектов модели """
+
+        stmt = select(*columns).filter(*filter).filter_by(**filter_by)
+        result = await db.execute(stmt)
+
+        return [dict(row) for row in result.mappings()]
+
     @classmethod
     async def find_all(
         cls,
@@ -81,6 +113,111 @@ class BaseDAO(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         result = await db.execute(stmt)
         return result.scalars().all()
 
+    @classmethod
+    async def find_page(
+        cls,
+        db: AsyncSession,
+        *filter,
+        order_by: Sequence[Tuple[Any, bool]] = (),
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+        columns: Optional[Sequence[Any]] = None,
+        **filter_by
+    ) -> Tuple[List[Union[ModelType, Dict[str, Any]]], Optional[str]]:
+        """
+        Получает страницу записей с курсорной (keyset) пагинацией.
+
+        Args:
+            filter: Фильтры для запроса.
+            order_by (Sequence[Tuple[Any, bool]]): Столбцы сортировки и признак
+                сортировки по убыванию. Столбцы не должны содержать NULL;
+                id добавляется последним, чтобы порядок был однозначным.
+            cursor (str, optional): Курсор из предыдущей страницы, None - первая страница.
+            limit (int, optional): Максимальное количество записей на странице.
+            offset (int, optional): Сколько записей пропустить после курсора. Оставлено
+                для совместимости с пагинацией по смещению и просматривает пропущенные строки.
+            columns (Sequence, optional): Выбираемые столбцы. Если заданы, записи
+                возвращаются словарями без создания объектов модели; столбцы
+                сортировки добавляются к ним автоматически.
+            filter_by: Дополнительные фильтры по полям модели.
+
+        Returns:
+            Tuple[List[Union[ModelType, Dict[str, Any]]], Optional[str]]: Записи страницы
+                и курсор следующей страницы (None, если страница последняя).
+        """
+
+        order_by = list(order_by)
+        if not any(column is cls.model.id for column, _ in order_by):
+            order_by.append((cls.model.id, False))
+
+        keys = [column.key for column, _ in order_by]
+
+        if columns is not None:
+            selected_keys = {column.key for column in columns}
+            columns = list(columns) + [column for column, _ in order_by if column.key not in selected_keys]
+
+        stmt = select(*columns) if columns is not None else select(cls.model)
+        stmt = (
+            stmt
+            .filter(*filter)
+            .filter_by(**filter_by)
+            .order_by(*(column.desc() if descending else column.asc() for column, descending in order_by))
+            .offset(offset)
+            .limit(limit + 1)
+        )
+
+        if cursor is not None:
+            types = [cls._get_python_type(column) for column, _ in order_by]
+            stmt = stmt.where(cls._get_keyset_condition(order_by, decode_cursor(cursor, keys, types)))
+
+        result = await db.execute(stmt)
+
+        if columns is not None:
+            records = [dict(row) for row in result.mappings()]
+        else:
+            records = result.scalars().all()
+
+        if len(records) <= limit:
+            return records, None
+
+        records = records[:limit]
+        last = records[-1]
+        next_cursor = encode_cursor(keys, [last[key] if columns is not None else getattr(last, key) for key in keys])
+
+        return records, next_cursor
+
+    @staticmethod
+    def _get_python_type(column) -> type | None:
+        try:
+            return column.type.python_type
+        except NotImplementedError:
+            return None
+
+    @staticmethod
+    def _get_keyset_condition(order_by: Sequence[Tuple[Any, bool]], values: Sequence[Any]):
+
+        directions = {descending for _, descending in order_by}
+        columns = [column for column, _ in order_by]
+
+        # При едином направлении сортировки сравнение строк использует индекс напрямую
+        if len(directions) == 1:
+            if directions.pop():
+                return tuple_(*columns) < tuple_(*values)
+            return tuple_(*columns) > tuple_(*values)
+
+        conditions = []
+
+        for i, ((column, descending), value) in enumerate(zip(order_by, values)):
+            after = column < value if descending else column > value
+            conditions.append(and_(*(columns[j] == values[j] for j in range(i)), after))
+
+        # Нестрогая граница по первому столбцу позволяет искать по индексу и при смешанных направлениях
+        first_column, first_descending = order_by[0]
+        bound = first_column <= values[0] if first_descending else first_column >= values[0]
+
+        return and_(bound, or_(*conditions))
+
     @classmethod
     async def update(
         cls,
@@ -105,7 +242,13 @@ class BaseDAO(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         return result.scalars().one()
 
     @classmethod
-    async def delete(cls, session: AsyncSession, *filter, **filter_by) -> None:
-        stmt = delete(cls.model).filter(*filter).filter_by(**filter_by)
+    async def delete(cls, session: AsyncSession, *filter, **filter_by) -> List[Any]:
+        stmt = (
+            delete(cls.model)
+            .filter(*filter)
+            .filter_by(**filter_by)
+            .returning(*inspect(cls.model).primary_key)
+        )
 
-        await session.execute(stmt)
+        result = await session.execute(stmt)
+        return result.scalars().all()
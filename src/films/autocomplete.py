@@ -0,0 +1,251 @@
+import asyncio
+import heapq
+import unicodedata
+
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+from time import monotonic
+from typing import Iterable, NamedTuple
+
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import AUTOCOMPLETE_MAX_LIMIT, AUTOCOMPLETE_REFRESH_INTERVAL
+from .models import Film
+
+from ..recommendations.scoring import get_popularity_priors
+
+
+# Прибавка к оценке, если запрос совпадает с началом названия, а не с одним из следующих слов
+TITLE_PREFIX_BONUS = 1.0
+# Результаты для префиксов, под которые попадает больше ключей, кэшируются до изменения этих ключей.
+# Таких префиксов не больше (число ключей / порог) на каждую длину префикса
+CACHED_RANGE_SIZE = 2000
+
+TRANSLITERATION = str.maketrans({
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ж": "zh", "з": "z",
+    "и": "i", "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p",
+    "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts", "ч": "ch",
+    "ш": "sh", "щ": "shch", "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu", "я": "ya",
+})
+
+
+def normalize_title(text: str) -> list[str]:
+    """
+    Приводит название или запрос к словам для поиска по префиксу: нижний регистр,
+    ё -> е, транслитерация кириллицы в латиницу, удаление диакритики и знаков препинания.
+    Транслитерация посимвольная, поэтому префикс названия остается префиксом после нормализации.
+
+    Args:
+        text (str): Название фильма или поисковый запрос.
+
+    Returns:
+        list[str]: Нормализованные слова.
+    """
+
+    text = text.lower().replace("ё", "е").translate(TRANSLITERATION)
+    text = "".join(char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char))
+
+    return "".join(char if char.isalnum() else " " for char in text).split()
+
+
+class AutocompleteFilm(NamedTuple):
+    id: int
+    title: str
+    poster: str | None
+    year: int | None
+
+
+class FilmAutocomplete:
+    """
+    Индекс названий фильмов в памяти процесса для автодополнения.
+
+    Для каждого фильма хранятся ключи - нормализованное название и все его окончания,
+    начинающиеся с нового слова ("krestnyy otets 2", "otets 2", "2"), в отсортированном
+    массиве. Фильмы, у которых название или одно из слов начинается с запроса,
+    находятся одним двоичным поиском диапазона ключей. Каждый ключ хранит оценку фильма:
+    популярность (см. scoring.get_popularity_priors) и прибавку TITLE_PREFIX_BONUS,
+    если ключ - начало названия; внутри диапазона фильмы упорядочиваются по ней.
+
+    Индекс строится при запуске приложения, обновляется при изменении фильмов через
+    FilmCRUD и полностью перечитывается не реже, чем раз в refresh_interval секунд
+    (изменения, сделанные другими воркерами, и изменения популярности).
+    """
+
+    def __init__(self, refresh_interval: float = AUTOCOMPLETE_REFRESH_INTERVAL) -> None:
+        self.refresh_interval = refresh_interval
+
+        self._films: dict[int, AutocompleteFilm] = {}
+        self._keys: list[str] = []
+        # (оценка, идентификатор фильма) для каждого ключа
+        self._entries: list[tuple[float, int]] = []
+        self._cached_results: dict[str, list[int]] = {}
+        self._loaded_at: float | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or monotonic() - self._loaded_at >= self.refresh_interval
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+
+        if not self.is_stale:
+            return
+
+        async with self._lock:
+            # Пока ждали блокировку, индекс мог загрузить другой запрос
+            if self.is_stale:
+                await self.load(db)
+
+    async def load(self, db: AsyncSession) -> None:
+        """
+        Полностью перестраивает индекс по таблице films.
+
+        Args:
+            db (AsyncSession): Сессия для работы с базой данных.
+        """
+
+        try:
+            query = select(
+                Film.id, Film.title, Film.poster, Film.year,
+                Film.average_rating, Film.local_rating, Film.rating_count,
+            )
+            rows = (await db.execute(query)).all()
+
+            items = sorted(
+                (key, entry)
+                for row, popularity in zip(rows, get_popularity_priors(rows).tolist())
+                for key, entry in self._get_keys(row.id, row.title, popularity)
+            )
+
+            self._films = {row.id: AutocompleteFilm(row.id, row.title, row.poster, row.year) for row in rows}
+            self._keys = [key for key, _ in items]
+            self._entries = [entry for _, entry in items]
+            self._cached_results = {}
+            self._loaded_at = monotonic()
+
+            logger.debug(f"Индекс автодополнения построен: {len(rows)} фильмов, {len(items)} ключей")
+
+        except Exception as e:
+            logger.opt(exception=e).critical("Error in FilmAutocomplete.load")
+            raise
+
+    def complete(self, query: str, limit: int) -> list[dict]:
+        """
+        Подбирает фильмы, название или одно из слов названия которых начинается с запроса.
+
+        Args:
+            query (str): Введенная часть названия.
+            limit (int): Максимальное количество фильмов, не больше AUTOCOMPLETE_MAX_LIMIT.
+
+        Returns:
+            list[dict]: id, title, poster и year найденных фильмов, наиболее подходящие первыми.
+        """
+
+        prefix = " ".join(normalize_title(query))
+        limit = max(1, min(limit, AUTOCOMPLETE_MAX_LIMIT))
+
+        if not prefix:
+            return []
+
+        film_ids = self._cached_results.get(prefix)
+
+        if film_ids is None:
+            start = bisect_left(self._keys, prefix)
+            end = bisect_left(self._keys, prefix + "\U0010ffff", start)
+
+            if end - start > CACHED_RANGE_SIZE:
+                film_ids = self._cached_results[prefix] = self._get_top(start, end, AUTOCOMPLETE_MAX_LIMIT)
+            else:
+                film_ids = self._get_top(start, end, limit)
+
+        return [self._films[film_id]._asdict() for film_id in film_ids[:limit]]
+
+    def upsert(self, film: Film) -> None:
+        """
+        Добавляет или обновляет фильм в построенном индексе.
+
+        Args:
+            film (Film): Созданный или обновленный фильм.
+        """
+
+        if film is None or self._loaded_at is None:
+            return
+
+        self.remove([film.id])
+
+        popularity = float(get_popularity_priors([film])[0])
+
+        for key, entry in self._get_keys(film.id, film.title, popularity):
+            position = bisect_right(self._keys, key)
+            self._keys.insert(position, key)
+            self._entries.insert(position, entry)
+
+            self._drop_cached_results(key)
+
+        self._films[film.id] = AutocompleteFilm(film.id, film.title, film.poster, film.year)
+
+    def remove(self, film_ids: Iterable[int]) -> None:
+        """
+        Удаляет фильмы из построенного индекса.
+
+        Args:
+            film_ids (Iterable[int]): Идентификаторы удаленных фильмов.
+        """
+
+        for film_id in film_ids:
+            film = self._films.pop(film_id, None)
+
+            if film is None:
+                continue
+
+            for key, _ in self._get_keys(film.id, film.title, 0.0):
+                position = bisect_left(self._keys, key)
+
+                while position < len(self._keys) and self._keys[position] == key:
+                    if self._entries[position][1] == film_id:
+                        del self._keys[position]
+                        del self._entries[position]
+                        break
+                    position += 1
+
+                self._drop_cached_results(key)
+
+    def invalidate(self) -> None:
+        """ Помечает индекс устаревшим: он будет перестроен при следующем обращении """
+
+        self._loaded_at = None
+
+    def _get_top(self, start: int, end: int, limit: int) -> list[int]:
+
+        film_ids = []
+
+        # Фильм может попасть в диапазон несколькими ключами (по разным словам названия),
+        # поэтому кандидатов берется с запасом; если уникальных не хватило - перебираются все
+        for num_candidates in (limit * 4, end - start):
+            candidates = heapq.nlargest(num_candidates, self._entries[start:end], key=itemgetter(0))
+            film_ids = list(dict.fromkeys(film_id for _, film_id in candidates))
+
+            if len(film_ids) >= limit or num_candidates >= end - start:
+                break
+
+        return film_ids[:limit]
+
+    def _drop_cached_results(self, key: str) -> None:
+
+        for length in range(1, len(key) + 1):
+            self._cached_results.pop(key[:length], None)
+
+    @staticmethod
+    def _get_keys(film_id: int, title: str, popularity: float) -> list[tuple[str, tuple[float, int]]]:
+
+        words = normalize_title(title)
+
+        return [
+            (" ".join(words[i:]), (popularity + TITLE_PREFIX_BONUS if i == 0 else popularity, film_id))
+            for i in range(len(words))
+        ]
+
+
+film_autocomplete = FilmAutocomplete()
@@ -0,0 +1,24 @@
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+# Количество фильмов в ответе поиска по названию по умолчанию и максимальное
+FILM_SEARCH_LIMIT = int(os.environ.get("FILM_SEARCH_LIMIT", 10))
+FILM_SEARCH_MAX_LIMIT = int(os.environ.get("FILM_SEARCH_MAX_LIMIT", 50))
+
+# Доупорядочивать ли результаты поиска через rapidfuzz и сколько кандидатов
+# из базы данных для этого брать
+FILM_SEARCH_RERANK = os.environ.get("FILM_SEARCH_RERANK", "true").lower() in ("1", "true", "yes")
+FILM_SEARCH_RERANK_CANDIDATES = int(os.environ.get("FILM_SEARCH_RERANK_CANDIDATES", 50))
+
+# Количество фильмов в ответе автодополнения по умолчанию и максимальное
+AUTOCOMPLETE_LIMIT = int(os.environ.get("AUTOCOMPLETE_LIMIT", 10))
+AUTOCOMPLETE_MAX_LIMIT = int(os.environ.get("AUTOCOMPLETE_MAX_LIMIT", 20))
+# Как часто индекс автодополнения полностью перестраивается по базе данных, в секундах
+AUTOCOMPLETE_REFRESH_INTERVAL = int(os.environ.get("AUTOCOMPLETE_REFRESH_INTERVAL", 600))
+
+# Как часто индекс фасетов каталога полностью перестраивается по базе данных, в секундах
+FACETS_REFRESH_INTERVAL = int(os.environ.get("FACETS_REFRESH_INTERVAL", 600))
@@ -1,8 +1,286 @@
+from typing import Any, AsyncIterator, Iterable, Sequence
+
+from sqlalchemy import Float, Row, case, cast, func, literal, or_, select, text, update
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from .models import Film
-from .schemas import FilmCreate, FilmUpdate
+from .schemas import FilmBrowseFilters, FilmCreate, FilmUpdate
 
 from ..dao import BaseDAO
+from ..user_actions.models import UserFilmRating
 
 
 class FilmDAO(BaseDAO[Film, FilmCreate, FilmUpdate]):
-    model = Film
\ No newline at end of file
+    model = Film
+
+    @classmethod
+    async def stream_rows(cls, db: AsyncSession, yield_per: int = 1000) -> AsyncIterator[dict]:
+        """
+        Построчно отдает все фильмы через курсор на стороне сервера:
+        в памяти одновременно находится не больше yield_per строк.
+        """
+
+        stmt = select(cls.model.__table__).order_by(cls.model.id).execution_options(yield_per=yield_per)
+        result = await db.stream(stmt)
+
+        async for row in result.mappings():
+            yield dict(row)
+
+    @classmethod
+    async def copy_records(cls, db: AsyncSession, columns: Sequence[str], records: Sequence[tuple[Any, ...]]) -> int:
+        """
+        Загружает фильмы через COPY (asyncpg copy_records_to_table) во временную таблицу
+        и переносит их в films, пропуская фильмы, конфликтующие с существующими.
+        Временная таблица живет до конца транзакции.
+
+        Returns:
+            int: Количество добавленных фильмов.
+        """
+
+        if not records:
+            return 0
+
+        table = cls.model.__tablename__
+        staging_table = f"{table}_import"
+
+        await db.execute(text(
+            f"CREATE TEMP TABLE IF NOT EXISTS {staging_table} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP"))
+
+        connection = await db.connection()
+        raw_connection = await connection.get_raw_connection()
+
+        await raw_connection.driver_connection.copy_records_to_table(
+            staging_table, records=records, columns=list(columns))
+
+        column_list = ", ".join(columns)
+        result = await db.execute(text(
+            f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {staging_table} ON CONFLICT DO NOTHING"))
+
+        await db.execute(text(f"TRUNCATE {staging_table}"))
+
+        return result.rowcount
+
+    @classmethod
+    async def sync_id_sequence(cls, db: AsyncSession) -> None:
+        """ Сдвигает последовательность id после загрузки фильмов с явными идентификаторами """
+
+        table = cls.model.__tablename__
+
+        await db.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), coalesce(max(id), 0) + 1, false) FROM {table}"))
+
+    @classmethod
+    async def apply_rating_delta(cls, db: AsyncSession, film_id: int, count_delta: int, sum_delta: float) -> Film:
+        """
+        Обновляет агрегаты оценок фильма на разницу, внесенную одной оценкой,
+        и пересчитывает local_rating без чтения всех оценок фильма.
+        """
+
+        rating_count = cls.model.rating_count + count_delta
+        rating_sum = cls.model.rating_sum + sum_delta
+
+        stmt = (
+            update(cls.model)
+            .where(cls.model.id == film_id)
+            .values(
+                rating_count=rating_count,
+                rating_sum=rating_sum,
+                local_rating=rating_sum / cast(func.nullif(rating_count, 0), Float),
+            )
+            .returning(cls.model)
+        )
+
+        result = await db.execute(stmt)
+        return result.scalars().one()
+
+    @classmethod
+    async def recompute_rating_aggregates(cls, db: AsyncSession, film_ids: Iterable[int]) -> Sequence[Film]:
+        """
+        Пересчитывает агрегаты оценок и local_rating указанных фильмов по таблице оценок.
+        Используется после пакетной загрузки, когда дельты отдельных оценок не отслеживаются.
+        """
+
+        film_ids = list(film_ids)
+        if not film_ids:
+            return []
+
+        aggregates = (
+            select(
+                UserFilmRating.film_id,
+                func.count().label("rating_count"),
+                func.sum(UserFilmRating.rating).label("rating_sum"),
+            )
+            .where(UserFilmRating.film_id.in_(film_ids))
+            .group_by(UserFilmRating.film_id)
+            .subquery()
+        )
+
+        stmt = (
+            update(cls.model)
+            .where(cls.model.id == aggregates.c.film_id)
+            .values(
+                rating_count=aggregates.c.rating_count,
+                rating_sum=aggregates.c.rating_sum,
+                local_rating=aggregates.c.rating_sum / cast(aggregates.c.rating_count, Float),
+            )
+            .returning(cls.model)
+        )
+
+        result = await db.execute(stmt)
+        return result.scalars().all()
+
+    @classmethod
+    def _get_catalog_columns(cls) -> tuple:
+        # Поля CatalogFilm: жанры для матрицы жанров, рейтинги для априорной популярности
+        return (
+            cls.model.id, cls.model.genres,
+            cls.model.average_rating, cls.model.local_rating, cls.model.rating_count,
+        )
+
+    @classmethod
+    async def find_genres(cls, db: AsyncSession, film_ids: Iterable[int]) -> Sequence[Row]:
+        """ Возвращает id, жанры, рейтинги и число оценок указанных фильмов """
+
+        film_ids = list(film_ids)
+        if not film_ids:
+            return []
+
+        stmt = select(*cls._get_catalog_columns()).where(cls.model.id.in_(film_ids))
+        result = await db.execute(stmt)
+
+        return result.all()
+
+    @classmethod
+    async def find_unrated_candidates(
+        cls,
+        db: AsyncSession,
+        excluded_ids: Iterable[int],
+        genres_coefficients: dict[str, float] | None = None,
+        min_score: float = 0.0,
+        limit: int | None = None,
+    ) -> Sequence[Row]:
+        """
+        Возвращает id, жанры, рейтинги и число оценок фильмов, которые пользователь еще не оценил.
+
+        Исключаются фильмы excluded_ids - недавние оценки пользователя, как и при расчете
+        по снимку каталога, и уже отобранные кандидаты. Без коэффициентов жанров фильмы
+        упорядочены по убыванию числа оценок, при равенстве - по идентификатору (индекс
+        ix_films_rating_count_id). При переданных коэффициентах жанров остаются только фильмы,
+        пересекающиеся с ними хотя бы по одному жанру (оператор && по GIN индексу
+        ix_films_genres) со схожестью - суммой коэффициентов своих жанров, как
+        в GenreMatrix.get_scores, - не ниже min_score. Фильмы упорядочены по убыванию
+        схожести, при равенстве - по идентификатору.
+
+        Args:
+            excluded_ids (Iterable[int]): Оцененные пользователем и уже отобранные фильмы.
+            genres_coefficients (dict[str, float] | None): Коэффициенты заинтересованности в жанрах.
+            min_score (float): Минимальная схожесть фильма.
+            limit (int | None): Максимальное количество фильмов.
+        """
+
+        excluded_ids = list(excluded_ids)
+
+        stmt = select(*cls._get_catalog_columns())
+
+        if excluded_ids:
+            stmt = stmt.where(cls.model.id.not_in(excluded_ids))
+
+        if genres_coefficients:
+            score = sum(
+                (case((cls.model.genres.any(genre), coefficient), else_=0.0)
+                 for genre, coefficient in genres_coefficients.items()),
+                literal(0.0))
+
+            stmt = (
+                stmt
+                .where(
+                    cls.model.genres.op("&&")(array(list(genres_coefficients))),
+                    score >= min_score,
+                )
+                .order_by(score.desc(), cls.model.id)
+            )
+
+        else:
+            stmt = stmt.order_by(cls.model.rating_count.desc(), cls.model.id)
+
+        if limit is not None:
+            stmt = stmt.limit(limit)
+
+        result = await db.execute(stmt)
+
+        return result.all()
+
+    @classmethod
+    async def search_by_title(cls, db: AsyncSession, query: str, limit: int) -> Sequence[Film]:
+        """
+        Ищет фильмы по названию с учетом опечаток и упорядочивает их по схожести.
+
+        Условия поиска обслуживаются GIN индексом триграмм ix_films_title_trgm:
+        q <% lower(title) находит названия, в которых есть фрагмент, похожий на запрос
+        (порог pg_trgm.word_similarity_threshold), а LIKE - точные вхождения подстроки.
+
+        Args:
+            query (str): Поисковый запрос в нижнем регистре.
+            limit (int): Максимальное количество фильмов.
+
+        Returns:
+            Sequence[Film]: Фильмы по убыванию схожести названия с запросом.
+        """
+
+        title = func.lower(cls.model.title)
+        condition = literal(query).op("<%")(title)
+
+        # Для запросов короче триграммы LIKE не может использовать индекс
+        if len(query) >= 3:
+            condition = or_(condition, title.contains(query, autoescape=True))
+
+        stmt = (
+            select(cls.model)
+            .where(condition)
+            .order_by(
+                func.word_similarity(query, title).desc(),
+                func.similarity(title, query).desc(),
+                cls.model.id,
+            )
+            .limit(limit)
+        )
+        result = await db.execute(stmt)
+
+        return result.scalars().all()
+
+    @classmethod
+    async def find_browse_page(
+        cls,
+        db: AsyncSession,
+        filters: FilmBrowseFilters,
+        cursor: str | None = None,
+        limit: int = 100,
+        columns: Sequence[Any] | None = None,
+    ) -> tuple[Sequence[Film | dict], str | None]:
+        """
+        Получает страницу фильмов, подходящих под фильтры каталога, упорядоченную по id.
+
+        Жанры проверяются оператором @> по GIN индексу ix_films_genres (у фильма есть
+        все выбранные жанры), остальные фильтры - по btree индексам столбцов.
+
+        Returns:
+            tuple[Sequence[Film], str | None]: Фильмы страницы и курсор следующей страницы.
+        """
+
+        conditions = []
+
+        if filters.genres:
+            conditions.append(cls.model.genres.op("@>")(array(filters.genres)))
+        if filters.country is not None:
+            conditions.append(cls.model.country == filters.country)
+        if filters.year_from is not None:
+            conditions.append(cls.model.year >= filters.year_from)
+        if filters.year_to is not None:
+            conditions.append(cls.model.year <= filters.year_to)
+        if filters.age_rating is not None:
+            conditions.append(cls.model.age_rating == filters.age_rating)
+        if filters.director is not None:
+            conditions.append(cls.model.director == filters.director)
+
+        return await cls.find_page(db, *conditions, cursor=cursor, limit=limit, columns=columns)
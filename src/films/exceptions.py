@@ -14,3 +14,8 @@ class FilmWasNotFound(HTTPException):
 class FilmAlreadyExists(HTTPException):
     def __init__(self):
         super().__init__(status_code=401, detail="Film already exists")
+
+
+class InvalidFilmFields(HTTPException):
+    def __init__(self, fields: list[str]):
+        super().__init__(status_code=400, detail=f"Unknown film fields: {', '.join(fields)}")
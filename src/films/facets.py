@@ -0,0 +1,259 @@
+import asyncio
+
+from collections import Counter
+from time import monotonic
+from typing import Iterable, NamedTuple
+
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import FACETS_REFRESH_INTERVAL
+from .models import Film
+from .schemas import FilmBrowseFilters
+
+
+class FacetFilm(NamedTuple):
+    id: int
+    genres: frozenset[str]
+    country: str | None
+    year: int | None
+    age_rating: str | None
+    director: str | None
+
+    @property
+    def decade(self) -> int | None:
+        return None if self.year is None else self.year // 10 * 10
+
+
+class FilmFacetIndex:
+    """
+    Индекс фасетов каталога в памяти процесса: сколько фильмов каждого жанра,
+    страны и десятилетия.
+
+    Счетчики по всему каталогу поддерживаются инкрементально и отдаются без
+    пересчета. Для выборки с фильтрами подходящие фильмы - пересечение множеств фильмов
+    с выбранными значениями полей, а счетчик значения - размер его пересечения
+    с подходящими фильмами. Фильтры применяются так же, как в FilmDAO.find_browse_page.
+
+    Индекс строится при запуске приложения, обновляется при изменении фильмов через
+    FilmCRUD и полностью перечитывается не реже, чем раз в refresh_interval секунд.
+    """
+
+    def __init__(self, refresh_interval: float = FACETS_REFRESH_INTERVAL) -> None:
+        self.refresh_interval = refresh_interval
+
+        self._films: dict[int, FacetFilm] = {}
+        self._counts: dict[str, Counter] = self._make_counts()
+        # Идентификаторы фильмов по значениям фасетов, по которым можно фильтровать
+        self._postings: dict[str, dict[object, set[int]]] = {}
+        self._loaded_at: float | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or monotonic() - self._loaded_at >= self.refresh_interval
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+
+        if not self.is_stale:
+            return
+
+        async with self._lock:
+            # Пока ждали блокировку, индекс мог загрузить другой запрос
+            if self.is_stale:
+                await self.load(db)
+
+    async def load(self, db: AsyncSession) -> None:
+        """
+        Полностью перестраивает индекс по таблице films.
+
+        Args:
+            db (AsyncSession): Сессия для работы с базой данных.
+        """
+
+        try:
+            query = select(Film.id, Film.genres, Film.country, Film.year, Film.age_rating, Film.director)
+            result = await db.execute(query)
+
+            self._films = {}
+            self._counts = self._make_counts()
+            self._postings = {}
+
+            for row in result:
+                self._add(self._make_film(row))
+
+            self._loaded_at = monotonic()
+
+            logger.debug(f"Индекс фасетов построен: {len(self._films)} фильмов")
+
+        except Exception as e:
+            logger.opt(exception=e).critical("Error in FilmFacetIndex.load")
+            raise
+
+    def count(self, filters: FilmBrowseFilters) -> dict[str, dict]:
+        """
+        Считает фильмы по жанрам, странам и десятилетиям.
+
+        Args:
+            filters (FilmBrowseFilters): Фильтры выборки.
+
+        Returns:
+            dict[str, dict]: Для каждого фасета - количество фильмов по значениям,
+                жанры и страны по убыванию количества, десятилетия по возрастанию.
+        """
+
+        film_ids = self._find(filters)
+
+        if film_ids is None:
+            counts = self._counts
+        else:
+            counts = self._make_counts()
+
+            counts["genres"] = self._count_postings("genres", film_ids)
+            counts["countries"] = self._count_postings("country", film_ids)
+
+            for year, count in self._count_postings("year", film_ids).items():
+                counts["decades"][year // 10 * 10] += count
+
+        return {
+            "genres": dict(counts["genres"].most_common()),
+            "countries": dict(counts["countries"].most_common()),
+            "decades": dict(sorted(counts["decades"].items())),
+        }
+
+    def upsert(self, film: Film) -> None:
+        """
+        Добавляет или обновляет фильм в построенном индексе.
+
+        Args:
+            film (Film): Созданный или обновленный фильм.
+        """
+
+        if film is None or self._loaded_at is None:
+            return
+
+        self.remove([film.id])
+        self._add(self._make_film(film))
+
+    def remove(self, film_ids: Iterable[int]) -> None:
+        """
+        Удаляет фильмы из построенного индекса.
+
+        Args:
+            film_ids (Iterable[int]): Идентификаторы удаленных фильмов.
+        """
+
+        for film_id in film_ids:
+            film = self._films.pop(film_id, None)
+
+            if film is None:
+                continue
+
+            for facet, values in self._get_facet_values(film).items():
+                for value in values:
+                    self._decrement(facet, value)
+
+            for field, values in self._get_posting_values(film).items():
+                for value in values:
+                    posting = self._postings[field][value]
+                    posting.discard(film.id)
+
+                    if not posting:
+                        del self._postings[field][value]
+
+    def invalidate(self) -> None:
+        """ Помечает индекс устаревшим: он будет перестроен при следующем обращении """
+
+        self._loaded_at = None
+
+    def _add(self, film: FacetFilm) -> None:
+
+        self._films[film.id] = film
+
+        for facet, values in self._get_facet_values(film).items():
+            self._counts[facet].update(values)
+
+        for field, values in self._get_posting_values(film).items():
+            for value in values:
+                self._postings.setdefault(field, {}).setdefault(value, set()).add(film.id)
+
+    def _find(self, filters: FilmBrowseFilters) -> set[int] | None:
+
+        selected = {
+            "genres": filters.genres,
+            "country": [filters.country] if filters.country is not None else [],
+            "age_rating": [filters.age_rating] if filters.age_rating is not None else [],
+            "director": [filters.director] if filters.director is not None else [],
+        }
+
+        postings = [
+            self._postings.get(field, {}).get(value, set())
+            for field, values in selected.items()
+            for value in values
+        ]
+
+        if filters.year_from is not None or filters.year_to is not None:
+            year_from = filters.year_from if filters.year_from is not None else float("-inf")
+            year_to = filters.year_to if filters.year_to is not None else float("inf")
+
+            postings.append(set().union(*(
+                film_ids for year, film_ids in self._postings.get("year", {}).items()
+                if year is not None and year_from <= year <= year_to
+            )))
+
+        # Без фильтров подходит весь каталог, счетчики для него уже посчитаны
+        if not postings:
+            return None
+
+        # Пересечение начинается с самого короткого списка
+        postings.sort(key=len)
+        return postings[0].intersection(*postings[1:])
+
+    def _count_postings(self, field: str, film_ids: set[int]) -> Counter:
+
+        counts = Counter()
+
+        for value, value_film_ids in self._postings.get(field, {}).items():
+            count = len(film_ids & value_film_ids) if value is not None else 0
+            if count:
+                counts[value] = count
+
+        return counts
+
+    def _decrement(self, facet: str, value: object) -> None:
+
+        counts = self._counts[facet]
+        counts[value] -= 1
+
+        if counts[value] <= 0:
+            del counts[value]
+
+    @staticmethod
+    def _get_facet_values(film: FacetFilm) -> dict[str, list]:
+        values = {"genres": film.genres, "countries": (film.country,), "decades": (film.decade,)}
+
+        # Фильмы без страны или года не попадают в соответствующий фасет
+        return {facet: [value for value in facet_values if value is not None] for facet, facet_values in values.items()}
+
+    @staticmethod
+    def _get_posting_values(film: FacetFilm) -> dict[str, list]:
+        return {
+            "genres": list(film.genres),
+            "country": [film.country],
+            "age_rating": [film.age_rating],
+            "director": [film.director],
+            "year": [film.year],
+        }
+
+    @staticmethod
+    def _make_counts() -> dict[str, Counter]:
+        return {"genres": Counter(), "countries": Counter(), "decades": Counter()}
+
+    @staticmethod
+    def _make_film(film) -> FacetFilm:
+        return FacetFilm(
+            film.id, frozenset(film.genres or ()), film.country, film.year, film.age_rating, film.director)
+
+
+film_facets = FilmFacetIndex()
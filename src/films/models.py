@@ -1,11 +1,25 @@
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import ARRAY, String
+from sqlalchemy import ARRAY, Index, String, func, column, text
 
 from ..database import Base
 
 
 class Film(Base):
     __tablename__ = "films"
+    __table_args__ = (
+        Index("ix_films_genres", "genres", postgresql_using="gin"),
+        Index("ix_films_country", "country"),
+        Index("ix_films_year", "year"),
+        Index("ix_films_age_rating", "age_rating"),
+        Index("ix_films_director", "director"),
+        Index("ix_films_rating_count_id", text("rating_count DESC"), "id"),
+        Index(
+            "ix_films_title_trgm",
+            func.lower(column("title")).label("title_lower"),
+            postgresql_using="gin",
+            postgresql_ops={"title_lower": "gin_trgm_ops"},
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     title: Mapped[str] = mapped_column(nullable=False, unique=True)
@@ -35,4 +49,7 @@ class Film(Base):
     description: Mapped[str] = mapped_column(nullable=True)
 
     average_rating: Mapped[float] = mapped_column(nullable=True, default=0)
-    local_rating: Mapped[float] = mapped_column(nullable=True)
\ No newline at end of file
+    local_rating: Mapped[float] = mapped_column(nullable=True)
+    # Агрегаты оценок пользователей, обновляются при каждой оценке: local_rating = rating_sum / rating_count
+    rating_count: Mapped[int] = mapped_column(nullable=False, default=0, server_default="0")
+    rating_sum: Mapped[float] = mapped_column(nullable=False, default=0, server_default="0")
\ No newline at end of file
@@ -1,20 +1,32 @@
-from fastapi import APIRouter, Depends
-from fastapi.responses import JSONResponse
+from typing import List
+
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi_cache.decorator import cache
 
 from . import schemas
 
+from .config import AUTOCOMPLETE_LIMIT, FILM_SEARCH_LIMIT
 from .models import Film
-from .service import DatabaseManager
+from .service import DatabaseManager, ExportFormat
 
+from ..config import PAGE_MAX_LIMIT
 from ..database import get_async_session
 
 
 router = APIRouter()
 
 
+def _projection_response(content, fields: str | None, view: schemas.FilmView | None):
+    # Проекция состоит из словарей с простыми значениями: ее можно отдать
+    # без jsonable_encoder и проверки response_model
+    if fields is None and view is None:
+        return content
+
+    return JSONResponse(content=content)
+
+
 @router.post("/create_film/", response_model=schemas.FilmCreate)
 async def create_film(
         film_data: schemas.FilmCreate,
@@ -28,36 +40,129 @@ async def create_film(
 @router.get("/get_film/", response_model=schemas.FilmRead)
 async def get_film(
     film_id: int = None,
+    fields: str = None,
+    view: schemas.FilmView = None,
     db: AsyncSession = Depends(get_async_session),
 ) -> Film:
     db_manager = DatabaseManager(db)
     film_crud = db_manager.film_crud
 
-    return await film_crud.get_film(film_id=film_id)
+    film = await film_crud.get_film(film_id=film_id, fields=fields, view=view)
+
+    return _projection_response(film, fields, view)
 
 
 @router.get("/get_all_films")
-@cache(expire=60*60*24*7)
 async def get_all_films(
-    offset: int = 0,
-    limit: int = 100,
+    cursor: str = None,
+    offset: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(100, ge=1, le=PAGE_MAX_LIMIT),
+    fields: str = None,
+    view: schemas.FilmView = None,
+    db: AsyncSession = Depends(get_async_session),
+):
+    db_manager = DatabaseManager(db)
+    film_crud = db_manager.film_crud
+
+    return await film_crud.get_all_films(cursor=cursor, offset=offset, limit=limit, fields=fields, view=view)
+
+
+@router.get("/browse_films")
+async def browse_films(
+    genres: List[str] = Query(None),
+    country: str = None,
+    year_from: int = None,
+    year_to: int = None,
+    age_rating: str = None,
+    director: str = None,
+    cursor: str = None,
+    limit: int = Query(100, ge=1, le=PAGE_MAX_LIMIT),
+    fields: str = None,
+    view: schemas.FilmView = None,
+    db: AsyncSession = Depends(get_async_session),
+):
+    db_manager = DatabaseManager(db)
+    film_crud = db_manager.film_crud
+
+    filters = schemas.FilmBrowseFilters(
+        genres=genres or [],
+        country=country,
+        year_from=year_from,
+        year_to=year_to,
+        age_rating=age_rating,
+        director=director,
+    )
+
+    films = await film_crud.browse_films(filters, cursor=cursor, limit=limit, fields=fields, view=view)
+
+    return _projection_response(films, fields, view)
+
+
+@router.get("/export_films")
+async def export_films(
+    export_format: ExportFormat = "ndjson",
+    db: AsyncSession = Depends(get_async_session),
+):
+    db_manager = DatabaseManager(db)
+    film_crud = db_manager.film_crud
+
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+
+    return StreamingResponse(
+        film_crud.export_films(export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=films.{export_format}"})
+
+
+@router.post("/import_films")
+async def import_films(
+    request: Request,
+    keep_ids: bool = True,
     db: AsyncSession = Depends(get_async_session),
 ):
     db_manager = DatabaseManager(db)
     film_crud = db_manager.film_crud
 
-    return await film_crud.get_all_films(offset=offset, limit=limit)
+    return await film_crud.import_films(request.stream(), keep_ids=keep_ids)
 
 
 @router.get("/get_films_by_name/")
 async def get_films_by_name(
     film_name: str,
+    fields: str = None,
+    view: schemas.FilmView = None,
+    db: AsyncSession = Depends(get_async_session)
+):
+    db_manager = DatabaseManager(db)
+    film_crud = db_manager.film_crud
+
+    films = await film_crud.get_films_by_name(film_name, fields=fields, view=view)
+
+    return _projection_response(films, fields, view)
+
+
+@router.get("/search_films/")
+async def search_films(
+    query: str,
+    limit: int = FILM_SEARCH_LIMIT,
+    db: AsyncSession = Depends(get_async_session)
+):
+    db_manager = DatabaseManager(db)
+    film_crud = db_manager.film_crud
+
+    return await film_crud.search_films(query, limit=limit)
+
+
+@router.get("/autocomplete_films/")
+async def autocomplete_films(
+    query: str,
+    limit: int = AUTOCOMPLETE_LIMIT,
     db: AsyncSession = Depends(get_async_session)
 ):
     db_manager = DatabaseManager(db)
     film_crud = db_manager.film_crud
 
-    return await film_crud.get_films_by_name(film_name)
+    return await film_crud.autocomplete_films(query, limit=limit)
 
 
 @router.patch("/update_film", response_model=schemas.FilmUpdate)
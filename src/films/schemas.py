@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Literal
 
 
 # Базовая схема для Film
@@ -41,6 +41,14 @@ class FilmRead(FilmBase):
     id: int
     average_rating: float | None
     local_rating: float | None
+    rating_count: int = 0
+
+# Схема для переноса каталога между окружениями (экспорт и импорт)
+class FilmTransfer(FilmCreate):
+    id: int | None = None
+    local_rating: float | None = None
+    rating_count: int = 0
+    rating_sum: float = 0.0
 
 # Схема для обновления записи (CRUD - Update)
 class FilmUpdate(FilmBase):
@@ -64,3 +72,22 @@ class FilmUpdate(FilmBase):
     age_rating: str | None
     average_rating: float | None
 
+
+# Фильтры каталога для FilmCRUD.browse_films: жанры объединяются по "и"
+class FilmBrowseFilters(BaseModel):
+    genres: List[str] = []
+    country: str | None = None
+    year_from: int | None = None
+    year_to: int | None = None
+    age_rating: str | None = None
+    director: str | None = None
+
+
+# Именованные наборы столбцов фильма для параметра view: "card" - карточка в сетке
+# каталога, "full" - все столбцы (None)
+FilmView = Literal["card", "full"]
+
+FILM_VIEWS = {
+    "card": ("id", "title", "poster", "year", "genres", "average_rating", "local_rating", "age_rating"),
+    "full": None,
+}
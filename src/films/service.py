@@ -1,14 +1,39 @@
+import csv
+import io
+import json
+
+from typing import AsyncIterator, Literal
+
+from pydantic import ValidationError
+from rapidfuzz import fuzz, process
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from loguru import logger
 from sqlalchemy import or_
 
+from .autocomplete import film_autocomplete
+from .facets import film_facets
+from .config import FILM_SEARCH_MAX_LIMIT, FILM_SEARCH_RERANK, FILM_SEARCH_RERANK_CANDIDATES
 from .dao import FilmDAO
 from .models import Film
 
 from . import schemas
 from . import exceptions
 
+from ..recommendations.cache import recommendation_cache
+from ..recommendations.catalog import film_catalog
+from ..database import async_session_maker
+
+
+ExportFormat = Literal["ndjson", "csv"]
+
+# Количество фильмов, читаемых с сервера и отправляемых клиенту за один шаг
+EXPORT_BATCH_SIZE = 1000
+# Количество фильмов в одном COPY при импорте
+IMPORT_BATCH_SIZE = 5000
+# Сколько ошибок импорта возвращается в ответе (остальные только считаются)
+MAX_REPORTED_IMPORT_ERRORS = 100
+
 
 class FilmCRUD:
     """
@@ -39,64 +64,179 @@ class FilmCRUD:
         await self.db.commit()
         await self.db.refresh(db_film)
 
+        await self._sync_film_indexes(db_film)
+
         return db_film
 
-    async def get_film(self, film_id: int = None) -> Film | None:
+    async def get_film(self, film_id: int = None, fields: str = None, view: schemas.FilmView = None) -> Film | dict | None:
         """
         Получает информацию о фильме по его названию или идентификатору.
 
         Args:
             film_title (str, optional): Название фильма для поиска.
             film_id (int, optional): Идентификатор фильма для поиска.
+            fields (str, optional): Столбцы фильма через запятую (см. get_projection).
+            view (str, optional): Именованный набор столбцов: "card" или "full".
 
         Returns:
-            Optional[Film]: Запись о фильме, если найдена, в противном случае None.
+            Optional[Film | dict]: Запись о фильме (словарь при заданных fields или view),
+                если найдена, в противном случае None.
 
         """
         logger.debug(f"Пытаюсь найти фильм с film_id: {film_id}")
+        columns = self.get_projection(fields, view)
+
+        if columns is not None:
+            films = await FilmDAO.find_rows(self.db, columns, Film.id == film_id)
+            return films[0] if films else None
+
         film = await FilmDAO.find_one_or_none(self.db, Film.id == film_id)
 
         return film
 
-    async def get_all_films(self, *filter, offset: int = 0, limit: int = 100, **filter_by) -> list[Film]:
+    async def get_all_films(
+        self,
+        *filter,
+        cursor: str = None,
+        offset: int = 0,
+        limit: int = 100,
+        fields: str = None,
+        view: schemas.FilmView = None,
+        **filter_by,
+    ) -> dict:
         logger.info("Получаю все фильмы")
         """
-        Получает список фильмов с возможностью фильтрации и пагинации.
+        Получает страницу фильмов с возможностью фильтрации, упорядоченную по id.
 
         Args:
             filter: Фильтры для запроса (например, Film.year > 2000).
-            offset (int, optional): Смещение для пагинации.
+            cursor (str, optional): Курсор из предыдущей страницы.
+            offset (int, optional): Устаревшее смещение, пропускает записи после курсора.
             limit (int, optional): Максимальное количество записей для выборки.
+            fields (str, optional): Столбцы фильма через запятую (см. get_projection).
+            view (str, optional): Именованный набор столбцов: "card" или "full".
             filter_by: Дополнительные фильтры по полям фильма.
 
         Returns:
-            list[Film]: Список фильмов, соответствующих критериям.
+            dict: Фильмы страницы (items) и курсор следующей страницы (next_cursor).
 
         """
-        films = await FilmDAO.find_all(self.db, *filter, offset=offset, limit=limit, **filter_by)
+        films, next_cursor = await FilmDAO.find_page(
+            self.db, *filter, cursor=cursor, offset=offset, limit=limit, columns=self.get_projection(fields, view), **filter_by)
         logger.debug(f"Все фильмы: {films}")
 
-        return films
+        return {"items": films, "next_cursor": next_cursor}
 
-    async def get_films_by_name(self, film_name: str) -> list[Film] | None:
+    async def browse_films(
+        self,
+        filters: schemas.FilmBrowseFilters,
+        cursor: str = None,
+        limit: int = 100,
+        fields: str = None,
+        view: schemas.FilmView = None,
+    ) -> dict:
+        """
+        Получает страницу фильмов по фильтрам каталога и количество подходящих
+        фильмов по жанрам, странам и десятилетиям для боковой панели фильтров.
+
+        Args:
+            filters (schemas.FilmBrowseFilters): Жанры, страна, диапазон лет, возрастной рейтинг и режиссер.
+            cursor (str, optional): Курсор из предыдущей страницы.
+            limit (int, optional): Максимальное количество фильмов на странице.
+            fields (str, optional): Столбцы фильма через запятую (см. get_projection).
+            view (str, optional): Именованный набор столбцов: "card" или "full".
+
+        Returns:
+            dict: Фильмы страницы (items), курсор следующей страницы (next_cursor)
+                и количество фильмов по значениям фасетов (facets).
+
+        """
+        films, next_cursor = await FilmDAO.find_browse_page(
+            self.db, filters, cursor=cursor, limit=limit, columns=self.get_projection(fields, view))
+
+        await film_facets.ensure_loaded(self.db)
+
+        return {"items": films, "next_cursor": next_cursor, "facets": film_facets.count(filters)}
+
+    async def get_films_by_name(
+        self,
+        film_name: str,
+        fields: str = None,
+        view: schemas.FilmView = None,
+    ) -> list[Film | dict] | None:
         """
         Получает информацию о трех фильмах схожих с film_name
         Args:
             film_title (str, optional): Название фильма для поиска.
             film_id (int, optional): Идентификатор фильма для поиска.
+            fields (str, optional): Столбцы фильма через запятую (см. get_projection).
+            view (str, optional): Именованный набор столбцов: "card" или "full".
 
         Returns:
             Optional[Film]: Запись о фильме, если найдена, в противном случае None.
 
         """
+        columns = self.get_projection(fields, view)
+
         try:
             logger.debug(f"Пытаюсь найти похожие фильмы: {film_name}")
-            films = await FilmDAO.find_three_or_none(self.db, film_name.lower())
+            films = await FilmDAO.find_three_or_none(self.db, film_name.lower(), columns=columns)
 
             return films
         except Exception as e:
             logger.opt(exception=e).critical("Error in get_films_by_name")
 
+    async def search_films(self, query: str, limit: int) -> list[Film]:
+        """
+        Ищет фильмы по названию с учетом опечаток.
+
+        Кандидаты отбираются и упорядочиваются по схожести триграмм в базе данных,
+        после чего (если включен FILM_SEARCH_RERANK) доупорядочиваются rapidfuzz
+        по взвешенной схожести строк, которая точнее оценивает частичные совпадения.
+
+        Args:
+            query (str): Поисковый запрос.
+            limit (int): Максимальное количество фильмов, не больше FILM_SEARCH_MAX_LIMIT.
+
+        Returns:
+            list[Film]: Найденные фильмы, наиболее похожие первыми.
+
+        """
+        query = " ".join(query.lower().split())
+        limit = max(1, min(limit, FILM_SEARCH_MAX_LIMIT))
+
+        if not query:
+            return []
+
+        num_candidates = max(limit, FILM_SEARCH_RERANK_CANDIDATES) if FILM_SEARCH_RERANK else limit
+        films = await FilmDAO.search_by_title(self.db, query, num_candidates)
+
+        if not FILM_SEARCH_RERANK:
+            return list(films)
+
+        # При равной оценке сохраняется порядок из базы данных
+        matches = process.extract(
+            query, [film.title.lower() for film in films], scorer=fuzz.WRatio, limit=limit)
+
+        return [films[index] for _, _, index in matches]
+
+    async def autocomplete_films(self, query: str, limit: int) -> list[dict]:
+        """
+        Подсказки фильмов по началу названия из индекса в памяти, без запроса к базе данных
+        (кроме первого построения индекса).
+
+        Args:
+            query (str): Введенная часть названия.
+            limit (int): Максимальное количество фильмов.
+
+        Returns:
+            list[dict]: id, title, poster и year подходящих фильмов.
+
+        """
+        await film_autocomplete.ensure_loaded(self.db)
+
+        return film_autocomplete.complete(query, limit)
+
     async def update_film(self, film_id: int, film_in: schemas.FilmUpdate):
         """
         Обновляет информацию о фильме.
@@ -117,6 +257,8 @@ class FilmCRUD:
 
         await self.db.commit()
 
+        await self._sync_film_indexes(film_update)
+
         return film_update
 
     async def delete_film(self, film_title: str = None, film_id: int = None) -> None:
@@ -130,12 +272,213 @@ class FilmCRUD:
         """
         logger.debug(
             f"Удаляю фильм film_title: {film_title} | film_id: {film_id}")
-        await FilmDAO.delete(self.db, or_(
+        deleted_ids = await FilmDAO.delete(self.db, or_(
             film_id == Film.id,
             film_title == Film.title))
 
         await self.db.commit()
 
+        await self._drop_from_film_indexes(deleted_ids)
+
+    async def export_films(self, export_format: ExportFormat = "ndjson") -> AsyncIterator[str]:
+        """
+        Построчно выгружает весь каталог фильмов в формате NDJSON или CSV.
+
+        Выгрузка читает фильмы курсором на стороне сервера порциями по EXPORT_BATCH_SIZE
+        и отдает их по мере чтения, поэтому потребление памяти не зависит от размера каталога.
+        Массивы в CSV записываются как JSON.
+
+        Args:
+            export_format (str, optional): "ndjson" или "csv". По умолчанию "ndjson".
+
+        Yields:
+            str: Очередная порция выгрузки.
+        """
+
+        columns = list(schemas.FilmTransfer.model_fields)
+
+        # Ответ отправляется уже после выхода из обработчика запроса, поэтому
+        # выгрузка работает в собственной сессии, а не в сессии запроса
+        async with async_session_maker() as db:
+
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+
+            if export_format == "csv":
+                writer.writeheader()
+
+            num_rows = 0
+
+            async for row in FilmDAO.stream_rows(db, yield_per=EXPORT_BATCH_SIZE):
+
+                if export_format == "csv":
+                    writer.writerow({
+                        column: json.dumps(value, ensure_ascii=False) if isinstance(value, list) else value
+                        for column, value in row.items()})
+                else:
+                    buffer.write(json.dumps(row, ensure_ascii=False, default=str))
+                    buffer.write("\n")
+
+                num_rows += 1
+
+                if num_rows % EXPORT_BATCH_SIZE == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+
+            if buffer.tell():
+                yield buffer.getvalue()
+
+        logger.info(f"Выгружено фильмов: {num_rows}")
+
+    async def import_films(self, stream: AsyncIterator[bytes], keep_ids: bool = True) -> dict:
+        """
+        Загружает фильмы из потока NDJSON (по фильму в строке, формат export_films).
+
+        Строки читаются из тела запроса по мере поступления и загружаются через COPY
+        порциями по IMPORT_BATCH_SIZE, поэтому память не зависит от размера каталога.
+        Некорректные строки и фильмы, конфликтующие с существующими (id, title, poster),
+        пропускаются. Все порции фиксируются одним коммитом.
+
+        Args:
+            stream (AsyncIterator[bytes]): Тело запроса.
+            keep_ids (bool, optional): Сохранять идентификаторы фильмов из выгрузки. По умолчанию True.
+
+        Returns:
+            dict: Количество прочитанных строк, добавленных фильмов и ошибки.
+        """
+
+        columns = [column for column in schemas.FilmTransfer.model_fields if keep_ids or column != "id"]
+
+        num_lines = 0
+        num_imported = 0
+        num_errors = 0
+        errors = []
+        records = []
+
+        async for line_number, line in self._iter_lines(stream):
+
+            num_lines += 1
+
+            error = None
+
+            try:
+                film = schemas.FilmTransfer.model_validate_json(line)
+            except ValidationError as e:
+                first_error = e.errors()[0]
+                location = ".".join(str(part) for part in first_error["loc"])
+                error = f"{location}: {first_error['msg']}" if location else first_error["msg"]
+            else:
+                if keep_ids and film.id is None:
+                    error = "id: Field required when keep_ids is set"
+
+            if error:
+                num_errors += 1
+
+                if len(errors) < MAX_REPORTED_IMPORT_ERRORS:
+                    errors.append({"line": line_number, "error": error})
+
+                continue
+
+            film_data = film.model_dump()
+            records.append(tuple(film_data[column] for column in columns))
+
+            if len(records) >= IMPORT_BATCH_SIZE:
+                num_imported += await FilmDAO.copy_records(self.db, columns, records)
+                records = []
+
+        num_imported += await FilmDAO.copy_records(self.db, columns, records)
+
+        if keep_ids:
+            await FilmDAO.sync_id_sequence(self.db)
+
+        await self.db.commit()
+
+        # Каталог перечитывается целиком при следующем обращении
+        film_catalog.invalidate()
+        film_autocomplete.invalidate()
+        film_facets.invalidate()
+        await recommendation_cache.invalidate_all()
+
+        logger.info(f"Импорт фильмов: прочитано {num_lines}, добавлено {num_imported}, ошибок {num_errors}")
+
+        return {
+            "received": num_lines,
+            "imported": num_imported,
+            "skipped": num_lines - num_imported - num_errors,
+            "num_errors": num_errors,
+            "errors": errors,
+        }
+
+    @staticmethod
+    async def _iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, bytes]]:
+
+        line_number = 0
+        remainder = b""
+
+        async for chunk in stream:
+            lines = (remainder + chunk).split(b"\n")
+            remainder = lines.pop()
+
+            for line in lines:
+                line_number += 1
+                if line.strip():
+                    yield line_number, line
+
+        if remainder.strip():
+            yield line_number + 1, remainder
+
+    @staticmethod
+    def get_projection(fields: str = None, view: schemas.FilmView = None) -> list | None:
+        """
+        Определяет столбцы фильма, которые нужно выбрать из базы данных.
+
+        Args:
+            fields (str, optional): Имена столбцов через запятую, например "id,title,poster".
+                Имеют приоритет над view.
+            view (str, optional): Именованный набор столбцов из schemas.FILM_VIEWS.
+
+        Returns:
+            list | None: Столбцы таблицы films (id всегда первый) или None,
+                если проекция не запрошена и нужны объекты Film.
+
+        Raises:
+            InvalidFilmFields: Среди fields есть неизвестные столбцы.
+        """
+
+        if fields is None and view is None:
+            return None
+
+        table_columns = Film.__table__.columns
+
+        if fields is not None:
+            names = [name.strip() for name in fields.split(",") if name.strip()]
+        else:
+            names = schemas.FILM_VIEWS[view] or table_columns.keys()
+
+        unknown = [name for name in names if name not in table_columns]
+        if unknown:
+            raise exceptions.InvalidFilmFields(unknown)
+
+        return [table_columns[name] for name in dict.fromkeys(["id", *names])]
+
+    async def _sync_film_indexes(self, film: Film) -> None:
+
+        # Обновляем in-memory индексы фильмов только после успешного коммита
+        film_catalog.upsert(film)
+        film_autocomplete.upsert(film)
+        film_facets.upsert(film)
+
+        await recommendation_cache.invalidate_all()
+
+    async def _drop_from_film_indexes(self, film_ids: list[int]) -> None:
+
+        film_catalog.remove(film_ids)
+        film_autocomplete.remove(film_ids)
+        film_facets.remove(film_ids)
+
+        await recommendation_cache.invalidate_all()
+
     async def _check_existing_film(self, title: str, poster: str) -> bool:
 
         film = await FilmDAO.find_one_or_none(self.db, or_(
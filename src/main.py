@@ -1,3 +1,5 @@
+import asyncio
+
 import uvicorn
 
 from fastapi import FastAPI, Request
@@ -14,10 +16,17 @@ from src.auth.routers import router as auth_router
 from src.recommendations.routers import router as recommendations_router
 from src.films.routers import router as films_router
 from src.reviews.routers import router as reviews_router
-from src.comments.routers import router as comments_router
+from src.comments.routers import router as comments_router, connection_manager
 from src.user_actions.routers import router as user_action_router
 from src.api_afisha.api_afisha import router as api_afisha_router
 from src.gigachat.router import router as ai_gigachat_router
+from src.recommendations.collaborative import item_engine
+from src.films.autocomplete import film_autocomplete
+from src.films.facets import film_facets
+from src.auth.hashing import password_hasher
+from src.auth.sessions import run_session_purge_loop
+from src.database import async_session_maker
+from src.config import REDIS_URL
 
 logger.add(f"/var/log/movie_rank_backend/log.log",
            format="{time:YYYY-MM-DD HH:mm:ss.SSS} | {level: <8} | {name}:{function}:{line} - {message}",
@@ -57,11 +66,46 @@ app.add_middleware(
 
 async def on_startup():
     redis = aioredis.from_url(
-        "redis://localhost", encoding="utf8", decode_responses=True)
+        REDIS_URL, encoding="utf8", decode_responses=True)
     FastAPICache.init(RedisBackend(redis), prefix="fastapi-cache")
 
+    # Модель item-item строится в фоне и периодически перестраивается
+    app.state.item_engine_task = asyncio.create_task(item_engine.run_refresh_loop())
+    # Истекшие сессии удаляются в фоне пакетами
+    app.state.session_purge_task = asyncio.create_task(run_session_purge_loop())
+
+    # Индексы автодополнения и фасетов строятся до первого запроса; при ошибке они будут построены при первом обращении
+    try:
+        async with async_session_maker() as db:
+            await film_autocomplete.load(db)
+            await film_facets.load(db)
+    except Exception as e:
+        logger.opt(exception=e).error("Не удалось построить индексы фильмов при запуске")
+
+
+async def cancel_task(task: asyncio.Task | None):
+    if task is None:
+        return
+
+    task.cancel()
+
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+async def on_shutdown():
+    # Фоновые задачи останавливаются до закрытия остальных ресурсов
+    await cancel_task(getattr(app.state, "item_engine_task", None))
+    await cancel_task(getattr(app.state, "session_purge_task", None))
+
+    password_hasher.shutdown()
+    await connection_manager.close()
+
 
 app.add_event_handler("startup", on_startup)
+app.add_event_handler("shutdown", on_shutdown)
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -0,0 +1,109 @@
+"""
+Курсорная (keyset) пагинация.
+
+Курсор - непрозрачная для клиента строка с именами и значениями ключей сортировки
+последней записи страницы. Следующая страница начинается строго после этой записи,
+поэтому запрос не просматривает пропущенные строки, как при OFFSET.
+"""
+
+import base64
+import binascii
+import json
+
+from datetime import datetime
+from typing import Any, Sequence
+
+from fastapi import HTTPException
+
+
+class InvalidCursor(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=400, detail="Invalid cursor")
+
+
+# Метка для значений, которые не представимы в JSON напрямую
+DATETIME_TAG = "$dt"
+
+
+def encode_cursor(keys: Sequence[str], values: Sequence[Any]) -> str:
+    """
+    Кодирует ключи сортировки записи в курсор.
+
+    Args:
+        keys (Sequence[str]): Имена столбцов сортировки.
+        values (Sequence[Any]): Значения этих столбцов у последней записи страницы.
+
+    Returns:
+        str: Курсор в base64url.
+    """
+
+    payload = {"k": list(keys), "v": [_encode_value(value) for value in values]}
+    data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: Sequence[str], types: Sequence[type | None] = None) -> list[Any]:
+    """
+    Декодирует курсор и проверяет, что он выдан для той же сортировки.
+
+    Args:
+        cursor (str): Курсор из предыдущего ответа.
+        keys (Sequence[str]): Ожидаемые имена столбцов сортировки.
+        types (Sequence[type | None]): Ожидаемые типы значений ключей (None - не проверять).
+
+    Returns:
+        list[Any]: Значения ключей сортировки.
+
+    Raises:
+        InvalidCursor: Курсор поврежден или выдан для другой сортировки.
+    """
+
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(data)
+
+        if payload["k"] != list(keys) or len(payload["v"]) != len(keys):
+            raise InvalidCursor
+
+        values = [_decode_value(value) for value in payload["v"]]
+
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor from e
+
+    # Значение другого типа дошло бы до базы данных и вызвало бы ошибку сервера
+    if types is not None and not all(_is_instance(value, type_) for value, type_ in zip(values, types)):
+        raise InvalidCursor
+
+    return values
+
+
+def _encode_value(value: Any) -> Any:
+
+    if isinstance(value, datetime):
+        return {DATETIME_TAG: value.isoformat()}
+
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+
+    if isinstance(value, dict):
+        return datetime.fromisoformat(value[DATETIME_TAG])
+
+    return value
+
+
+def _is_instance(value: Any, type_: type | None) -> bool:
+
+    if value is None or type_ is None:
+        return True
+
+    # bool в JSON не является числом, а целое число допустимо для столбца с плавающей точкой
+    if isinstance(value, bool):
+        return type_ is bool
+
+    if type_ is float:
+        return isinstance(value, (int, float))
+
+    return isinstance(value, type_)
@@ -0,0 +1,108 @@
+import json
+
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi_cache import FastAPICache
+from loguru import logger
+
+from .config import RECOMMENDATIONS_CACHE_EXPIRE
+
+from ..utils import get_unique_id
+
+
+class RecommendationCache:
+    """
+    Кэш рекомендаций с ключами по пользователю.
+
+    Ключ результата содержит глобальную версию и версию пользователя, поэтому
+    для инвалидации достаточно сменить версию: старые записи становятся
+    недостижимыми и удаляются по истечении срока жизни. Оценка фильма или
+    изменение списков сбрасывает кэш одного пользователя, изменение каталога -
+    кэш всех пользователей.
+
+    Args:
+        expire (int): Срок жизни закэшированных рекомендаций в секундах.
+    """
+
+    namespace = "recommendations"
+
+    def __init__(self, expire: int = RECOMMENDATIONS_CACHE_EXPIRE) -> None:
+        self.expire = expire
+
+    async def get(self, user_id: str, params: dict) -> Any | None:
+
+        try:
+            backend = FastAPICache.get_backend()
+
+            versions = await self._get_versions(user_id)
+            cached = await backend.get(self._get_key(user_id, params, versions))
+
+            return None if cached is None else json.loads(cached)
+
+        except Exception as e:
+            logger.opt(exception=e).error("Error in RecommendationCache.get")
+            return None
+
+    async def set(self, user_id: str, params: dict, recommendations: Any) -> None:
+
+        try:
+            backend = FastAPICache.get_backend()
+
+            versions = await self._get_versions(user_id)
+            value = json.dumps(jsonable_encoder(recommendations))
+
+            await backend.set(self._get_key(user_id, params, versions), value, expire=self.expire)
+
+        except Exception as e:
+            logger.opt(exception=e).error("Error in RecommendationCache.set")
+
+    async def invalidate_user(self, user_id: str) -> None:
+        """ Сбрасывает закэшированные рекомендации пользователя """
+
+        await self._set_version(self._get_user_version_key(user_id))
+
+    async def invalidate_all(self) -> None:
+        """ Сбрасывает закэшированные рекомендации всех пользователей """
+
+        await self._set_version(self._get_global_version_key())
+
+    async def _get_versions(self, user_id: str) -> tuple[str, str]:
+
+        backend = FastAPICache.get_backend()
+
+        global_version = await backend.get(self._get_global_version_key())
+        user_version = await backend.get(self._get_user_version_key(user_id))
+
+        return global_version or "0", user_version or "0"
+
+    async def _set_version(self, key: str) -> None:
+
+        try:
+            backend = FastAPICache.get_backend()
+
+            # Версия живет дольше результатов, иначе после ее истечения
+            # снова стали бы доступны записи со старой версией
+            await backend.set(key, await get_unique_id(), expire=self.expire * 2)
+
+        except Exception as e:
+            logger.opt(exception=e).error("Error in RecommendationCache._set_version")
+
+    def _get_key(self, user_id: str, params: dict, versions: tuple[str, str]) -> str:
+
+        global_version, user_version = versions
+        params_key = ":".join(f"{name}={params[name]}" for name in sorted(params))
+
+        return f"{self._get_prefix()}:{global_version}:{user_version}:{user_id}:{params_key}"
+
+    def _get_global_version_key(self) -> str:
+        return f"{self._get_prefix()}:global_version"
+
+    def _get_user_version_key(self, user_id: str) -> str:
+        return f"{self._get_prefix()}:user_version:{user_id}"
+
+    def _get_prefix(self) -> str:
+        return f"{FastAPICache.get_prefix()}:{self.namespace}"
+
+
+recommendation_cache = RecommendationCache()
@@ -0,0 +1,189 @@
+import asyncio
+import sys
+
+from time import monotonic
+from typing import Iterable, NamedTuple
+
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import CATALOG_REFRESH_INTERVAL
+from .scoring import GenreMatrix
+
+from ..films.models import Film
+
+
+class CatalogFilm(NamedTuple):
+    """
+    Компактное представление фильма, достаточное для рекомендательной системы.
+    """
+
+    id: int
+    genres: tuple[str, ...]
+    average_rating: float | None
+    local_rating: float | None
+    rating_count: int = 0
+
+
+class FilmCatalog:
+    """
+    Общий для процесса снимок каталога фильмов.
+
+    Хранит только идентификатор, жанры, рейтинги и число оценок фильма, чтобы рекомендательной
+    системе не приходилось загружать полные строки таблицы films на каждый запрос.
+    Снимок обновляется инкрементально при изменении фильмов через FilmCRUD и
+    полностью перечитывается не реже, чем раз в CATALOG_REFRESH_INTERVAL секунд
+    (изменения, сделанные другими воркерами).
+    """
+
+    def __init__(self, refresh_interval: float = CATALOG_REFRESH_INTERVAL) -> None:
+        self.refresh_interval = refresh_interval
+        self.version = 0
+        self.genres_version = 0
+
+        self._films: dict[int, CatalogFilm] = {}
+        self._genre_sets: dict[tuple[str, ...], tuple[str, ...]] = {}
+        self._snapshot: tuple[CatalogFilm, ...] | None = None
+        self._genre_matrix: GenreMatrix | None = None
+        self._genre_matrix_version: int | None = None
+        self._genre_matrix_films_version: int | None = None
+        self._loaded_at: float | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or monotonic() - self._loaded_at >= self.refresh_interval
+
+    async def get_films(self, db: AsyncSession) -> tuple[CatalogFilm, ...]:
+        """
+        Возвращает снимок каталога, при необходимости загружая его из базы данных.
+
+        Args:
+            db (AsyncSession): Сессия для работы с базой данных.
+
+        Returns:
+            tuple[CatalogFilm]: Все фильмы каталога в порядке идентификаторов.
+        """
+
+        await self.ensure_loaded(db)
+
+        if self._snapshot is None:
+            self._snapshot = tuple(self._films[film_id] for film_id in sorted(self._films))
+
+        return self._snapshot
+
+    async def get_genre_matrix(self, db: AsyncSession) -> GenreMatrix:
+        """
+        Возвращает матрицу жанров текущего снимка каталога.
+        Матрица перестраивается только после изменения состава фильмов или их жанров,
+        после изменения только рейтингов обновляются фильмы и их популярность.
+
+        Args:
+            db (AsyncSession): Сессия для работы с базой данных.
+
+        Returns:
+            GenreMatrix: Матрица жанров каталога.
+        """
+
+        films = await self.get_films(db)
+
+        if self._genre_matrix_version != self.genres_version:
+            self._genre_matrix = GenreMatrix(films)
+            self._genre_matrix_version = self.genres_version
+            self._genre_matrix_films_version = self.version
+
+        elif self._genre_matrix_films_version != self.version:
+            self._genre_matrix = self._genre_matrix.with_films(films)
+            self._genre_matrix_films_version = self.version
+
+        return self._genre_matrix
+
+    async def get_film(self, db: AsyncSession, film_id: int) -> CatalogFilm | None:
+        await self.ensure_loaded(db)
+        return self._films.get(film_id)
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+
+        if not self.is_stale:
+            return
+
+        async with self._lock:
+            # Пока ждали блокировку, каталог мог загрузить другой запрос
+            if self.is_stale:
+                await self.load(db)
+
+    async def load(self, db: AsyncSession) -> None:
+        """
+        Полностью перечитывает каталог из базы данных.
+
+        Args:
+            db (AsyncSession): Сессия для работы с базой данных.
+        """
+
+        try:
+            query = select(Film.id, Film.genres, Film.average_rating, Film.local_rating, Film.rating_count)
+            result = await db.execute(query)
+
+            self._genre_sets = {}
+            self._films = {row.id: self._make_film(row) for row in result}
+            self._loaded_at = monotonic()
+            self._changed()
+
+            logger.debug(f"Каталог фильмов загружен: {len(self._films)} фильмов")
+
+        except Exception as e:
+            logger.opt(exception=e).critical("Error in FilmCatalog.load")
+            raise
+
+    def upsert(self, film: Film) -> None:
+        """
+        Добавляет или обновляет фильм в загруженном каталоге.
+
+        Args:
+            film (Film): Созданный или обновленный фильм.
+        """
+
+        if film is None or self._loaded_at is None:
+            return
+
+        previous = self._films.get(film.id)
+        self._films[film.id] = self._make_film(film)
+
+        self._changed(genres_changed=previous is None or previous.genres != self._films[film.id].genres)
+
+    def remove(self, film_ids: Iterable[int]) -> None:
+        """
+        Удаляет фильмы из загруженного каталога.
+
+        Args:
+            film_ids (Iterable[int]): Идентификаторы удаленных фильмов.
+        """
+
+        removed = [self._films.pop(film_id, None) for film_id in film_ids]
+
+        if any(removed):
+            self._changed()
+
+    def invalidate(self) -> None:
+        """ Помечает каталог устаревшим: он будет перечитан при следующем обращении """
+
+        self._loaded_at = None
+
+    def _make_film(self, film) -> CatalogFilm:
+        genres = tuple(sys.intern(genre) for genre in film.genres or ())
+
+        # Одинаковые наборы жанров у разных фильмов хранятся одним кортежем
+        genres = self._genre_sets.setdefault(genres, genres)
+
+        return CatalogFilm(film.id, genres, film.average_rating, film.local_rating, film.rating_count or 0)
+
+    def _changed(self, genres_changed: bool = True) -> None:
+        self.version += 1
+        self._snapshot = None
+
+        if genres_changed:
+            self.genres_version += 1
+
+
+film_catalog = FilmCatalog()
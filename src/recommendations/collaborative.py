@@ -0,0 +1,253 @@
+import asyncio
+import heapq
+
+from array import array
+from time import monotonic
+from typing import NamedTuple
+
+import numpy as np
+
+from loguru import logger
+from scipy import sparse
+from sqlalchemy import select
+
+from .config import ITEM_MODEL_NEIGHBOURS, ITEM_MODEL_REFRESH_INTERVAL
+from .config import THRESHOLD_FOR_POSITIVE_RATING
+
+from ..database import async_session_maker
+from ..user_actions.models import UserFilmRating
+
+
+# Количество фильмов, для которых сходство считается за один шаг построения модели
+SIMILARITY_BLOCK_SIZE = 1024
+
+
+class ItemNeighbours(NamedTuple):
+    film_ids: np.ndarray
+    similarities: np.ndarray
+
+
+class ItemSimilarityModel:
+    """
+    Предрасчитанная модель item-item сходства фильмов.
+
+    Для каждого фильма хранит не более top_k наиболее похожих фильмов, поэтому
+    размер модели ограничен (число фильмов x top_k) независимо от числа оценок.
+
+    Args:
+        neighbours (dict[int, ItemNeighbours]): Соседи каждого фильма по убыванию сходства.
+        num_ratings (int): Количество оценок, по которым построена модель.
+    """
+
+    def __init__(self, neighbours: dict[int, ItemNeighbours], num_ratings: int) -> None:
+        self.neighbours = neighbours
+        self.num_ratings = num_ratings
+        self.built_at = monotonic()
+
+    def __len__(self) -> int:
+        return len(self.neighbours)
+
+    def recommend(self, user_ratings: list, num_films: int) -> list[tuple[int, float, tuple[int, ...]]]:
+        """
+        Подбирает фильмы, похожие на оцененные пользователем.
+
+        Оценка кандидата - сумма сходств с оцененными фильмами, взвешенных отклонением
+        оценки пользователя от THRESHOLD_FOR_POSITIVE_RATING: фильмы, похожие на
+        понравившиеся, поднимаются, а похожие на не понравившиеся - опускаются.
+
+        Args:
+            user_ratings (list): Список кортежей (film_id, rating).
+            num_films (int): Количество фильмов для рекомендации.
+
+        Returns:
+            list[tuple[int, float, tuple[int]]]: Кортежи (film_id, оценка, фильмы пользователя,
+            давшие наибольший вклад) по убыванию оценки.
+        """
+
+        if not user_ratings or num_films <= 0:
+            return []
+
+        rated_films = {film_id: rating for film_id, rating in user_ratings}
+        positive_rating = float(THRESHOLD_FOR_POSITIVE_RATING)
+
+        scores: dict[int, float] = {}
+        contributions: dict[int, list[tuple[float, int]]] = {}
+
+        for film_id, rating in rated_films.items():
+
+            neighbours = self.neighbours.get(film_id)
+            deviation = rating - positive_rating
+
+            if neighbours is None or deviation == 0:
+                continue
+
+            for neighbour_id, similarity in zip(neighbours.film_ids.tolist(), neighbours.similarities.tolist()):
+
+                if neighbour_id in rated_films:
+                    continue
+
+                contribution = similarity * deviation
+                scores[neighbour_id] = scores.get(neighbour_id, 0.0) + contribution
+                contributions.setdefault(neighbour_id, []).append((contribution, film_id))
+
+        best = heapq.nsmallest(
+            num_films,
+            ((film_id, score) for film_id, score in scores.items() if score > 0),
+            key=lambda item: (-item[1], item[0]))
+
+        return [
+            (film_id, round(score, 6), tuple(source for _, source in sorted(contributions[film_id], reverse=True)[:3]))
+            for film_id, score in best
+        ]
+
+
+def build_item_similarity_model(user_indices: np.ndarray,
+                                film_ids: np.ndarray,
+                                ratings: np.ndarray,
+                                top_k: int = ITEM_MODEL_NEIGHBOURS) -> ItemSimilarityModel:
+    """
+    Строит модель item-item сходства по скорректированному косинусу.
+
+    Из каждой оценки вычитается средняя оценка пользователя, после чего сходство
+    фильмов считается как косинус между их столбцами разреженной матрицы
+    (пользователи x фильмы). Произведение матриц считается блоками по
+    SIMILARITY_BLOCK_SIZE фильмов, и от каждого блока остаются только top_k соседей,
+    поэтому полная матрица сходства в памяти никогда не хранится.
+
+    Args:
+        user_indices (np.ndarray): Номер пользователя для каждой оценки.
+        film_ids (np.ndarray): Идентификатор фильма для каждой оценки.
+        ratings (np.ndarray): Значения оценок.
+        top_k (int, optional): Количество соседей, сохраняемых для каждого фильма.
+
+    Returns:
+        ItemSimilarityModel: Построенная модель.
+    """
+
+    if not len(ratings):
+        return ItemSimilarityModel({}, 0)
+
+    unique_film_ids, film_columns = np.unique(film_ids, return_inverse=True)
+    num_users = int(user_indices.max()) + 1
+
+    user_sums = np.bincount(user_indices, weights=ratings, minlength=num_users)
+    user_counts = np.bincount(user_indices, minlength=num_users)
+    centered = (ratings - (user_sums / np.maximum(user_counts, 1))[user_indices]).astype(np.float32)
+
+    # Строки - фильмы, столбцы - пользователи
+    item_matrix = sparse.csr_matrix(
+        (centered, (film_columns, user_indices)),
+        shape=(len(unique_film_ids), num_users))
+
+    norms = np.sqrt(np.asarray(item_matrix.multiply(item_matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    item_matrix = sparse.diags(1 / norms).dot(item_matrix).tocsr()
+
+    item_matrix_t = item_matrix.T.tocsr()
+    neighbours = {}
+
+    for block_start in range(0, item_matrix.shape[0], SIMILARITY_BLOCK_SIZE):
+
+        block = item_matrix[block_start:block_start + SIMILARITY_BLOCK_SIZE]
+        similarities = block.dot(item_matrix_t).tocsr()
+
+        for offset in range(similarities.shape[0]):
+
+            row = block_start + offset
+            start, end = similarities.indptr[offset], similarities.indptr[offset + 1]
+
+            columns = similarities.indices[start:end]
+            values = similarities.data[start:end]
+
+            mask = (columns != row) & (values > 0)
+            columns, values = columns[mask], values[mask]
+
+            if not len(values):
+                continue
+
+            if len(values) > top_k:
+                top = np.argpartition(-values, top_k - 1)[:top_k]
+                columns, values = columns[top], values[top]
+
+            order = np.argsort(-values, kind="stable")
+
+            neighbours[int(unique_film_ids[row])] = ItemNeighbours(
+                unique_film_ids[columns[order]].astype(np.int32),
+                values[order].astype(np.float32))
+
+    return ItemSimilarityModel(neighbours, len(ratings))
+
+
+class ItemBasedEngine:
+    """
+    Рекомендательный движок на основе item-item коллаборативной фильтрации.
+
+    Модель строится в фоне по всей таблице user_film_ratings и периодически
+    перестраивается; запросы обслуживаются только по предрасчитанным спискам соседей.
+    """
+
+    def __init__(self, refresh_interval: float = ITEM_MODEL_REFRESH_INTERVAL, top_k: int = ITEM_MODEL_NEIGHBOURS) -> None:
+        self.refresh_interval = refresh_interval
+        self.top_k = top_k
+        self.model: ItemSimilarityModel | None = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self.model is not None
+
+    def recommend(self, user_ratings: list, num_films: int) -> list[tuple[int, float, tuple[int, ...]]]:
+
+        if self.model is None:
+            return []
+
+        return self.model.recommend(user_ratings, num_films)
+
+    async def refresh(self) -> None:
+        """ Перестраивает модель по текущим оценкам пользователей """
+
+        try:
+            started_at = monotonic()
+
+            user_indices, film_ids, ratings = await self._load_ratings()
+            model = await asyncio.to_thread(
+                build_item_similarity_model, user_indices, film_ids, ratings, self.top_k)
+
+            self.model = model
+
+            logger.info(
+                f"Модель item-item построена: {len(model)} фильмов, {model.num_ratings} оценок, "
+                f"{monotonic() - started_at:.1f} с")
+
+        except Exception as e:
+            logger.opt(exception=e).critical("Error in ItemBasedEngine.refresh")
+
+    async def run_refresh_loop(self) -> None:
+
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.refresh_interval)
+
+    @staticmethod
+    async def _load_ratings() -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+
+        user_numbers: dict[str, int] = {}
+        user_indices, film_ids, ratings = array("q"), array("q"), array("d")
+
+        query = select(UserFilmRating.user_id, UserFilmRating.film_id, UserFilmRating.rating)
+
+        async with async_session_maker() as session:
+            result = await session.stream(query.execution_options(yield_per=10_000))
+
+            async for user_id, film_id, rating in result:
+                user_indices.append(user_numbers.setdefault(user_id, len(user_numbers)))
+                film_ids.append(film_id)
+                ratings.append(rating)
+
+        return (
+            np.frombuffer(user_indices, dtype=np.int64),
+            np.frombuffer(film_ids, dtype=np.int64),
+            np.frombuffer(ratings, dtype=np.float64),
+        )
+
+
+item_engine = ItemBasedEngine()
@@ -7,3 +7,24 @@ load_dotenv()
 SIMILARITY_COEFFICIENT = os.environ.get("SIMILARITY_COEFFICIENT")
 THRESHOLD_FOR_POSITIVE_RATING = os.environ.get("THRESHOLD_FOR_POSITIVE_RATING")
 NUM_GENRES = os.environ.get("NUM_GENRES")
+
+CATALOG_REFRESH_INTERVAL = int(os.environ.get("CATALOG_REFRESH_INTERVAL", 600))
+
+ITEM_MODEL_NEIGHBOURS = int(os.environ.get("ITEM_MODEL_NEIGHBOURS", 30))
+ITEM_MODEL_REFRESH_INTERVAL = int(os.environ.get("ITEM_MODEL_REFRESH_INTERVAL", 60 * 60))
+
+RECOMMENDATIONS_CACHE_EXPIRE = int(os.environ.get("RECOMMENDATIONS_CACHE_EXPIRE", 60 * 60 * 24))
+
+# Источник кандидатов для рекомендаций по жанрам: "catalog" - снимок каталога в памяти,
+# "sql" - выборка неоцененных фильмов с нужными жанрами на стороне базы данных
+RECOMMENDATIONS_CANDIDATE_SOURCE = os.environ.get("RECOMMENDATIONS_CANDIDATE_SOURCE", "catalog")
+
+# Этапы переранжирования кандидатов через запятую: "popularity" - априорная популярность,
+# "diversity" - разнообразие жанров (MMR). Пустая строка отключает переранжирование
+RERANKING_STAGES = [stage.strip() for stage in os.environ.get("RERANKING_STAGES", "popularity,diversity").split(",") if stage.strip()]
+RERANK_CANDIDATES_FACTOR = int(os.environ.get("RERANK_CANDIDATES_FACTOR", 3))
+RERANK_POPULARITY_WEIGHT = float(os.environ.get("RERANK_POPULARITY_WEIGHT", 0.2))
+RERANK_DIVERSITY_LAMBDA = float(os.environ.get("RERANK_DIVERSITY_LAMBDA", 0.7))
+
+# Во сколько раз пул популярных фильмов больше числа недостающих рекомендаций
+FALLBACK_POOL_FACTOR = int(os.environ.get("FALLBACK_POOL_FACTOR", 5))
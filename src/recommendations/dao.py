@@ -0,0 +1,8 @@
+from .models import UserRecommendation
+from .schemas import UserRecommendationCreate, UserRecommendationUpdate
+
+from ..dao import BaseDAO
+
+
+class UserRecommendationDAO(BaseDAO[UserRecommendation, UserRecommendationCreate, UserRecommendationUpdate]):
+    model = UserRecommendation
@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from sqlalchemy import TIMESTAMP, Float, ForeignKey, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from ..database import Base
+
+
+class UserRecommendation(Base):
+    __tablename__ = "user_recommendations"
+
+    user_id: Mapped[str] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    film_ids: Mapped[list] = mapped_column(ARRAY(Integer), nullable=False, default=[])
+    scores: Mapped[list] = mapped_column(ARRAY(Float), nullable=False, default=[])
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True),
+                                                 server_default=func.now())
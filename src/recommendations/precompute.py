@@ -0,0 +1,211 @@
+"""
+Пакетный предрасчет рекомендаций для всех активных пользователей.
+
+Активными считаются пользователи, у которых есть хотя бы одна оценка фильма.
+Каталог загружается один раз, пользователи обрабатываются порциями, а расчет
+рекомендаций распределяется по пулу процессов. Результаты сохраняются в таблицу
+user_recommendations, откуда их отдает Recommendations.get_recommendations.
+
+Запуск:
+    python -m src.recommendations.precompute --chunk-size 1000 --workers 4 --num-films 20
+"""
+
+import argparse
+import asyncio
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+from time import monotonic
+
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.redis import RedisBackend
+from loguru import logger
+from redis import asyncio as aioredis
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .cache import recommendation_cache
+from .catalog import film_catalog
+from .models import UserRecommendation
+from .scoring import GenreMatrix
+from .service import RECENT_RATINGS_LIMIT, Recommendations
+
+from ..config import REDIS_URL
+from ..database import async_session_maker
+from ..user_actions.models import UserFilmRating
+
+
+# Матрица жанров, переданная в процесс пула при его запуске
+_genre_matrix: GenreMatrix | None = None
+
+
+def _init_worker(genre_matrix: GenreMatrix) -> None:
+    global _genre_matrix
+    _genre_matrix = genre_matrix
+
+
+def _score_users(users: list[tuple[str, list]], num_films: int) -> list[tuple[str, list[int], list[float]]]:
+    return asyncio.run(_score_users_async(users, num_films))
+
+
+async def _score_users_async(users: list[tuple[str, list]], num_films: int) -> list[tuple[str, list[int], list[float]]]:
+
+    # Рекомендации не хранят состояние пользователя, поэтому один экземпляр обслуживает всю порцию
+    recommendations = Recommendations(db=None)
+    results = []
+
+    for user_id, user_ratings in users:
+
+        rating_partition = recommendations._partition_ratings(user_ratings)
+        ranked_films = await recommendations._get_ranked_films(
+            num_films, _genre_matrix, rating_partition, seed=user_id)
+
+        results.append((
+            user_id,
+            [ranked_film.film.id for ranked_film in ranked_films],
+            [ranked_film.score for ranked_film in ranked_films],
+        ))
+
+    return results
+
+
+async def _get_user_ids_chunk(db: AsyncSession, after_user_id: str | None, chunk_size: int) -> list[str]:
+
+    query = (
+        select(UserFilmRating.user_id)
+        .distinct()
+        .order_by(UserFilmRating.user_id)
+        .limit(chunk_size)
+    )
+
+    if after_user_id is not None:
+        query = query.where(UserFilmRating.user_id > after_user_id)
+
+    result = await db.execute(query)
+    return result.scalars().all()
+
+
+async def _get_recent_ratings(db: AsyncSession, user_ids: list[str]) -> dict[str, list[tuple[int, float]]]:
+
+    position = func.row_number().over(
+        partition_by=UserFilmRating.user_id,
+        order_by=UserFilmRating.id.desc(),
+    ).label("position")
+
+    ratings = (
+        select(UserFilmRating.user_id, UserFilmRating.film_id, UserFilmRating.rating, position)
+        .where(UserFilmRating.user_id.in_(user_ids))
+        .subquery()
+    )
+
+    query = (
+        select(ratings.c.user_id, ratings.c.film_id, ratings.c.rating)
+        .where(ratings.c.position <= RECENT_RATINGS_LIMIT)
+        .order_by(ratings.c.user_id, ratings.c.position)
+    )
+
+    user_ratings = {user_id: [] for user_id in user_ids}
+
+    for user_id, film_id, rating in await db.execute(query):
+        user_ratings[user_id].append((film_id, rating))
+
+    return user_ratings
+
+
+async def _save_recommendations(db: AsyncSession, results: list[tuple[str, list[int], list[float]]]) -> None:
+
+    if not results:
+        return
+
+    stmt = insert(UserRecommendation).values([
+        {"user_id": user_id, "film_ids": film_ids, "scores": scores}
+        for user_id, film_ids, scores in results
+    ])
+
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserRecommendation.user_id],
+        set_={
+            "film_ids": stmt.excluded.film_ids,
+            "scores": stmt.excluded.scores,
+            "created_at": func.now(),
+        },
+    )
+
+    await db.execute(stmt)
+    await db.commit()
+
+    # В кэше могли остаться рекомендации, отданные до перезаписи
+    await recommendation_cache.invalidate_all()
+
+
+async def precompute_recommendations(chunk_size: int, workers: int, num_films: int) -> int:
+    """
+    Рассчитывает и сохраняет рекомендации для всех активных пользователей.
+
+    Args:
+        chunk_size (int): Количество пользователей, обрабатываемых за одну порцию.
+        workers (int): Количество процессов для расчета рекомендаций.
+        num_films (int): Количество фильмов, сохраняемых для каждого пользователя.
+
+    Returns:
+        int: Количество обработанных пользователей.
+    """
+
+    started_at = monotonic()
+    processed = 0
+
+    # Задание запускается вне приложения, а кэш рекомендаций хранится в том же Redis
+    redis = aioredis.from_url(REDIS_URL, encoding="utf8", decode_responses=True)
+    FastAPICache.init(RedisBackend(redis), prefix="fastapi-cache")
+
+    async with async_session_maker() as db:
+
+        genre_matrix = await film_catalog.get_genre_matrix(db)
+        logger.info(f"Каталог загружен: {len(genre_matrix)} фильмов")
+
+        loop = asyncio.get_running_loop()
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(genre_matrix,)) as pool:
+
+            last_user_id = None
+
+            while True:
+
+                user_ids = await _get_user_ids_chunk(db, last_user_id, chunk_size)
+                if not user_ids:
+                    break
+
+                user_ratings = list((await _get_recent_ratings(db, user_ids)).items())
+
+                batch_size = -(-len(user_ratings) // workers)
+                batches = [user_ratings[i:i + batch_size] for i in range(0, len(user_ratings), batch_size)]
+
+                batch_results = await asyncio.gather(*(
+                    loop.run_in_executor(pool, _score_users, batch, num_films) for batch in batches))
+
+                await _save_recommendations(db, [result for results in batch_results for result in results])
+
+                processed += len(user_ids)
+                last_user_id = user_ids[-1]
+
+                logger.info(f"Рекомендации рассчитаны для {processed} пользователей")
+
+    logger.info(f"Предрасчет рекомендаций завершен: {processed} пользователей за {monotonic() - started_at:.1f} с")
+
+    return processed
+
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description="Предрасчет рекомендаций для активных пользователей")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--num-films", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(precompute_recommendations(args.chunk_size, args.workers, args.num_films))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import hashlib
+import random
+
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Iterable, Sequence, TypeVar
+
+from .config import RERANK_CANDIDATES_FACTOR, RERANK_DIVERSITY_LAMBDA
+from .config import RERANK_POPULARITY_WEIGHT, RERANKING_STAGES
+from .scoring import get_popularity_priors
+
+if TYPE_CHECKING:
+    from .service import RankedFilm
+
+
+T = TypeVar("T")
+
+
+class RerankStage(ABC):
+    """
+    Этап переранжирования кандидатов, отобранных по схожести.
+    Получает кандидатов по убыванию оценки и возвращает их в новом порядке.
+    """
+
+    @abstractmethod
+    def rerank(self, ranked_films: list["RankedFilm"], num_films: int) -> list["RankedFilm"]:
+        ...
+
+
+class PopularityPrior(RerankStage):
+    """
+    Добавляет к оценке схожести априорную популярность фильма
+    (см. scoring.get_popularity_priors), чтобы среди одинаково схожих фильмов
+    выше оказывались известные и высоко оцененные.
+
+    Args:
+        weight (float): Вес популярности относительно оценки схожести.
+    """
+
+    def __init__(self, weight: float = RERANK_POPULARITY_WEIGHT) -> None:
+        self.weight = weight
+
+    def rerank(self, ranked_films: list["RankedFilm"], num_films: int) -> list["RankedFilm"]:
+
+        priors = get_popularity_priors([ranked_film.film for ranked_film in ranked_films])
+
+        ranked_films = [
+            ranked_film._replace(score=round(ranked_film.score + self.weight * float(prior), 6))
+            for ranked_film, prior in zip(ranked_films, priors)
+        ]
+
+        return sorted(ranked_films, key=lambda ranked_film: (-ranked_film.score, ranked_film.film.id))
+
+
+class GenreDiversity(RerankStage):
+    """
+    Упорядочивает кандидатов по Maximal Marginal Relevance: каждый следующий фильм
+    выбирается по оценке, уменьшенной на сходство жанров (мера Жаккара)
+    с уже выбранными фильмами.
+
+    Args:
+        trade_off (float): Доля оценки схожести в MMR: 1 - без учета разнообразия.
+    """
+
+    def __init__(self, trade_off: float = RERANK_DIVERSITY_LAMBDA) -> None:
+        self.trade_off = trade_off
+
+    def rerank(self, ranked_films: list["RankedFilm"], num_films: int) -> list["RankedFilm"]:
+
+        if len(ranked_films) <= 1:
+            return ranked_films
+
+        max_score = max(ranked_film.score for ranked_film in ranked_films) or 1
+
+        remaining = {ranked_film.film.id: ranked_film for ranked_film in ranked_films}
+        genres = {film_id: frozenset(ranked_film.film.genres) for film_id, ranked_film in remaining.items()}
+
+        # Наибольшее сходство каждого кандидата с уже выбранными фильмами
+        redundancy = dict.fromkeys(remaining, 0.0)
+        selected = []
+
+        while remaining and len(selected) < num_films:
+
+            best_id = max(remaining, key=lambda film_id: (
+                self.trade_off * remaining[film_id].score / max_score - (1 - self.trade_off) * redundancy[film_id],
+                -film_id))
+
+            selected.append(remaining.pop(best_id))
+
+            for film_id in remaining:
+                redundancy[film_id] = max(redundancy[film_id], self._get_jaccard(genres[film_id], genres[best_id]))
+
+        return selected + list(remaining.values())
+
+    @staticmethod
+    def _get_jaccard(first: frozenset[str], second: frozenset[str]) -> float:
+        union = len(first | second)
+        return len(first & second) / union if union else 0.0
+
+
+class Reranker:
+    """
+    Последовательность этапов переранжирования.
+
+    Чтобы этапам было из чего выбирать, схожих фильмов отбирается в candidates_factor
+    раз больше, чем нужно рекомендовать; после всех этапов остаются первые num_films.
+
+    Args:
+        stages (Sequence[RerankStage]): Этапы в порядке применения.
+        candidates_factor (int): Во сколько раз кандидатов больше, чем рекомендаций.
+    """
+
+    def __init__(self, stages: Sequence[RerankStage], candidates_factor: int = RERANK_CANDIDATES_FACTOR) -> None:
+        self.stages = tuple(stages)
+        self.candidates_factor = max(candidates_factor, 1)
+
+    def get_num_candidates(self, num_films: int) -> int:
+        return num_films * self.candidates_factor if self.stages else num_films
+
+    def rerank(self, ranked_films: list["RankedFilm"], num_films: int) -> list["RankedFilm"]:
+
+        for stage in self.stages:
+            ranked_films = stage.rerank(ranked_films, num_films)
+
+        return ranked_films[:num_films]
+
+
+RERANK_STAGES = {
+    "popularity": PopularityPrior,
+    "diversity": GenreDiversity,
+}
+
+
+def build_reranker(stage_names: Iterable[str]) -> Reranker:
+    """
+    Собирает Reranker из этапов, перечисленных по именам из RERANK_STAGES.
+
+    Args:
+        stage_names (Iterable[str]): Имена этапов в порядке применения.
+
+    Returns:
+        Reranker: Переранжировщик.
+    """
+
+    try:
+        return Reranker([RERANK_STAGES[name]() for name in stage_names])
+    except KeyError as e:
+        raise ValueError(f"Unknown reranking stage: {e.args[0]}") from e
+
+
+def seeded_sample(population: Sequence[T], k: int, seed: str | None) -> list[T]:
+    """
+    Выбирает k случайных элементов. При одинаковом seed выборка одинакова
+    во всех процессах (в отличие от hash(), sha256 не зависит от PYTHONHASHSEED).
+
+    Args:
+        population (Sequence): Элементы для выборки.
+        k (int): Размер выборки.
+        seed (str | None): Зерно выборки, например идентификатор пользователя.
+            None - недетерминированная выборка.
+
+    Returns:
+        list: Выбранные элементы.
+    """
+
+    k = min(k, len(population))
+
+    if seed is None:
+        return random.sample(population, k)
+
+    digest = hashlib.sha256(seed.encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big")).sample(population, k)
+
+
+reranker = build_reranker(RERANKING_STAGES)
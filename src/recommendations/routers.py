@@ -1,9 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi_cache.decorator import cache
 
-from .service import DatabaseManager
+from .service import DatabaseManager, RecommendationEngine
 
 from ..database import get_async_session
 
@@ -12,15 +11,17 @@ router = APIRouter()
 
 
 @router.get("/get_recommendations/")
-@cache(expire=60*60)
 async def get_recommendations(
         user_id: str,
         num_films: int = 20,
+        ranked: bool = False,
+        engine: RecommendationEngine = "genre",
         db: AsyncSession = Depends(get_async_session)):
     try:
         db_manager = DatabaseManager(db)
         recommendations = db_manager.recommendations
-        recommendations = await recommendations.get_recommendations(user_id, num_films)
+        recommendations = await recommendations.get_recommendations(
+            user_id, num_films, ranked=ranked, engine=engine)
 
         return recommendations
     except Exception as e:
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import List
+
+
+# Схема для создания записи (CRUD - Create)
+class UserRecommendationCreate(BaseModel):
+    user_id: str
+    film_ids: List[int]
+    scores: List[float]
+
+
+# Схема для обновления записи (CRUD - Update)
+class UserRecommendationUpdate(BaseModel):
+    film_ids: List[int] | None
+    scores: List[float] | None
@@ -0,0 +1,189 @@
+import heapq
+
+from copy import copy
+from typing import TYPE_CHECKING, Iterable, Sequence
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .catalog import CatalogFilm
+
+
+# Допуск на погрешность float32 при сравнении суммы коэффициентов с порогом
+SCORE_EPSILON = 1e-6
+
+# Рейтинг фильма без внешней оценки
+DEFAULT_RATING = 5.0
+# Сколько "виртуальных" оценок с внешним рейтингом добавляется к оценкам пользователей
+PRIOR_RATINGS = 10
+# Количество оценок, при котором популярность фильма равна 0.5
+POPULARITY_HALF_COUNT = 50
+
+
+class GenreMatrix:
+    """
+    Матрица жанров каталога: строка - фильм, столбец - жанр.
+
+    Позволяет оценить схожесть всех фильмов каталога с предпочтениями пользователя
+    одним матрично-векторным произведением вместо перебора фильмов в Python.
+
+    Args:
+        films (Sequence[CatalogFilm]): Фильмы каталога.
+
+    Attributes:
+        films (tuple[CatalogFilm]): Фильмы каталога в порядке строк матрицы.
+        ids (np.ndarray): Идентификаторы фильмов в порядке строк матрицы.
+        rows (dict[int, int]): Отображение идентификатора фильма в номер строки.
+        genres (list[str]): Жанры в порядке столбцов матрицы.
+        matrix (np.ndarray): Матрица (фильмы x жанры) с количеством вхождений жанра в фильм.
+        popularity (np.ndarray): Априорная популярность фильмов в порядке строк матрицы.
+    """
+
+    def __init__(self, films: Sequence["CatalogFilm"]) -> None:
+        self.films = tuple(films)
+        self.ids = np.fromiter((film.id for film in self.films), dtype=np.int64, count=len(self.films))
+        self.rows = {film.id: row for row, film in enumerate(self.films)}
+
+        self.genres = sorted({genre for film in self.films for genre in film.genres})
+        self.genre_index = {genre: column for column, genre in enumerate(self.genres)}
+
+        film_rows = np.fromiter(
+            (row for row, film in enumerate(self.films) for _ in film.genres), dtype=np.intp)
+        genre_columns = np.fromiter(
+            (self.genre_index[genre] for film in self.films for genre in film.genres), dtype=np.intp)
+
+        self.matrix = np.zeros((len(self.films), len(self.genres)), dtype=np.float32)
+        np.add.at(self.matrix, (film_rows, genre_columns), 1)
+
+        self.popularity = get_popularity_priors(self.films)
+
+    def __len__(self) -> int:
+        return len(self.films)
+
+    def with_films(self, films: Sequence["CatalogFilm"]) -> "GenreMatrix":
+        """
+        Возвращает матрицу с обновленными рейтингами фильмов без пересчета самой матрицы жанров.
+        Фильмы должны идти в том же порядке и иметь те же жанры, что и строки матрицы.
+
+        Args:
+            films (Sequence[CatalogFilm]): Фильмы каталога с актуальными рейтингами.
+
+        Returns:
+            GenreMatrix: Копия матрицы с новыми films и popularity.
+        """
+
+        genre_matrix = copy(self)
+        genre_matrix.films = tuple(films)
+        genre_matrix.popularity = get_popularity_priors(genre_matrix.films)
+
+        return genre_matrix
+
+    def get_film(self, film_id: int) -> "CatalogFilm | None":
+        row = self.rows.get(film_id)
+        return None if row is None else self.films[row]
+
+    def get_rows(self, film_ids: Iterable[int]) -> np.ndarray:
+        """ Возвращает номера строк для известных каталогу фильмов """
+
+        return np.fromiter(
+            (self.rows[film_id] for film_id in film_ids if film_id in self.rows), dtype=np.int64)
+
+    def get_weights(self, genres_coefficients: dict[str, float]) -> np.ndarray:
+        """ Переводит словарь коэффициентов жанров в вектор весов по столбцам матрицы """
+
+        weights = np.zeros(len(self.genres), dtype=np.float32)
+
+        for genre, coefficient in genres_coefficients.items():
+            column = self.genre_index.get(genre)
+            if column is not None:
+                weights[column] = coefficient
+
+        return weights
+
+    def get_scores(self, genres_coefficients: dict[str, float]) -> np.ndarray:
+        """
+        Рассчитывает для каждого фильма сумму коэффициентов заинтересованности его жанров.
+
+        Args:
+            genres_coefficients (dict): Словарь коэффициентов заинтересованности в жанрах.
+
+        Returns:
+            np.ndarray: Оценки схожести фильмов в порядке строк матрицы.
+        """
+
+        return self.matrix @ self.get_weights(genres_coefficients)
+
+
+def get_popularity_priors(films: Sequence["CatalogFilm"]) -> np.ndarray:
+    """
+    Рассчитывает априорную популярность фильмов в диапазоне [0, 1].
+
+    Половину значения дает качество - средняя оценка пользователей, сглаженная
+    к внешнему рейтингу average_rating (байесовское среднее с PRIOR_RATINGS
+    виртуальными оценками), половину - число оценок, насыщающееся
+    на POPULARITY_HALF_COUNT.
+
+    Args:
+        films (Sequence[CatalogFilm]): Фильмы каталога.
+
+    Returns:
+        np.ndarray: Популярность фильмов в порядке films.
+    """
+
+    average_ratings = np.array([film.average_rating for film in films], dtype=np.float64)
+    local_ratings = np.array([film.local_rating for film in films], dtype=np.float64)
+    rating_counts = np.fromiter((film.rating_count for film in films), dtype=np.float64, count=len(films))
+
+    # Внешний рейтинг 0 в базе означает его отсутствие
+    average_ratings[np.isnan(average_ratings) | (average_ratings <= 0)] = DEFAULT_RATING
+    local_ratings = np.where(np.isnan(local_ratings), average_ratings, local_ratings)
+
+    quality = (rating_counts * local_ratings + PRIOR_RATINGS * average_ratings) / (rating_counts + PRIOR_RATINGS)
+    popularity = rating_counts / (rating_counts + POPULARITY_HALF_COUNT)
+
+    return (0.5 * np.clip(quality / 10, 0, 1) + 0.5 * popularity).astype(np.float32)
+
+
+def get_ranked_rows(scores: np.ndarray,
+                    ids: np.ndarray,
+                    threshold: float,
+                    num_films: int,
+                    excluded_rows: np.ndarray = None) -> list[int]:
+    """
+    Ранжирует до num_films строк с наибольшей оценкой не ниже порога.
+
+    Лучшие кандидаты отбираются ограниченной кучей размера num_films. При равных
+    оценках выше стоит фильм с меньшим идентификатором, поэтому результат не зависит
+    от порядка строк в каталоге.
+
+    Args:
+        scores (np.ndarray): Оценки схожести фильмов.
+        ids (np.ndarray): Идентификаторы фильмов в порядке строк.
+        threshold (float): Минимальная оценка схожести.
+        num_films (int): Количество фильмов для выбора.
+        excluded_rows (np.ndarray, optional): Строки, которые нельзя выбирать.
+
+    Returns:
+        list[int]: Номера строк в порядке убывания оценки.
+    """
+
+    if num_films <= 0:
+        return []
+
+    scores = scores.copy()
+
+    if excluded_rows is not None and len(excluded_rows):
+        scores[excluded_rows] = -np.inf
+
+    candidate_rows = np.flatnonzero(scores >= threshold - SCORE_EPSILON)
+
+    if len(candidate_rows) > num_films:
+        # Отбрасываем кандидатов ниже num_films-й оценки, сохраняя всех равных ей
+        kth = len(candidate_rows) - num_films
+        kth_score = np.partition(scores[candidate_rows], kth)[kth]
+        candidate_rows = candidate_rows[scores[candidate_rows] >= kth_score]
+
+    return heapq.nsmallest(
+        num_films,
+        candidate_rows.tolist(),
+        key=lambda row: (-scores[row], ids[row]))
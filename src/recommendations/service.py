@@ -1,4 +1,5 @@
-from random import sample
+from typing import Iterable, Literal, NamedTuple
+
 from sqlalchemy import select
 
 from loguru import logger
@@ -8,32 +9,68 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from .config import SIMILARITY_COEFFICIENT
 from .config import THRESHOLD_FOR_POSITIVE_RATING
 from .config import NUM_GENRES
+from .config import RECOMMENDATIONS_CANDIDATE_SOURCE
+from .config import FALLBACK_POOL_FACTOR
+from .cache import recommendation_cache
+from .catalog import CatalogFilm, film_catalog
+from .collaborative import item_engine
+from .models import UserRecommendation
+from .reranking import reranker, seeded_sample
+from .scoring import SCORE_EPSILON, GenreMatrix, get_ranked_rows
 
 from ..films.dao import FilmDAO
 from ..films.models import Film
 from ..user_actions.models import UserFilmRating
 
 
+RecommendationEngine = Literal["genre", "item"]
+
+# Количество последних оценок пользователя, по которым строятся рекомендации
+RECENT_RATINGS_LIMIT = 20
+
+
+class RankedFilm(NamedTuple):
+    """
+    Рекомендованный фильм с объяснением: оценка схожести, совпавшие жанры пользователя
+    и оцененные пользователем фильмы, на которые он похож (для движка item).
+    """
+
+    film: CatalogFilm
+    score: float
+    matched_genres: tuple[str, ...] = ()
+    similar_to: tuple[int, ...] = ()
+
+
+class RatingPartition(NamedTuple):
+    """
+    Разбиение оценок пользователя на положительные и отрицательные.
+    Рассчитывается один раз на запрос и передается в методы Recommendations явно.
+    """
+
+    high_rated: frozenset[int]
+    low_rated: frozenset[int]
+    rated: frozenset[int]
+
+
 class Recommendations:
     """
     Класс Recommendations предоставляет методы для генерации рекомендаций фильмов для пользователей
     на основе их рейтингов и жанров.
 
+    Экземпляр не хранит состояние пользователя, поэтому может использоваться
+    для расчета рекомендаций нескольким пользователям подряд.
+
     Args:
         db (AsyncSession): Сессия для работы с базой данных.
 
     Attributes:
         db (AsyncSession): Сессия для работы с базой данных.
-        user_positive_ratings (List[tuple]) | None: Список фильмов, оцененных пользователем положительно.
-        user_negative_ratings (List[tuple]) | None: Список фильмов, оцененных пользователем отрицательно.
     """
 
     def __init__(self, db: AsyncSession) -> None:
         self.db = db
-        self.user_high_rated_films = None
-        self.user_low_rated_films = None
 
-    async def _get_recent_ratings(self, user_id: str, limit: int = 20) -> list[tuple[int, float]]:
+    async def _get_recent_ratings(self, user_id: str, limit: int = RECENT_RATINGS_LIMIT) -> list[tuple[int, float]]:
 
         """
         Получает недавние рейтинги пользователя.
@@ -63,83 +100,33 @@ class Recommendations:
             logger.opt(exception=e).critical("Error in _get_recent_ratings")
             raise
 
-    async def _get_user_high_rated_films(self, user_ratings: list) -> tuple[int]:
-
-        """
-        Возвращает список фильмов, оцененных пользователем положительно.
-
-        Args:
-            user_ratings (list): Список кортежей (film_id, rating).
-
-        Returns:
-            tuple[int]: Кортеж идентификаторов фильмов, оцененных положительно.
-        """
-
-        if self.user_high_rated_films:
-            return self.user_high_rated_films
-
-        self.user_high_rated_films = tuple(
-            [film_id for film_id, rating in user_ratings if rating >= float(THRESHOLD_FOR_POSITIVE_RATING)])
-        return self.user_high_rated_films
-
-    async def _get_user_low_rated_films(self, user_ratings: list) -> tuple[int]:
-
-        """
-        Возвращает список фильмов, оцененных пользователем отрицательно.
-
-        Args:
-            user_ratings (list): Список кортежей (film_id, rating).
-
-        Returns:
-            tuple[int]: Кортеж идентификаторов фильмов, оцененных положительно.
-        """
-
-        if self.user_low_rated_films:
-            return self.user_low_rated_films
-
-        self.user_low_rated_films = tuple(
-            [film_id for film_id, rating in user_ratings if rating < float(THRESHOLD_FOR_POSITIVE_RATING)])
-        return self.user_low_rated_films
-
-    async def _get_suitable_films(self, user_ratings: list, all_films: tuple[Film]) -> tuple[int]:
+    @staticmethod
+    def _partition_ratings(user_ratings: list) -> RatingPartition:
 
         """
-        Возвращает фильмы, подходящие для рекомендаций пользователю.
+        Разбивает оценки пользователя на положительные и отрицательные.
 
         Args:
             user_ratings (list): Список кортежей (film_id, rating).
-            all_films (tuple[Film]): Все фильмы в базе данных.
 
         Returns:
-            tuple[int]: Фильмы, подходящие для рекомендаций (исключая уже оцененные).
+            RatingPartition: Множества фильмов, оцененных положительно, отрицательно и всех оцененных.
         """
 
-        try:
+        threshold = float(THRESHOLD_FOR_POSITIVE_RATING)
 
-            user_high_rated_films = await self._get_user_high_rated_films(user_ratings)
-            user_low_rated_films = await self._get_user_low_rated_films(user_ratings)
+        high_rated = frozenset(film_id for film_id, rating in user_ratings if rating >= threshold)
+        low_rated = frozenset(film_id for film_id, rating in user_ratings if rating < threshold)
 
-            user_rated_films = user_high_rated_films + user_low_rated_films
+        return RatingPartition(high_rated, low_rated, high_rated | low_rated)
 
-            if not user_rated_films:
-                return all_films
-
-            suitable_films = tuple(
-                [film for film in all_films if film.id not in user_rated_films])
-
-            return suitable_films
-
-        except Exception as e:
-            print(f"Error in _get_suitable_films: {e}")
-            raise
-
-    async def _calculate_genre_coefficients(self, user_positive_films: list, all_films: tuple[Film]) -> dict:
+    async def _calculate_genre_coefficients(self, user_positive_films: frozenset[int], genre_matrix: GenreMatrix) -> dict:
         """
         Рассчитывает коэффициенты заинтересованности в жанрах на основе оцененных пользователем фильмов.
 
         Args:
-            user_positive_films (List[int]): Список идентификаторов фильмов, оцененных положительно.
-            all_films (tuple[Film]): Все фильмы в базе данных.
+            user_positive_films (frozenset[int]): Идентификаторы фильмов, оцененных положительно.
+            genre_matrix (GenreMatrix): Матрица жанров каталога.
 
         Returns:
             dict: Словарь, где ключи - жанры, значения - их коэффициенты заинтересованности.
@@ -147,9 +134,8 @@ class Recommendations:
         genre_count = {}
         total_genres = 0
 
-        for film_id in user_positive_films:
-            film = next(
-                (film for film in all_films if film.id == film_id), None)
+        for film_id in sorted(user_positive_films):
+            film = genre_matrix.get_film(film_id)
             if film:
                 total_genres += len(film.genres)
                 for genre in film.genres:
@@ -160,170 +146,226 @@ class Recommendations:
 
         return genre_coefficients
 
-    async def _get_most_common_genres(self, user_positive_films: list, all_films: tuple[Film]) -> list[str]:
+    async def _get_most_common_genres(self, user_positive_films: frozenset[int], genre_matrix: GenreMatrix) -> list[str]:
         """
         Возвращает наиболее часто встречающиеся жанры среди фильмов, оцененных положительно пользователем,
-        учитывая коэффициенты заинтересованности.
+        учитывая коэффициенты заинтересованности. При равных коэффициентах жанры упорядочены по названию.
 
         Args:
-            user_positive_films (List[int]): Список идентификаторов фильмов, оцененных положительно.
-            all_films (tuple[Film]): Все фильмы в базе данных.
+            user_positive_films (frozenset[int]): Идентификаторы фильмов, оцененных положительно.
+            genre_matrix (GenreMatrix): Матрица жанров каталога.
 
         Returns:
             List[str]: Список наиболее популярных жанров среди положительных оценок.
         """
-        genre_coefficients = await self._calculate_genre_coefficients(user_positive_films, all_films)
+        genre_coefficients = await self._calculate_genre_coefficients(user_positive_films, genre_matrix)
 
         sorted_most_commot_genres = dict(
-            sorted(genre_coefficients.items(), key=lambda item: item[1], reverse=True))
+            sorted(genre_coefficients.items(), key=lambda item: (-item[1], item[0])))
 
         target_genres = dict(list(sorted_most_commot_genres.items())[
                              :int(NUM_GENRES)+1])
 
         return target_genres
 
-    async def _get_random_related_films(self, num_additional_films: int, all_films: tuple[Film], user_ratings: list) -> list[int]:
+    async def _get_random_related_films(self,
+                                        num_additional_films: int,
+                                        genre_matrix: GenreMatrix,
+                                        rating_partition: RatingPartition,
+                                        excluded_films: Iterable[int] = (),
+                                        seed: str | None = None) -> list[CatalogFilm]:
 
         """
-        Возвращает случайные фильмы, которые связаны с предпочтениями пользователя.
+        Возвращает случайные популярные фильмы, которые пользователь еще не оценил.
         Вызывается в случае недостатка наиболее схожих фильмов.
 
+        Выборка делается из пула в FALLBACK_POOL_FACTOR раз больше нужного, составленного
+        из самых популярных фильмов каталога, поэтому вместо случайных малоизвестных
+        фильмов пользователь получает известные. При одинаковом seed выборка одинакова.
+
         Args:
             num_additional_films (int): Количество недостающих фильмов для рекомендации.
-            all_films (tuple[Film]): Все фильмы в базе данных.
-            user_ratings (list): Список кортежей с оценками пользователя(film_id, rating).
+            genre_matrix (GenreMatrix): Матрица жанров каталога.
+            rating_partition (RatingPartition): Разбиение оценок пользователя.
+            excluded_films (Iterable[int], optional): Уже рекомендованные фильмы.
+            seed (str | None, optional): Зерно выборки, обычно идентификатор пользователя.
 
         Returns:
-            List[int]: Список случайных фильмов.
+            List[CatalogFilm]: Список случайных фильмов.
         """
 
         try:
-            suitable_films = await self._get_suitable_films(user_ratings, all_films)
+            excluded_rows = genre_matrix.get_rows(rating_partition.rated.union(excluded_films))
 
-            if len(suitable_films) <= num_additional_films:
-                random_related_films = suitable_films
-            else:
-                random_related_films = sample(
-                    suitable_films, num_additional_films)
+            pool_rows = get_ranked_rows(
+                genre_matrix.popularity,
+                genre_matrix.ids,
+                0.0,
+                num_additional_films * FALLBACK_POOL_FACTOR,
+                excluded_rows)
 
-            return random_related_films
+            pool = [genre_matrix.films[row] for row in pool_rows]
+
+            return seeded_sample(pool, num_additional_films, seed)
 
         except Exception as e:
             logger.opt(exception=e).critical(
                 "Error in _get_random_related_films")
             raise
 
-    async def _get_recommended_films(self,
-                                     num_films: int,
-                                     all_films: tuple[Film],
-                                     user_ratings: list) -> set[Film]:
+    async def _get_ranked_films(self,
+                                num_films: int,
+                                genre_matrix: GenreMatrix,
+                                rating_partition: RatingPartition,
+                                seed: str | None = None) -> list[RankedFilm]:
 
         """
-        Генерирует рекомендации фильмов для пользователя.
+        Генерирует ранжированные рекомендации фильмов для пользователя.
+
+        Результат упорядочен (по схожести с учетом этапов переранжирования, при
+        равенстве - по идентификатору фильма) и содержит оценку каждого фильма.
+        Случайные фильмы, добавленные при нехватке схожих, идут в конце списка.
+        В этом же порядке отдаются и рекомендации без оценок, и предрасчитанные.
 
         Args:
             num_films (int): Количество фильмов для рекомендации.
-            all_films (tuple[Film]): Все фильмы в базе данных.
-            user_id (str): Идентификатор пользователя.
-            user_ratings (list): Список кортежей с оценками пользователя(film_id, rating).
+            genre_matrix (GenreMatrix): Матрица жанров каталога.
+            rating_partition (RatingPartition): Разбиение оценок пользователя.
+            seed (str | None, optional): Зерно выборки дополнительных фильмов.
 
         Returns:
-            set[int]: Множество идентификаторов рекомендованных фильмов.
+            list[RankedFilm]: Ранжированный список рекомендованных фильмов.
         """
 
         try:
 
-            user_high_rated_films = await self._get_user_high_rated_films(user_ratings)
-            target_genres_coefficients = await self._get_most_common_genres(user_high_rated_films, all_films)
+            target_genres_coefficients = await self._get_most_common_genres(rating_partition.high_rated, genre_matrix)
+
+            ranked_films = []
 
-            if not target_genres_coefficients:
+            if target_genres_coefficients:
 
-                num_additional_films = num_films
-                random_films = set()
-                random_films = await self._get_additional_films(random_films, num_additional_films, user_ratings, all_films)
+                rated_rows = genre_matrix.get_rows(rating_partition.rated)
+                scores = genre_matrix.get_scores(target_genres_coefficients)
 
-                return random_films
+                ranked_rows = get_ranked_rows(
+                    scores,
+                    genre_matrix.ids,
+                    float(SIMILARITY_COEFFICIENT),
+                    reranker.get_num_candidates(num_films),
+                    rated_rows)
 
-            suitable_films = await self._get_suitable_films(user_ratings, all_films)
-            similar_films = set()
-            for film in suitable_films:
+                ranked_films = reranker.rerank([
+                    self._explain_recommendation(genre_matrix.films[row], target_genres_coefficients)
+                    for row in ranked_rows], num_films)
 
-                if len(similar_films) >= num_films:
-                    break
+            if len(ranked_films) < num_films:
 
-                is_similar = await self._get_similar_film(film, target_genres_coefficients)
-                if is_similar:
-                    similar_films.add(is_similar)
+                num_additional_films = num_films - len(ranked_films)
+                ranked_ids = {ranked_film.film.id for ranked_film in ranked_films}
 
-            if len(similar_films) < num_films:
-                num_additional_films = num_films - len(similar_films)
-                similar_films = await self._get_additional_films(similar_films, num_additional_films, user_ratings, all_films)
+                additional_films = await self._get_random_related_films(
+                    num_additional_films, genre_matrix, rating_partition, ranked_ids, seed)
 
-            return similar_films
+                ranked_films.extend(
+                    self._explain_recommendation(film, target_genres_coefficients)
+                    for film in additional_films)
+
+            return ranked_films
 
         except Exception as e:
-            print(f"Error in _get_recommended_film: {e}")
+            logger.opt(exception=e).critical("Error in _get_ranked_films")
             raise
 
-    async def _get_additional_films(self, similar_films: set, num_additional_films: int, user_ratings: list, all_films: tuple[Film]) -> set:
+    @staticmethod
+    def _explain_recommendation(film: CatalogFilm, target_genres_coefficients: dict) -> RankedFilm:
+
+        score = sum(target_genres_coefficients.get(genre, 0) for genre in film.genres)
+        matched_genres = tuple(genre for genre in film.genres if genre in target_genres_coefficients)
+
+        return RankedFilm(film, round(score, 6), matched_genres)
+
+    async def _get_item_based_films(self,
+                                    num_films: int,
+                                    genre_matrix: GenreMatrix,
+                                    user_ratings: list,
+                                    rating_partition: RatingPartition,
+                                    seed: str | None = None) -> list[RankedFilm]:
 
         """
-        Добавляет дополнительные случайные фильмы к списку рекомендаций.
+        Генерирует рекомендации по предрасчитанной модели item-item сходства.
+        Если модель еще не построена или похожих фильмов не хватает, список
+        дополняется ранжированными рекомендациями по жанрам.
 
         Args:
-            similar_films (set): Множество рекомендованных фильмов.
-            user_id (str): Идентификатор пользователя.
-            num_additional_films (int): Количество дополнительных фильмов для рекомендации.
+            num_films (int): Количество фильмов для рекомендации.
+            genre_matrix (GenreMatrix): Матрица жанров каталога.
             user_ratings (list): Список кортежей с оценками пользователя(film_id, rating).
+            rating_partition (RatingPartition): Разбиение оценок пользователя.
+            seed (str | None, optional): Зерно выборки дополнительных фильмов.
 
         Returns:
-            set: Обновленное множество рекомендаций с добавленными случайными фильмами.
+            list[RankedFilm]: Ранжированный список рекомендованных фильмов.
         """
 
-        additional_films = await self._get_random_related_films(num_additional_films, all_films, user_ratings)
-        similar_films.update(additional_films)
+        try:
 
-        return similar_films
+            ranked_films = []
 
-    async def _get_similar_film(self, film: Film, target_genres_coefficients: dict) -> Film | None:
-        """
-        Определяет и добавляет схожие фильмы с жанрами наподобие предпочитаемых жанров пользователя.
+            for film_id, score, similar_to in item_engine.recommend(user_ratings, num_films):
 
-        Args:
-            film (Film): Фильм, для которого определяется похожесть на жанры.
-            target_genres_coefficients (dict): Словарь коэффициентов заинтересованности в жанрах пользователя.
+                film = genre_matrix.get_film(film_id)
+                if film:
+                    ranked_films.append(RankedFilm(film, score, similar_to=similar_to))
 
-        Returns:
-            Film or None: Фильм, если он похож на предпочитаемые жанры, или None, если не похож.
-        """
-        try:
-            film_genres_coefficient_sum = sum(
-                target_genres_coefficients.get(genre, 0) for genre in film.genres)
-            if film_genres_coefficient_sum >= float(SIMILARITY_COEFFICIENT):
-                return film
+            if len(ranked_films) < num_films:
+
+                ranked_ids = {ranked_film.film.id for ranked_film in ranked_films}
+                genre_ranked_films = await self._get_ranked_films(num_films, genre_matrix, rating_partition, seed)
+
+                ranked_films.extend(
+                    ranked_film for ranked_film in genre_ranked_films
+                    if ranked_film.film.id not in ranked_ids)
+
+            return ranked_films[:num_films]
 
         except Exception as e:
-            print(f"Error in _get_similar_film: {e}")
+            logger.opt(exception=e).critical("Error in _get_item_based_films")
             raise
 
-    async def get_recommendations(self, user_id: str, num_films: int) -> list[Film]:
+    async def get_recommendations(self,
+                                  user_id: str,
+                                  num_films: int,
+                                  ranked: bool = False,
+                                  engine: RecommendationEngine = "genre") -> list[Film] | list[dict]:
 
         """
         Генерирует рекомендации фильмов для пользователя.
+        Результат кэшируется для пользователя до его следующей оценки или изменения каталога.
 
         Args:
             user_id (str): Идентификатор пользователя.
             num_films (int): Количество фильмов для рекомендации.
+            ranked (bool, optional): Вернуть ранжированный список с оценками схожести. По умолчанию False.
+            engine (str, optional): Рекомендательный движок: "genre" - по жанрам оцененных фильмов,
+                "item" - по item-item сходству оценок пользователей. По умолчанию "genre".
 
         Returns:
             List[Film]: Список рекомендованных фильмов.
+            Для ranked=True - список словарей {"film", "score", "matched_genres", "similar_to"}
+            по убыванию схожести.
         """
 
         try:
 
-            all_films = tuple(await FilmDAO.find_all(self.db))
-            user_ratings = await self._get_recent_ratings(user_id=user_id)
-            recommendations = await self._get_recommended_films(num_films, all_films, user_ratings)
+            params = {"num_films": num_films, "ranked": ranked, "engine": engine}
+
+            recommendations = await recommendation_cache.get(user_id, params)
+            if recommendations is not None:
+                return recommendations
+
+            recommendations = await self._generate_recommendations(user_id, num_films, ranked, engine)
+            await recommendation_cache.set(user_id, params, recommendations)
 
             return recommendations
 
@@ -331,6 +373,169 @@ class Recommendations:
             logger.opt(exception=e).critical("Error in get_recommendations")
             raise
 
+    async def _generate_recommendations(self,
+                                        user_id: str,
+                                        num_films: int,
+                                        ranked: bool,
+                                        engine: RecommendationEngine) -> list[Film] | list[dict]:
+
+        if engine == "genre" and not ranked:
+            precomputed_films = await self._get_precomputed_films(user_id, num_films)
+
+            if precomputed_films is not None:
+                return precomputed_films
+
+        user_ratings = await self._get_recent_ratings(user_id=user_id)
+        rating_partition = self._partition_ratings(user_ratings)
+
+        if engine == "genre" and RECOMMENDATIONS_CANDIDATE_SOURCE == "sql":
+            genre_matrix = await self._get_candidate_genre_matrix(num_films, rating_partition)
+        else:
+            genre_matrix = await film_catalog.get_genre_matrix(self.db)
+
+        if engine == "item":
+            ranked_films = await self._get_item_based_films(
+                num_films, genre_matrix, user_ratings, rating_partition, seed=user_id)
+
+            if ranked:
+                return await self._get_ranked_response(ranked_films)
+
+            return await self._get_films_by_ids([ranked_film.film.id for ranked_film in ranked_films])
+
+        ranked_films = await self._get_ranked_films(num_films, genre_matrix, rating_partition, seed=user_id)
+
+        if ranked:
+            return await self._get_ranked_response(ranked_films)
+
+        # Тот же порядок, что и у предрасчитанных рекомендаций (см. _get_precomputed_films)
+        return await self._get_films_by_ids([ranked_film.film.id for ranked_film in ranked_films])
+
+    async def _get_candidate_genre_matrix(self,
+                                          num_films: int,
+                                          rating_partition: RatingPartition) -> GenreMatrix:
+
+        """
+        Строит матрицу жанров только по кандидатам, отобранным на стороне базы данных,
+        вместо снимка всего каталога.
+
+        В матрицу попадают недавно оцененные пользователем фильмы (для расчета коэффициентов
+        заинтересованности) и до reranker.get_num_candidates(num_films) наиболее схожих
+        с целевыми жанрами остальных фильмов со схожестью не ниже SIMILARITY_COEFFICIENT -
+        те же кандидаты, что отбираются по снимку каталога.
+        Если таких фильмов меньше num_films, матрица дополняется пулом из самых оцениваемых
+        неоцененных фильмов, в FALLBACK_POOL_FACTOR раз больше недостающих, из которого
+        _get_random_related_films делает выборку с зерном пользователя.
+
+        Args:
+            num_films (int): Количество фильмов для рекомендации.
+            rating_partition (RatingPartition): Разбиение оценок пользователя.
+
+        Returns:
+            GenreMatrix: Матрица жанров кандидатов.
+        """
+
+        try:
+
+            rated_films = await FilmDAO.find_genres(self.db, rating_partition.rated)
+            films = {row.id: self._make_candidate_film(row) for row in rated_films}
+
+            target_genres_coefficients = await self._get_most_common_genres(
+                rating_partition.high_rated, GenreMatrix(tuple(films.values())))
+
+            candidates = []
+
+            if target_genres_coefficients:
+                candidates = await FilmDAO.find_unrated_candidates(
+                    self.db,
+                    rating_partition.rated,
+                    genres_coefficients=target_genres_coefficients,
+                    min_score=float(SIMILARITY_COEFFICIENT) - SCORE_EPSILON,
+                    limit=reranker.get_num_candidates(num_films))
+
+            # Пул для недостающих фильмов, как в _get_random_related_films, но по числу оценок
+            if len(candidates) < num_films:
+                candidates = [*candidates, *await FilmDAO.find_unrated_candidates(
+                    self.db,
+                    rating_partition.rated.union(row.id for row in candidates),
+                    limit=(num_films - len(candidates)) * FALLBACK_POOL_FACTOR)]
+
+            for row in candidates:
+                films.setdefault(row.id, self._make_candidate_film(row))
+
+            return GenreMatrix(tuple(films[film_id] for film_id in sorted(films)))
+
+        except Exception as e:
+            logger.opt(exception=e).critical("Error in _get_candidate_genre_matrix")
+            raise
+
+    @staticmethod
+    def _make_candidate_film(row) -> CatalogFilm:
+        return CatalogFilm(
+            row.id, tuple(row.genres or ()), row.average_rating, row.local_rating, row.rating_count or 0)
+
+    async def _get_precomputed_films(self, user_id: str, num_films: int) -> list[Film] | None:
+
+        """
+        Возвращает рекомендации, рассчитанные пакетным заданием (src.recommendations.precompute).
+
+        Args:
+            user_id (str): Идентификатор пользователя.
+            num_films (int): Количество фильмов для рекомендации.
+
+        Returns:
+            List[Film] | None: Список рекомендованных фильмов или None, если для пользователя
+            нет предрасчитанных рекомендаций нужного размера.
+        """
+
+        precomputed = await self.db.get(UserRecommendation, user_id)
+
+        if precomputed is None or len(precomputed.film_ids) < num_films:
+            return None
+
+        # Фильмы могли удалить после пакетного расчета: их место занимают следующие по рангу,
+        # а если фильмов не хватает, рекомендации рассчитываются заново
+        films = await self._get_films_by_ids(precomputed.film_ids)
+
+        if len(films) < num_films:
+            return None
+
+        return films[:num_films]
+
+    async def _get_films_by_ids(self, film_ids: list[int]) -> list[Film]:
+
+        """
+        Загружает полные записи только для рекомендованных фильмов.
+
+        Args:
+            film_ids (list[int]): Идентификаторы рекомендованных фильмов.
+
+        Returns:
+            list[Film]: Найденные фильмы в порядке film_ids, удаленные фильмы пропускаются.
+        """
+
+        if not film_ids:
+            return []
+
+        films = await FilmDAO.find_all(self.db, Film.id.in_(film_ids))
+        films_by_id = {film.id: film for film in films}
+
+        return [films_by_id[film_id] for film_id in dict.fromkeys(film_ids) if film_id in films_by_id]
+
+    async def _get_ranked_response(self, ranked_films: list[RankedFilm]) -> list[dict]:
+
+        films = await self._get_films_by_ids([ranked_film.film.id for ranked_film in ranked_films])
+        films_by_id = {film.id: film for film in films}
+
+        return [
+            {
+                "film": films_by_id[ranked_film.film.id],
+                "score": ranked_film.score,
+                "matched_genres": ranked_film.matched_genres,
+                "similar_to": ranked_film.similar_to,
+            }
+            for ranked_film in ranked_films if ranked_film.film.id in films_by_id
+        ]
+
 
 class DatabaseManager:
 
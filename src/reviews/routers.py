@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from fastapi.responses import JSONResponse
 
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -7,6 +7,7 @@ from . import schemas
 from .models import Review
 from .service import DatabaseManager
 
+from ..config import PAGE_MAX_LIMIT
 from ..database import get_async_session
 
 
@@ -29,14 +30,15 @@ async def create_review(
 @router.get("/get_all_reviews")
 async def get_all_reviews(
     film_id: int = None,
-    offset: int = 0,
-    limit: int = 10,
+    cursor: str = None,
+    offset: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(10, ge=1, le=PAGE_MAX_LIMIT),
     db: AsyncSession = Depends(get_async_session),
 ):
     db_manager = DatabaseManager(db)
     review_crud = db_manager.review_crud
 
-    return await review_crud.get_all_reviews(film_id=film_id, offset=offset, limit=limit)
+    return await review_crud.get_all_reviews(film_id=film_id, cursor=cursor, offset=offset, limit=limit)
 
 
 @router.patch("/update_review", response_model=schemas.ReviewUpdate)
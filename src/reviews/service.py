@@ -1,4 +1,4 @@
-from sqlalchemy import or_, select
+from sqlalchemy import or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from loguru import logger
@@ -52,23 +52,21 @@ class ReviewCRUD:
 
         return review
 
-    async def get_all_reviews(self, *filter, offset: int = 0, limit: int = 100, **filter_by) -> list[Review]:
+    async def get_all_reviews(self, *filter, cursor: str = None, offset: int = 0, limit: int = 100, **filter_by) -> dict:
         logger.info("Получаю все ревьюшки")
 
-        query = (
-            select(Review)
-            .order_by(Review.review_rating.desc())
-            .filter(*filter)
-            .filter_by(**filter_by)
-            .offset(offset)
-            .limit(limit)
+        reviews, next_cursor = await ReviewDAO.find_page(
+            self.db,
+            *filter,
+            order_by=[(Review.review_rating, True), (Review.id, False)],
+            cursor=cursor,
+            offset=offset,
+            limit=limit,
+            **filter_by,
         )
 
-        result = await self.db.execute(query)
-        reviews = result.scalars().all()
-
         logger.debug(f"Ревьюшки: {reviews}")
-        return reviews
+        return {"items": reviews, "next_cursor": next_cursor}
 
     async def update_review(self, review_id: int, review_in: schemas.ReviewUpdate):
         logger.debug(f"Обновляю ревьюшку {review_id} на {review_in}")
@@ -1,8 +1,187 @@
-from .models import UserFilmRating
-from .schemas import UserFilmRatingCreate, UserFilmRatingUpdate
+from typing import Iterable
+
+from sqlalchemy import delete, exists, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import LIST_TYPES, UserFilmList, UserFilmRating
+from .schemas import UserFilmListCreate, UserFilmListUpdate, UserFilmRatingCreate, UserFilmRatingUpdate
 
 from ..dao import BaseDAO
+from ..films.models import Film
 
 
 class UserFilmRatingDAO(BaseDAO[UserFilmRating, UserFilmRatingCreate, UserFilmRatingUpdate]):
     model = UserFilmRating
+
+    @classmethod
+    async def upsert(cls, db: AsyncSession, user_id: str, film_id: int, rating: float) -> float | None:
+        """
+        Сохраняет оценку пользователя по уникальному индексу (user_id, film_id).
+
+        Существующая оценка блокируется (SELECT ... FOR UPDATE) до конца транзакции,
+        поэтому ее прежнее значение можно использовать для обновления агрегатов фильма.
+
+        Returns:
+            float | None: Прежняя оценка или None, если пользователь оценил фильм впервые.
+        """
+
+        rating_filter = (cls.model.user_id == user_id, cls.model.film_id == film_id)
+        locked = select(cls.model.rating).where(*rating_filter).with_for_update()
+
+        previous = (await db.execute(locked)).scalar_one_or_none()
+
+        if previous is None:
+            stmt = (
+                insert(cls.model)
+                .values(user_id=user_id, film_id=film_id, rating=rating)
+                .on_conflict_do_nothing(index_elements=["user_id", "film_id"])
+                .returning(cls.model.id)
+            )
+
+            if (await db.execute(stmt)).scalar_one_or_none() is not None:
+                return None
+
+            # Оценку одновременно создал параллельный запрос: она уже видна и учтена в агрегатах
+            previous = (await db.execute(locked)).scalar_one()
+
+        await db.execute(update(cls.model).where(*rating_filter).values(rating=rating))
+
+        return previous
+
+    @classmethod
+    async def upsert_many(cls, db: AsyncSession, ratings: list[dict]) -> None:
+        """
+        Сохраняет пакет оценок одним INSERT ... ON CONFLICT DO UPDATE.
+        Пары (user_id, film_id) в пакете должны быть уникальны.
+        """
+
+        if not ratings:
+            return
+
+        stmt = insert(cls.model).values(ratings)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "film_id"],
+            set_={"rating": stmt.excluded.rating},
+        )
+
+        await db.execute(stmt)
+
+
+class UserFilmListDAO(BaseDAO[UserFilmList, UserFilmListCreate, UserFilmListUpdate]):
+    model = UserFilmList
+
+    @classmethod
+    async def toggle(
+        cls,
+        db: AsyncSession,
+        user_id: str,
+        film_id: int,
+        list_type: str,
+        exclusive_list_types: Iterable[str] = (),
+    ) -> bool:
+        """
+        Переключает наличие фильма в списке одним запросом (data-modifying CTE):
+        удаляет фильм из взаимоисключающих списков, удаляет его из целевого списка,
+        а если там его не было - добавляет.
+
+        Args:
+            db (AsyncSession): Сессия для работы с базой данных.
+            user_id (str): Идентификатор пользователя.
+            film_id (int): Идентификатор фильма.
+            list_type (str): Целевой список.
+            exclusive_list_types (Iterable[str], optional): Списки, из которых фильм нужно убрать.
+
+        Returns:
+            bool: True, если фильм добавлен в список, False - если удален из него.
+        """
+
+        film_filter = (cls.model.user_id == user_id, cls.model.film_id == film_id)
+
+        removed_from_other = (
+            delete(cls.model)
+            .where(*film_filter, cls.model.list_type.in_(list(exclusive_list_types)))
+            .returning(cls.model.id)
+            .cte("removed_from_other")
+        )
+
+        removed = (
+            delete(cls.model)
+            .where(*film_filter, cls.model.list_type == list_type)
+            .returning(cls.model.id)
+            .cte("removed")
+        )
+
+        inserted = (
+            insert(cls.model)
+            .from_select(
+                ["user_id", "film_id", "list_type"],
+                select(literal(user_id), literal(film_id), literal(list_type)).where(~exists(select(removed.c.id))))
+            .on_conflict_do_nothing(index_elements=["user_id", "list_type", "film_id"])
+            .returning(cls.model.id)
+            .cte("inserted")
+        )
+
+        # CTE попадают в запрос, только если на них есть ссылка
+        stmt = select(
+            exists(select(inserted.c.id)).label("added"),
+            select(func.count()).select_from(removed_from_other).scalar_subquery().label("removed_from_other"),
+        )
+
+        result = await db.execute(stmt)
+        return result.scalar_one()
+
+    @classmethod
+    async def find_film_lists(cls, db: AsyncSession, user_ids: Iterable[str]) -> dict[str, dict[str, list[dict]]]:
+        """
+        Возвращает списки фильмов пользователей в порядке добавления.
+
+        Returns:
+            dict: user_id -> атрибут списка (planned_films, ...) -> краткие данные фильмов.
+        """
+
+        film_lists = {user_id: {attribute: [] for attribute in LIST_TYPES.values()} for user_id in user_ids}
+
+        if not film_lists:
+            return film_lists
+
+        stmt = (
+            select(cls.model.user_id, cls.model.list_type, *cls._get_film_columns())
+            .join(Film, Film.id == cls.model.film_id)
+            .where(cls.model.user_id.in_(list(film_lists)))
+            .order_by(cls.model.added_at, cls.model.id)
+        )
+
+        for row in await db.execute(stmt):
+            attribute = LIST_TYPES.get(row.list_type)
+
+            if attribute:
+                film_lists[row.user_id][attribute].append(cls._get_film_data(row))
+
+        return film_lists
+
+    @classmethod
+    async def find_film_list(cls, db: AsyncSession, user_id: str, list_type: str) -> list[dict]:
+        """ Возвращает один список фильмов пользователя в порядке добавления """
+
+        stmt = (
+            select(*cls._get_film_columns())
+            .join(Film, Film.id == cls.model.film_id)
+            .where(cls.model.user_id == user_id, cls.model.list_type == list_type)
+            .order_by(cls.model.added_at, cls.model.id)
+        )
+
+        return [cls._get_film_data(row) for row in await db.execute(stmt)]
+
+    @staticmethod
+    def _get_film_columns() -> tuple:
+        return Film.id, Film.title, Film.poster, Film.average_rating, Film.genres
+
+    @staticmethod
+    def _get_film_data(row) -> dict:
+        # Тот же набор полей, что раньше хранился в JSON массивах пользователя
+        return {
+            "id": row.id, "title": row.title, "poster": row.poster,
+            "rating": row.average_rating, "genres": row.genres
+        }
+
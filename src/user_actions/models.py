@@ -1,11 +1,30 @@
+from datetime import datetime
+
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import ForeignKey
+from sqlalchemy import TIMESTAMP, ForeignKey, Index
+from sqlalchemy.sql import func
 
 from ..database import Base
 
 
+# Тип списка -> атрибут User, в котором список хранился до появления user_film_lists
+LIST_TYPES = {
+    "favorite": "favorite_films",
+    "postponed": "postponed_films",
+    "abandoned": "abandoned_films",
+    "planned": "planned_films",
+    "finished": "finished_films",
+}
+
+# Фильм может находиться только в одном из этих списков, избранное от них не зависит
+EXCLUSIVE_LIST_TYPES = ("postponed", "abandoned", "planned", "finished")
+
+
 class UserFilmRating(Base):
     __tablename__ = 'user_film_ratings'
+    __table_args__ = (
+        Index("ix_user_film_ratings_user_id_film_id", "user_id", "film_id", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[str] = mapped_column(
@@ -13,3 +32,18 @@ class UserFilmRating(Base):
     film_id: Mapped[int] = mapped_column(
         ForeignKey("films.id", ondelete="CASCADE"))
     rating: Mapped[float] = mapped_column(nullable=False)
+
+
+class UserFilmList(Base):
+    __tablename__ = 'user_film_lists'
+    __table_args__ = (
+        Index("ix_user_film_lists_user_id_list_type_film_id", "user_id", "list_type", "film_id", unique=True),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[str] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"))
+    film_id: Mapped[int] = mapped_column(
+        ForeignKey("films.id", ondelete="CASCADE"))
+    list_type: Mapped[str] = mapped_column(nullable=False)
+    added_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now())
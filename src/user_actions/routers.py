@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends
+from typing import Any, List
+
+from fastapi import APIRouter, Body, Depends
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -39,6 +41,18 @@ async def rate_the_film(
     return await user_film_crud.rate_the_film(rating_data)
 
 
+@router.post("/rate_films_bulk", response_model=schemas.UserFilmRatingImportResult)
+async def rate_films_bulk(
+    ratings: List[Any] = Body(...),
+    db: AsyncSession = Depends(get_async_session)
+):
+
+    db_manager = DatabaseManager(db)
+    user_film_crud = db_manager.user_film_crud
+
+    return await user_film_crud.rate_films_bulk(ratings)
+
+
 @router.patch('/rate_review')
 async def rate_review(
         user_id: str,
@@ -62,3 +76,16 @@ async def get_ratings_for_film(
     user_film_crud = db_manager.user_film_crud
 
     return await user_film_crud.get_ratings_for_film(film_id)
+
+
+@router.get("/get_user_list")
+async def get_user_list(
+    token: str,
+    list_type: str,
+    db: AsyncSession = Depends(get_async_session)
+):
+
+    db_manager = DatabaseManager(db)
+    user_film_crud = db_manager.user_film_crud
+
+    return await user_film_crud.get_user_list(token=token, list_type=list_type)
@@ -29,3 +29,24 @@ class UserFilmRatingDelete(BaseModel):
 
 class UserFilmRatingList(BaseModel):
     items: List[UserFilmRatingRead]
+
+
+class UserFilmRatingImportError(BaseModel):
+    index: int
+    error: str
+
+
+class UserFilmRatingImportResult(BaseModel):
+    received: int
+    saved: int
+    errors: List[UserFilmRatingImportError]
+
+
+class UserFilmListCreate(BaseModel):
+    user_id: str
+    film_id: int
+    list_type: str
+
+
+class UserFilmListUpdate(BaseModel):
+    list_type: str
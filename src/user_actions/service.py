@@ -1,7 +1,12 @@
+from typing import Any
+
+from loguru import logger
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .dao import UserFilmRatingDAO
-from .models import UserFilmRating
+from .dao import UserFilmListDAO, UserFilmRatingDAO
+from .models import EXCLUSIVE_LIST_TYPES, LIST_TYPES, UserFilmRating
 
 from . import schemas
 from . import exceptions
@@ -9,155 +14,187 @@ from . import exceptions
 from ..reviews.dao import ReviewDAO
 from ..reviews.models import Review
 
-from ..auth.models import User
+from ..auth import exceptions as AuthExceptions
 from ..auth.dao import UserDAO
 from ..auth.service import DatabaseManager as AuthManager
 
 from ..films.models import Film
 from ..films.dao import FilmDAO
 
+from ..recommendations.cache import recommendation_cache
+from ..recommendations.dao import UserRecommendationDAO
+from ..recommendations.models import UserRecommendation
+from ..recommendations.catalog import film_catalog
+
 from ..utils import check_record_existence
 
 
+# Количество оценок в одном INSERT при пакетной загрузке (3 параметра на оценку,
+# asyncpg ограничивает запрос 32767 параметрами)
+BULK_RATING_BATCH_SIZE = 1000
+
+
 class UserFilmCRUD:
 
     def __init__(self, db: AsyncSession):
         self.db = db
-        self.LIST_TYPES = {
-            "favorite": "favorite_films",
-            "postponed": "postponed_films",
-            "abandoned": "abandoned_films",
-            "planned": "planned_films",
-            "finished": "finished_films",
-        }
+        self.LIST_TYPES = LIST_TYPES
 
     async def update_user_list(self, token: str, film_id: int, list_type: str) -> str:
 
         auth_manager = AuthManager(self.db)
         token_crud = auth_manager.token_crud
+        user_crud = auth_manager.user_crud
 
         user_id = await token_crud.get_access_token_payload(access_token=token)
 
         film = await check_record_existence(db=self.db, model=Film, record_id=film_id)
-        user = await check_record_existence(self.db, User, user_id)
+        user = await user_crud.get_auth_user(user_id)
 
-        user_list_attribute = self.LIST_TYPES.get(list_type)
+        if user is None:
+            raise AuthExceptions.UserDoesNotExist
 
-        if not user_list_attribute:
+        if list_type not in self.LIST_TYPES:
             raise exceptions.InvalidListType
 
-        return await self._update_user_list(user, user_list_attribute, film)
+        response = await self._update_user_list(user.id, list_type, film.id)
+        await recommendation_cache.invalidate_user(user.id)
 
-    @staticmethod
-    async def _create_film_data(film: Film) -> dict:
-        return {
-            "id": film.id, "title": film.title, "poster": film.poster,
-            "rating": film.average_rating, "genres": film.genres
-        }
+        return response
+
+    async def get_user_list(self, token: str, list_type: str) -> list[dict]:
 
-    async def _update_user_list(self, user: User, user_list_attribute: str, film: Film) -> str:
+        auth_manager = AuthManager(self.db)
+        token_crud = auth_manager.token_crud
 
-        film_data = await self._create_film_data(film=film)
+        user_id = await token_crud.get_access_token_payload(access_token=token)
+
+        if list_type not in self.LIST_TYPES:
+            raise exceptions.InvalidListType
 
-        # Получаем текущий список пользователя, который пользователь хочет обновить
-        target_user_list = getattr(user, user_list_attribute, [])
+        return await UserFilmListDAO.find_film_list(self.db, user_id, list_type)
 
-        if user_list_attribute != "favorite_films":
+    async def _update_user_list(self, user_id: str, list_type: str, film_id: int) -> str:
 
-            await self._check_other_user_lists(
-                film_data=film_data,
-                user=user,
-                user_list_attribute=user_list_attribute
-            )
+        # Фильм может быть только в одном из взаимоисключающих списков
+        other_list_types = []
 
-        await self._toggle_film_data_in_user_list(target_user_list=target_user_list, film_data=film_data)
-        await self._update_user_in_database(user, user_list_attribute, target_user_list)
+        if list_type in EXCLUSIVE_LIST_TYPES:
+            other_list_types = [other for other in EXCLUSIVE_LIST_TYPES if other != list_type]
+
+        await UserFilmListDAO.toggle(self.db, user_id, film_id, list_type, other_list_types)
+        await self.db.commit()
 
         return {"Message": "Update was successful"}
 
-    @staticmethod
-    async def _toggle_film_data_in_user_list(target_user_list: list, film_data: dict):
+    async def rate_the_film(self, rating_data: schemas.UserFilmRatingCreate):
 
-        if film_data in target_user_list:
-            target_user_list.remove(film_data)
-        else:
-            target_user_list.append(film_data)
+        user_id = rating_data.user_id
+        film_id = rating_data.film_id
 
-    async def _check_other_user_lists(self, film_data: dict, user: User, user_list_attribute: str) -> None:
+        previous_rating = await UserFilmRatingDAO.upsert(self.db, user_id, film_id, rating_data.rating)
+        film = await self._update_film_rating_aggregates(film_id, rating_data.rating, previous_rating)
 
-        # Проверка, что film_id не находится в других списках и не является записью в списке favorite_films
-        other_list_attributes = [key for key in self.LIST_TYPES.values(
-        )if key != user_list_attribute and key != "favorite_films"]
+        await self._drop_precomputed_recommendations(user_id)
 
-        for other_list_attribute in other_list_attributes:
+        # Оценка, агрегаты фильма и сброс предрасчитанных рекомендаций - одна транзакция
+        await self.db.commit()
 
-            other_list = getattr(user, other_list_attribute, [])
+        film_catalog.upsert(film)
+        await recommendation_cache.invalidate_user(user_id)
 
-            if film_data in other_list:
-                other_list.remove(film_data)
+        return {"Message": "The evaluation was successful"}
 
-                await self._update_user_in_database(user, other_list_attribute, other_list)
+    async def rate_films_bulk(self, rows: list[Any]) -> dict:
+        """
+        Загружает пакет оценок (например, от партнерских площадок).
 
-    async def _update_user_in_database(self, user: User, user_list_attribute: str, target_user_list: list) -> None:
+        Оценки проверяются по отдельности, ошибочные попадают в отчет и не прерывают
+        загрузку. Корректные сохраняются пачками по BULK_RATING_BATCH_SIZE через
+        INSERT ... ON CONFLICT DO UPDATE, каждая пачка - в своей точке сохранения.
+        Агрегаты оценок пересчитываются один раз для каждого затронутого фильма,
+        все изменения фиксируются одним коммитом.
 
-        user_update_data = {user_list_attribute: target_user_list}
-        user_update = await UserDAO.update(self.db, User.id == user.id, obj_in=user_update_data)
+        Args:
+            rows (list): Оценки в формате UserFilmRatingCreate.
 
-        self.db.add(user_update)
-        await self.db.commit()
-        await self.db.refresh(user_update)
+        Returns:
+            dict: Количество полученных и сохраненных оценок и ошибки по номерам строк.
+        """
 
-    async def rate_the_film(self, rating_data: schemas.UserFilmRatingCreate):
+        errors = []
+        ratings = {}
 
-        user_id = rating_data.user_id
-        film_id = rating_data.film_id
+        for index, row in enumerate(rows):
+            try:
+                rating = schemas.UserFilmRatingCreate.model_validate(row)
+            except ValidationError as e:
+                errors.append({"index": index, "error": e.errors()[0]["msg"]})
+                continue
 
-        existing_rating = await self._get_existing_rating(user_id, film_id)
+            # Повторная оценка той же пары в пакете заменяет предыдущую
+            ratings[(rating.user_id, rating.film_id)] = (index, rating)
 
-        if existing_rating:
-            await self._delete_existing_rating(existing_rating)
+        existing_users = await UserDAO.find_existing_ids(self.db, {user_id for user_id, _ in ratings})
+        existing_films = await FilmDAO.find_existing_ids(self.db, {film_id for _, film_id in ratings})
 
-        await self._create_new_rating(rating_data)
-        return await self._update_average_local_rating(film_id)
+        valid_ratings = []
 
-    async def _get_existing_rating(self, user_id, film_id) -> UserFilmRating:
-        return await UserFilmRatingDAO.find_one_or_none(self.db, UserFilmRating.user_id == user_id, UserFilmRating.film_id == film_id)
+        for (user_id, film_id), (index, rating) in ratings.items():
+            if user_id not in existing_users:
+                errors.append({"index": index, "error": "User was not found"})
+            elif film_id not in existing_films:
+                errors.append({"index": index, "error": "Film was not found"})
+            else:
+                valid_ratings.append((index, rating))
 
-    async def _delete_existing_rating(self, existing_rating: UserFilmRating):
-        await UserFilmRatingDAO.delete(self.db, UserFilmRating.id == existing_rating.id)
+        saved_ratings = []
 
-    async def _create_new_rating(self, rating_data: schemas.UserFilmRatingCreate):
-        new_rating = await UserFilmRatingDAO.add(
-            self.db,
-            schemas.UserFilmRatingCreate(
-                **rating_data.model_dump()
-            ))
-        self.db.add(new_rating)
-        await self.db.commit()
-        await self.db.refresh(new_rating)
-        return new_rating
+        for start in range(0, len(valid_ratings), BULK_RATING_BATCH_SIZE):
+            batch = valid_ratings[start:start + BULK_RATING_BATCH_SIZE]
+
+            try:
+                async with self.db.begin_nested():
+                    await UserFilmRatingDAO.upsert_many(self.db, [rating.model_dump() for _, rating in batch])
+
+                saved_ratings.extend(rating for _, rating in batch)
 
-    async def _update_average_local_rating(self, film_id: int):
+            except SQLAlchemyError as e:
+                logger.opt(exception=e).error("Error in rate_films_bulk")
+                errors.extend({"index": index, "error": "Batch could not be saved"} for index, _ in batch)
 
-        new_rating = await self._get_average_local_rating(film_id)
-        obj_in = {"local_rating": new_rating}
+        films = await FilmDAO.recompute_rating_aggregates(self.db, {rating.film_id for rating in saved_ratings})
 
-        await FilmDAO.update(
-            self.db,
-            Film.id == film_id,
-            obj_in=obj_in)
+        user_ids = {rating.user_id for rating in saved_ratings}
+        if user_ids:
+            await UserRecommendationDAO.delete(self.db, UserRecommendation.user_id.in_(user_ids))
 
         await self.db.commit()
 
-        return {"Message": "The evaluation was successful"}
+        for film in films:
+            film_catalog.upsert(film)
+
+        if saved_ratings:
+            await recommendation_cache.invalidate_all()
+
+        return {
+            "received": len(rows),
+            "saved": len(saved_ratings),
+            "errors": sorted(errors, key=lambda error: error["index"]),
+        }
+
+    async def _drop_precomputed_recommendations(self, user_id: str) -> None:
 
-    async def _get_average_local_rating(self, film_id: int) -> float:
+        # Предрасчитанные рекомендации устарели: до следующего пакетного
+        # расчета пользователь получает рекомендации, рассчитанные по запросу
+        await UserRecommendationDAO.delete(self.db, UserRecommendation.user_id == user_id)
 
-        films = await UserFilmRatingDAO.find_all(self.db, UserFilmRating.film_id == film_id)
+    async def _update_film_rating_aggregates(self, film_id: int, rating: float, previous_rating: float | None) -> Film:
 
-        ratings = [film.rating for film in films]
+        if previous_rating is None:
+            return await FilmDAO.apply_rating_delta(self.db, film_id, count_delta=1, sum_delta=rating)
 
-        return sum(ratings) / len(ratings)
+        return await FilmDAO.apply_rating_delta(self.db, film_id, count_delta=0, sum_delta=rating - previous_rating)
 
     async def get_ratings_for_film(self, film_id: int) -> list:
 